@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志基准测试
+
+- 默认：多个进程同时向同一个日志文件写入并频繁轮转，对比 RotatingFileHandler 与
+  SharedRotatingFileHandler 的吞吐量和丢失的行数
+- --formatter：对比 JSONFormatter 与旧实现的单条格式化耗时，以及 INFO 记录跳过 findCaller 的收益
+
+用法:
+    python scripts/bench_logging.py --processes 2 --records 20000 --max-bytes 1048576
+    python scripts/bench_logging.py --formatter --records 200000
+"""
+
+import os
+import sys
+import json
+import time
+import glob
+import shutil
+import logging
+import argparse
+import tempfile
+import logging.handlers
+import multiprocessing
+from datetime import datetime
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(project_root, 'src'))
+
+from logger import (  # noqa: E402
+    JSONFormatter,
+    SharedRotatingFileHandler,
+    ORJSON_AVAILABLE,
+    _CallerOnWarningLogger,
+)
+
+
+def _build_handler(kind: str, log_file: str, max_bytes: int, backup_count: int) -> logging.Handler:
+    if kind == 'rotating':
+        handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+        )
+    else:
+        handler = SharedRotatingFileHandler(
+            log_file, max_bytes=max_bytes, backup_count=backup_count, encoding='utf-8'
+        )
+    handler.setFormatter(JSONFormatter())
+    return handler
+
+
+def _writer(kind: str, log_file: str, worker: int, records: int, max_bytes: int, backup_count: int) -> None:
+    logger = logging.getLogger(f"bench.{kind}.{worker}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = _build_handler(kind, log_file, max_bytes, backup_count)
+    logger.addHandler(handler)
+    for i in range(records):
+        logger.info("bench record", extra={'extra_data': {'worker': worker, 'seq': i, 'payload': 'x' * 80}})
+    handler.close()
+
+
+def _count_lines(log_file: str) -> int:
+    total = 0
+    for path in glob.glob(log_file + "*"):
+        if path.endswith(".lock"):
+            continue
+        with open(path, 'rb') as f:
+            total += sum(1 for _ in f)
+    return total
+
+
+def run(kind: str, processes: int, records: int, max_bytes: int) -> None:
+    work_dir = tempfile.mkdtemp(prefix=f"bench_{kind}_")
+    log_file = os.path.join(work_dir, "all.log")
+    # 备份数量足够大，确保测得的丢失来自并发轮转而不是备份被淘汰
+    backup_count = 1000
+    try:
+        started = time.perf_counter()
+        workers = [
+            multiprocessing.Process(
+                target=_writer, args=(kind, log_file, i, records, max_bytes, backup_count)
+            )
+            for i in range(processes)
+        ]
+        for p in workers:
+            p.start()
+        for p in workers:
+            p.join()
+        elapsed = time.perf_counter() - started
+        expected = processes * records
+        written = _count_lines(log_file)
+        print(
+            f"{kind:<9} | {expected / elapsed:>10.0f} 行/秒 | 耗时 {elapsed:6.2f}s | "
+            f"期望 {expected} 行, 实际 {written} 行, 丢失 {expected - written}"
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+class _LegacyJSONFormatter(logging.Formatter):
+    """改造前的 JSONFormatter，作为对照"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        log_data = {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "component": record.name,
+            "message": record.getMessage(),
+        }
+        if hasattr(record, 'extra_data'):
+            log_data.update(record.extra_data)
+        if record.exc_info:
+            log_data["exception"] = self.formatException(record.exc_info)
+        log_data["process"] = record.process
+        log_data["thread"] = record.thread
+        if record.levelno >= logging.WARNING:
+            log_data["file"] = record.filename
+            log_data["line"] = record.lineno
+            log_data["function"] = record.funcName
+        return json.dumps(log_data, ensure_ascii=False)
+
+
+def bench_formatter(records: int) -> None:
+    record = logging.LogRecord('chronolullaby.downloader', logging.INFO, __file__, 1, "✅ 下载成功 %s", ('abc123',), None)
+    record.extra_data = {'yt_channel': '@频道', 'size_mb': 12.34, 'title': '标题' * 10}
+
+    formatters = [('legacy', _LegacyJSONFormatter()), ('json', JSONFormatter(json_backend='json'))]
+    if ORJSON_AVAILABLE:
+        formatters.append(('orjson', JSONFormatter(json_backend='orjson')))
+    else:
+        print("(未安装 orjson，跳过 orjson 后端)")
+
+    assert formatters[0][1].format(record) == formatters[1][1].format(record), "json 后端输出与旧实现不一致"
+    for name, formatter in formatters:
+        started = time.perf_counter()
+        for i in range(records):
+            record.created = 1700000000 + i / 1000
+            formatter.format(record)
+        elapsed = time.perf_counter() - started
+        print(f"format  {name:<8} | {elapsed / records * 1e6:6.2f} µs/条")
+
+    # 记录创建：标准 Logger 每条都会 findCaller，改造后 WARNING 以下跳过
+    for name, logger_class in (('Logger', logging.Logger), ('fast', _CallerOnWarningLogger)):
+        logger = logger_class(f"bench.{name}")
+        logger.setLevel(logging.INFO)
+        logger.addHandler(logging.NullHandler())
+        started = time.perf_counter()
+        for i in range(records):
+            logger.info("record %s", i, extra={'extra_data': {'seq': i}})
+        elapsed = time.perf_counter() - started
+        print(f"log()   {name:<8} | {elapsed / records * 1e6:6.2f} µs/条")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='日志基准测试')
+    parser.add_argument('--processes', type=int, default=2, help='写入进程数')
+    parser.add_argument('--records', type=int, default=20000, help='每个进程写入的记录数')
+    parser.add_argument('--max-bytes', type=int, default=1024 * 1024, help='轮转阈值（字节）')
+    parser.add_argument('--only', choices=['rotating', 'shared'], help='只测试一种 Handler')
+    parser.add_argument('--formatter', action='store_true', help='测试 JSON 格式化与记录创建耗时')
+    args = parser.parse_args()
+
+    if args.formatter:
+        bench_formatter(args.records)
+        return
+
+    kinds = [args.only] if args.only else ['rotating', 'shared']
+    for kind in kinds:
+        run(kind, args.processes, args.records, args.max_bytes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自建 Bot API 服务器配置自检
+在本机启动一个模拟 Bot API 的 HTTP 服务，按 Bot 的方式（apply_local_bot_api + RoutedRequest）
+构建 Application，检查：
+
+- 请求发往 <base_url>/bot<token>/<方法>
+- local_mode 下 send_audio 按本地路径（file:// URI）提交，而不是 multipart 上传
+- local_mode 下单文件上限为 2000MB（不再切割）
+- get_file 返回的相对路径拼接到 base_file_url
+
+不连接 Telegram，不读写发送记录。
+
+用法:
+    python scripts/check_local_bot_api.py
+    python scripts/check_local_bot_api.py --base-file-url http://127.0.0.1:9/files/bot
+"""
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(project_root, 'src'))
+
+from telegram.ext import Application  # noqa: E402
+from telegram_request import RoutedRequest, apply_local_bot_api  # noqa: E402
+from task.send_file import LOCAL_API_UPLOAD_LIMIT_MB, _upload_limit_mb  # noqa: E402
+
+TOKEN = "123456:LOCAL-API-CHECK"
+CHAT_ID = -1001234567890
+REMOTE_FILE_PATH = "music/file_0.mp3"
+
+
+class _StubBotApi(BaseHTTPRequestHandler):
+    """按方法名返回最小可解析的 Bot API 响应，并记录收到的请求"""
+
+    requests: List[Dict] = []
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        content_type = self.headers.get('Content-Type', '')
+        if content_type.startswith('application/x-www-form-urlencoded'):
+            params = {k: v[0] for k, v in parse_qs(body.decode('utf-8')).items()}
+        else:
+            params = {}
+        self.requests.append({'path': self.path, 'content_type': content_type, 'params': params})
+
+        method = self.path.rsplit('/', 1)[-1]
+        if method == 'getMe':
+            result = {'id': 123456, 'is_bot': True, 'first_name': 'check', 'username': 'check_bot'}
+        elif method == 'sendAudio':
+            result = {
+                'message_id': 1, 'date': 0,
+                'chat': {'id': CHAT_ID, 'type': 'channel'},
+                'audio': {'file_id': 'AUDIO', 'file_unique_id': 'AUDIO-U', 'duration': 1},
+            }
+        elif method == 'getFile':
+            result = {'file_id': 'AUDIO', 'file_unique_id': 'AUDIO-U', 'file_path': REMOTE_FILE_PATH}
+        else:
+            result = True
+        payload = json.dumps({'ok': True, 'result': result}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _check(results: List[bool], ok: bool, label: str, detail: str = '') -> None:
+    results.append(ok)
+    print(f"{'✅' if ok else '❌'} {label}" + (f"  ({detail})" if detail and not ok else ''))
+
+
+async def run_checks(server_url: str, base_file_url: str) -> bool:
+    settings = {'enabled': True, 'base_url': server_url}
+    if base_file_url:
+        settings['base_file_url'] = base_file_url
+    expected_file_url = base_file_url or f"{server_url.rstrip('/')}/file/bot"
+
+    builder = Application.builder().token(TOKEN).request(RoutedRequest())
+    results: List[bool] = []
+    _check(results, apply_local_bot_api(builder, settings) == server_url.rstrip('/'),
+           "apply_local_bot_api 返回服务器地址")
+    application = builder.build()
+    bot = application.bot
+
+    with tempfile.TemporaryDirectory() as tmp:
+        audio_path = Path(tmp) / "check.mp3"
+        audio_path.write_bytes(b"\0" * 1024)
+        async with application:
+            _check(results, bool(bot.local_mode), "Bot 处于 local_mode")
+            _check(results, _upload_limit_mb(bot) == LOCAL_API_UPLOAD_LIMIT_MB,
+                   f"单文件上限为 {LOCAL_API_UPLOAD_LIMIT_MB}MB", f"实际 {_upload_limit_mb(bot)}MB")
+
+            # 与 send_single_file 的 local_mode 分支相同的调用方式
+            await bot.send_audio(chat_id=CHAT_ID, audio=audio_path.resolve(), title="check",
+                                 read_timeout=30, write_timeout=30)
+            send = next((r for r in _StubBotApi.requests if r['path'].endswith('/sendAudio')), None)
+            _check(results, send is not None and send['path'] == f"/bot{TOKEN}/sendAudio",
+                   "sendAudio 发往 <base_url>/bot<token>/sendAudio", send['path'] if send else '未收到请求')
+            if send is not None:
+                _check(results, not send['content_type'].startswith('multipart/'),
+                       "sendAudio 未使用 multipart 上传", send['content_type'])
+                _check(results, send['params'].get('audio') == audio_path.resolve().as_uri(),
+                       "audio 参数为本地文件 URI", str(send['params'].get('audio')))
+
+            remote = await bot.get_file('AUDIO')
+            expected = f"{expected_file_url}{TOKEN}/{REMOTE_FILE_PATH}"
+            _check(results, remote.file_path == expected,
+                   "get_file 的下载地址使用 base_file_url", f"{remote.file_path} != {expected}")
+
+    return all(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ChronoLullaby 自建 Bot API 服务器配置自检')
+    parser.add_argument('--base-file-url', help='检查自定义的 base_file_url（默认 <base_url>/file/bot）')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubBotApi)
+    thread = threading.Thread(target=server.serve_forever, name='stub-bot-api', daemon=True)
+    thread.start()
+    server_url = f"http://127.0.0.1:{server.server_address[1]}/"
+    print(f"🖥️ 模拟 Bot API 服务器: {server_url}\n")
+    try:
+        ok = asyncio.run(run_checks(server_url, args.base_file_url))
+    finally:
+        server.shutdown()
+
+    print()
+    print("全部通过" if ok else "存在失败项")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
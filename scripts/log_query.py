@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSONL 日志流式查询
+供 view_logs.py 使用，不再把所有 all.log* 读入内存：
+
+- 按轮转顺序（all.log.N ... all.log.1, all.log）逐行流式读取
+- --last N 从最新文件末尾倒序读取，凑够 N 条即停止
+- follow_logs 持续跟踪 all.log 新增内容，轮转后按 inode 切换到新文件
+- load_rollup_stats 读取日志进程维护的统计汇总（logs/log_stats.db），--stats 无需扫描日志
+- 可选的旁路索引（logs/.index/<inode>.json）：把文件按约 256KB 分块，
+  记录每块包含的级别、组件和时间范围；带级别/组件/时间过滤的查询直接跳过不相关的块。
+  索引以 inode 为键，文件轮转改名后仍然有效；all.log 追加的内容增量索引；
+  同时记录文件开头 4KB 的哈希，inode 被新文件复用时据此丢弃旧索引
+"""
+
+import os
+import json
+import hashlib
+import time
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+CHUNK_SIZE = 256 * 1024
+READ_BLOCK_SIZE = 64 * 1024
+INDEX_VERSION = 2
+FINGERPRINT_SIZE = 4096
+INDEX_DIR_NAME = '.index'
+
+
+def list_log_files(logs_dir: Path, base_name: str = 'all.log') -> List[Path]:
+    """按时间从旧到新排列的日志文件（all.log.N ... all.log.1, all.log）"""
+    rotated = []
+    current = None
+    for path in logs_dir.glob(f'{base_name}*'):
+        if not path.is_file():
+            continue
+        if path.name == base_name:
+            current = path
+            continue
+        suffix = path.name[len(base_name) + 1:]
+        if path.name.startswith(base_name + '.') and suffix.isdigit():
+            rotated.append((int(suffix), path))
+    files = [path for _, path in sorted(rotated, reverse=True)]
+    if current is not None:
+        files.append(current)
+    return files
+
+
+def normalize_component(component: str) -> str:
+    if component.startswith('chronolullaby.'):
+        return component[len('chronolullaby.'):]
+    return component
+
+
+class LogFilter:
+    """日志过滤条件"""
+
+    def __init__(self, component: str = 'all', level: Optional[str] = None, error_only: bool = False,
+                 text: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None):
+        self.component = component or 'all'
+        self.levels = None
+        if level:
+            self.levels = {level}
+        elif error_only:
+            self.levels = {'ERROR', 'CRITICAL'}
+        self.text = text
+        # 时间戳为 ISO 格式字符串，按前缀比较即可（如 2025-01-02 或 2025-01-02T08）
+        self.since = since
+        self.until = until
+        # 文本中含引号/反斜杠时在原始行中会被转义，不能用于预筛
+        self._raw_text = (
+            text.encode('utf-8') if text and '"' not in text and '\\' not in text else None
+        )
+
+    @property
+    def uses_index(self) -> bool:
+        return self.component != 'all' or self.levels is not None or bool(self.since or self.until)
+
+    def match_component(self, component_value: str) -> bool:
+        if self.component == 'all':
+            return True
+        if not component_value:
+            return False
+        normalized = normalize_component(component_value)
+        if normalized == self.component or component_value == self.component:
+            return True
+        if normalized.startswith(f'{self.component}.'):
+            return True
+        return normalized.split('.')[0] == self.component
+
+    def match_raw(self, line: bytes) -> bool:
+        """解析 JSON 前的快速预筛（必要条件）"""
+        return self._raw_text is None or self._raw_text in line
+
+    def match(self, entry: Dict) -> bool:
+        if not self.match_component(entry.get('component', '')):
+            return False
+        if self.levels is not None and entry.get('level') not in self.levels:
+            return False
+        if self.text and self.text not in entry.get('message', ''):
+            return False
+        timestamp = entry.get('timestamp', '')
+        if self.since and timestamp[:len(self.since)] < self.since:
+            return False
+        if self.until and timestamp[:len(self.until)] > self.until:
+            return False
+        return True
+
+    def match_chunk(self, chunk: Dict) -> bool:
+        """索引块可能包含匹配记录时返回 True"""
+        if self.levels is not None and not self.levels.intersection(chunk['levels']):
+            return False
+        if self.component != 'all' and not any(self.match_component(c) for c in chunk['components']):
+            return False
+        if self.since and chunk['max_ts'] and chunk['max_ts'][:len(self.since)] < self.since:
+            return False
+        if self.until and chunk['min_ts'] and chunk['min_ts'][:len(self.until)] > self.until:
+            return False
+        return True
+
+
+def _parse(line: bytes) -> Optional[Dict]:
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return None
+    return entry if isinstance(entry, dict) else None
+
+
+# ---------- 顺序 / 倒序读取 ----------
+
+def _iter_lines_forward(path: Path, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+    with open(path, 'rb') as f:
+        f.seek(start)
+        position = start
+        for line in f:
+            if end is not None and position >= end:
+                break
+            position += len(line)
+            yield line
+
+
+def _iter_lines_backward(path: Path, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+    """从 end（默认文件末尾）向 start 倒序逐行读取，每次只读一个块"""
+    with open(path, 'rb') as f:
+        if end is None:
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+        position = end
+        remainder = b''
+        while position > start:
+            read_size = min(READ_BLOCK_SIZE, position - start)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size) + remainder
+            lines = block.split(b'\n')
+            # 第一段可能是不完整的行，留到下一个块拼接
+            remainder = lines[0]
+            for line in reversed(lines[1:]):
+                if line:
+                    yield line
+        if remainder:
+            yield remainder
+
+
+# ---------- 旁路索引 ----------
+
+def _index_path(path: Path, ino: int) -> Path:
+    return path.parent / INDEX_DIR_NAME / f'{ino}.json'
+
+
+def _head_fingerprint(path: Path, size: int) -> Optional[str]:
+    """文件开头 size 字节的哈希；文件只追加，已索引部分的开头不会变"""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(size)
+    except OSError:
+        return None
+    if len(head) < size:
+        return None
+    return hashlib.sha1(head).hexdigest()
+
+
+def _load_index(path: Path, stat: os.stat_result) -> Optional[Dict]:
+    try:
+        with open(_index_path(path, stat.st_ino), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # 文件被截断时索引作废
+    if index.get('version') != INDEX_VERSION or index.get('indexed_size', 0) > stat.st_size:
+        return None
+    # inode 被复用（轮转删掉最旧备份后新建 all.log）时文件开头不同，索引作废
+    if _head_fingerprint(path, index.get('head_size', 0)) != index.get('head_hash'):
+        return None
+    return index
+
+
+def _save_index(path: Path, index: Dict) -> None:
+    index_file = _index_path(path, index['ino'])
+    try:
+        index_file.parent.mkdir(exist_ok=True)
+        tmp_file = index_file.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp_file, index_file)
+    except OSError:
+        pass
+
+
+def _new_chunk(offset: int) -> Dict:
+    return {'start': offset, 'end': offset, 'levels': set(), 'components': set(), 'min_ts': '', 'max_ts': ''}
+
+
+def _finish_chunk(chunk: Dict) -> Dict:
+    chunk['levels'] = sorted(chunk['levels'])
+    chunk['components'] = sorted(chunk['components'])
+    return chunk
+
+
+def ensure_index(path: Path) -> Optional[Dict]:
+    """加载索引，并把文件新追加的完整行补充进索引"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    index = _load_index(path, stat) or {
+        'version': INDEX_VERSION, 'ino': stat.st_ino, 'indexed_size': 0, 'chunks': [],
+    }
+    if index['indexed_size'] >= stat.st_size:
+        return index
+
+    chunk = _new_chunk(index['indexed_size'])
+    offset = index['indexed_size']
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                # 正在写入的最后一行，下次再索引
+                break
+            offset += len(line)
+            chunk['end'] = offset
+            entry = _parse(line)
+            if entry is not None:
+                chunk['levels'].add(entry.get('level', 'UNKNOWN'))
+                chunk['components'].add(entry.get('component', 'unknown'))
+                timestamp = entry.get('timestamp', '')
+                if timestamp:
+                    if not chunk['min_ts'] or timestamp < chunk['min_ts']:
+                        chunk['min_ts'] = timestamp
+                    if timestamp > chunk['max_ts']:
+                        chunk['max_ts'] = timestamp
+            if chunk['end'] - chunk['start'] >= CHUNK_SIZE:
+                index['chunks'].append(_finish_chunk(chunk))
+                chunk = _new_chunk(offset)
+    if chunk['end'] > chunk['start']:
+        index['chunks'].append(_finish_chunk(chunk))
+    index['indexed_size'] = offset
+    head_size = min(offset, FINGERPRINT_SIZE)
+    if index.get('head_size', 0) < head_size:
+        # 文件不足 4KB 时按已索引的长度记录，随文件增长补足
+        index['head_size'] = head_size
+        index['head_hash'] = _head_fingerprint(path, head_size)
+    _save_index(path, index)
+    return index
+
+
+def prune_indexes(logs_dir: Path) -> None:
+    """删除对应文件已不存在的索引"""
+    index_dir = logs_dir / INDEX_DIR_NAME
+    if not index_dir.is_dir():
+        return
+    live = set()
+    for path in logs_dir.iterdir():
+        try:
+            if path.is_file():
+                live.add(str(path.stat().st_ino))
+        except OSError:
+            continue
+    for index_file in index_dir.glob('*.json'):
+        if index_file.stem not in live:
+            try:
+                index_file.unlink()
+            except OSError:
+                pass
+
+
+def _file_ranges(path: Path, flt: LogFilter, use_index: bool) -> List[tuple]:
+    """需要读取的字节范围 [(start, end)]；end 为 None 表示到文件末尾"""
+    if not (use_index and flt.uses_index):
+        return [(0, None)]
+    index = ensure_index(path)
+    if index is None:
+        return [(0, None)]
+    ranges = []
+    for chunk in index['chunks']:
+        if not flt.match_chunk(chunk):
+            continue
+        if ranges and ranges[-1][1] == chunk['start']:
+            ranges[-1] = (ranges[-1][0], chunk['end'])
+        else:
+            ranges.append((chunk['start'], chunk['end']))
+    # 索引之后尚未完整写入的尾部
+    ranges.append((index['indexed_size'], None))
+    return ranges
+
+
+# ---------- 查询入口 ----------
+
+def iter_logs(files: List[Path], flt: LogFilter, use_index: bool = True) -> Iterator[Dict]:
+    """按文件顺序（从旧到新）流式返回匹配的日志"""
+    for path in files:
+        try:
+            ranges = _file_ranges(path, flt, use_index)
+            for start, end in ranges:
+                for line in _iter_lines_forward(path, start, end):
+                    if not flt.match_raw(line):
+                        continue
+                    entry = _parse(line)
+                    if entry is not None and flt.match(entry):
+                        yield entry
+        except FileNotFoundError:
+            # 读取期间文件被轮转
+            continue
+
+
+def iter_logs_reverse(files: List[Path], flt: LogFilter, use_index: bool = True) -> Iterator[Dict]:
+    """从最新一条开始倒序返回匹配的日志"""
+    for path in reversed(files):
+        try:
+            ranges = _file_ranges(path, flt, use_index)
+            for start, end in reversed(ranges):
+                for line in _iter_lines_backward(path, start, end):
+                    if not flt.match_raw(line):
+                        continue
+                    entry = _parse(line)
+                    if entry is not None and flt.match(entry):
+                        yield entry
+        except FileNotFoundError:
+            continue
+
+
+def query_logs(files: List[Path], flt: LogFilter, last: Optional[int] = None,
+               use_index: bool = True) -> Iterator[Dict]:
+    """查询日志；指定 last 时只倒序读取到凑够 last 条为止，按时间正序返回"""
+    if last and last > 0:
+        newest = []
+        for entry in iter_logs_reverse(files, flt, use_index):
+            newest.append(entry)
+            if len(newest) >= last:
+                break
+        return iter(reversed(newest))
+    return iter_logs(files, flt, use_index)
+
+
+def follow_logs(path: Path, flt: LogFilter, poll_interval: float = 0.25,
+                from_start: bool = False) -> Iterator[Dict]:
+    """
+    持续返回 path 新写入的匹配日志（类似 tail -F）
+
+    - 只读取新增字节，已读内容不会重新解析
+    - 文件被轮转（inode 变化）时先读完旧文件剩余内容，再从头读取新文件
+    - 文件被截断时从头读取
+    """
+    handle = None
+    ino = None
+    pending = b''
+    while True:
+        if handle is None:
+            try:
+                handle = open(path, 'rb')
+            except FileNotFoundError:
+                time.sleep(poll_interval)
+                continue
+            ino = os.fstat(handle.fileno()).st_ino
+            if not from_start:
+                handle.seek(0, os.SEEK_END)
+            # 之后打开的新文件（轮转产生）总是从头读取
+            from_start = True
+            pending = b''
+
+        block = handle.read(READ_BLOCK_SIZE * 16)
+        if block:
+            lines = (pending + block).split(b'\n')
+            pending = lines.pop()
+            for line in lines:
+                if not line or not flt.match_raw(line):
+                    continue
+                entry = _parse(line)
+                if entry is not None and flt.match(entry):
+                    yield entry
+            continue
+
+        # 没有新数据：检查是否已轮转或被截断
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            stat = None
+        if stat is None or stat.st_ino != ino:
+            handle.close()
+            handle = None
+            continue
+        if stat.st_size < handle.tell():
+            handle.seek(0)
+            pending = b''
+            continue
+        time.sleep(poll_interval)
+
+
+def load_rollup_stats(logs_dir: Path, since: Optional[str] = None,
+                      until: Optional[str] = None) -> Optional[Dict[str, Dict[str, int]]]:
+    """
+    读取统计汇总：{维度: {值: 条数}}，维度为 level / component / error_type / channel
+
+    时间范围精确到分钟时使用分钟桶，否则使用小时桶；汇总不存在时返回 None
+    """
+    db_path = logs_dir / 'log_stats.db'
+    if not db_path.exists():
+        return None
+    precise = any(bound and len(bound) > 13 for bound in (since, until))
+    granularity = 'minute' if precise else 'hour'
+    clauses = ["granularity = ?"]
+    params: List = [granularity]
+    if since:
+        clauses.append("substr(bucket, 1, ?) >= ?")
+        params += [len(since), since]
+    if until:
+        clauses.append("substr(bucket, 1, ?) <= ?")
+        params += [len(until), until]
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=5)
+        try:
+            rows = conn.execute(
+                f"SELECT dimension, key, SUM(count) FROM rollup WHERE {' AND '.join(clauses)} "
+                "GROUP BY dimension, key",
+                params,
+            ).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+    stats: Dict[str, Dict[str, int]] = {}
+    for dimension, key, count in rows:
+        stats.setdefault(dimension, {})[key] = count
+    return stats
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+下载轮次统计查看工具
+读取 data/metrics.db 中 dl_audio_latest 每轮（每个频道一次）的结果与阶段耗时，
+找出占用下载时间最多的频道和阶段
+
+用法:
+    python scripts/pass_stats.py                      # 最近 7 天，按频道汇总
+    python scripts/pass_stats.py --stages             # 按阶段汇总（list/download/transcode/rename/delay）
+    python scripts/pass_stats.py --recent 20          # 最近 20 轮明细
+    python scripts/pass_stats.py --slowest 10         # 最慢的 10 个视频
+    python scripts/pass_stats.py --since 2026-01-01 --channel @example
+"""
+
+import os
+import sys
+import time
+import argparse
+from typing import Dict, List
+
+from report_format import fmt_seconds, fmt_time, parse_time, percentile
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(project_root, 'src'))
+
+from metrics_store import METRICS_DB_FILE, STAGES, VIDEO_STAGES, MetricsStore  # noqa: E402
+
+
+def show_channels(passes: List[Dict], top: int) -> None:
+    """按频道汇总：轮次数、耗时分布、结果计数与耗时最多的阶段"""
+    by_channel: Dict[str, List[Dict]] = {}
+    for row in passes:
+        by_channel.setdefault(row['channel'], []).append(row)
+    grand_total = sum(row['duration'] for row in passes) or 1.0
+
+    ranked = sorted(by_channel.items(), key=lambda item: sum(r['duration'] for r in item[1]), reverse=True)
+    print(f"{'频道':<28} {'轮次':>5} {'总耗时':>8} {'占比':>6} {'p50':>7} {'p95':>7} "
+          f"{'成功':>5} {'错误':>5} {'主要阶段':<18}")
+    print("-" * 100)
+    for channel, rows in ranked[:top]:
+        durations = [r['duration'] for r in rows]
+        total = sum(durations)
+        stage_totals = {name: sum(r[f'{name}_seconds'] for r in rows) for name in STAGES}
+        main_stage, main_seconds = max(stage_totals.items(), key=lambda item: item[1])
+        main = f"{main_stage} {main_seconds / total * 100:.0f}%" if total and main_seconds else '-'
+        print(
+            f"{channel[:28]:<28} {len(rows):>5} {fmt_seconds(total):>8} {total / grand_total * 100:>5.1f}% "
+            f"{fmt_seconds(percentile(durations, 50)):>7} {fmt_seconds(percentile(durations, 95)):>7} "
+            f"{sum(r['success'] for r in rows):>5} {sum(r['error'] for r in rows):>5} {main:<18}"
+        )
+    if len(ranked) > top:
+        print(f"... 另有 {len(ranked) - top} 个频道（--top 调整）")
+
+
+def show_stages(passes: List[Dict]) -> None:
+    """按阶段汇总：总耗时、占整轮时间的比例、每轮耗时分布"""
+    grand_total = sum(row['duration'] for row in passes) or 1.0
+    print(f"{'阶段':<12} {'总耗时':>9} {'占比':>7} {'平均/轮':>9} {'p50/轮':>9} {'p95/轮':>9}")
+    print("-" * 62)
+    accounted = 0.0
+    for name in STAGES:
+        values = [row[f'{name}_seconds'] for row in passes]
+        total = sum(values)
+        accounted += total
+        print(
+            f"{name:<12} {fmt_seconds(total):>9} {total / grand_total * 100:>6.1f}% "
+            f"{fmt_seconds(total / len(passes)):>9} {fmt_seconds(percentile(values, 50)):>9} "
+            f"{fmt_seconds(percentile(values, 95)):>9}"
+        )
+    other = max(grand_total - accounted, 0.0) if passes else 0.0
+    print(f"{'other':<12} {fmt_seconds(other):>9} {other / grand_total * 100:>6.1f}%")
+
+
+def show_recent(passes: List[Dict], limit: int) -> None:
+    """最近若干轮的明细"""
+    header = "".join(f" {name:>9}" for name in STAGES)
+    print(f"{'开始时间':<12} {'频道':<24} {'结果':<9} {'耗时':>8}{header} {'成功/总数':>9}")
+    print("-" * (66 + 10 * len(STAGES)))
+    for row in passes[:limit]:
+        stages = "".join(f" {fmt_seconds(row[f'{name}_seconds']):>9}" for name in STAGES)
+        print(
+            f"{fmt_time(row['started_at']):<12} {row['channel'][:24]:<24} {row['result']:<9} "
+            f"{fmt_seconds(row['duration']):>8}{stages} {row['success']:>4}/{row['total']:<4}"
+        )
+
+
+def show_slowest(store: MetricsStore, passes: List[Dict], limit: int) -> None:
+    """下载 + 转码耗时最多的视频"""
+    videos = store.query_videos([row['id'] for row in passes])
+    videos = [v for v in videos if any(v[f'{name}_seconds'] for name in VIDEO_STAGES)]
+    videos.sort(key=lambda v: sum(v[f'{name}_seconds'] for name in VIDEO_STAGES), reverse=True)
+    header = "".join(f" {name:>9}" for name in VIDEO_STAGES)
+    print(f"{'开始时间':<12} {'频道':<24} {'视频ID':<13} {'状态':<14}{header} {'大小MB':>8}")
+    print("-" * (75 + 10 * len(VIDEO_STAGES)))
+    for v in videos[:limit]:
+        stages = "".join(f" {fmt_seconds(v[f'{name}_seconds']):>9}" for name in VIDEO_STAGES)
+        size = f"{v['size_mb']:.1f}" if v['size_mb'] is not None else '-'
+        print(
+            f"{fmt_time(v['started_at']):<12} {v['channel'][:24]:<24} {str(v['video_id'])[:13]:<13} "
+            f"{v['status'][:14]:<14}{stages} {size:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ChronoLullaby 下载轮次统计')
+    parser.add_argument('--since', type=parse_time, help='开始时间（YYYY-MM-DD[THH[:MM]]，默认最近 --days 天）')
+    parser.add_argument('--until', type=parse_time, help='结束时间（不含）')
+    parser.add_argument('--days', type=float, default=7, help='未指定 --since 时统计最近 N 天（默认 7）')
+    parser.add_argument('--channel', help='只统计指定频道')
+    parser.add_argument('--stages', action='store_true', help='按阶段汇总')
+    parser.add_argument('--recent', type=int, metavar='N', help='显示最近 N 轮明细')
+    parser.add_argument('--slowest', type=int, metavar='N', help='显示下载 + 转码最慢的 N 个视频')
+    parser.add_argument('--top', type=int, default=30, help='按频道汇总时显示的频道数')
+    args = parser.parse_args()
+
+    if not os.path.exists(METRICS_DB_FILE):
+        print(f"❌ 指标数据库不存在: {METRICS_DB_FILE}")
+        print("   下载器完成一轮频道处理后会自动创建")
+        sys.exit(1)
+
+    since = args.since if args.since is not None else time.time() - args.days * 86400
+    store = MetricsStore(METRICS_DB_FILE)
+    passes = store.query_passes(since=since, until=args.until, channel=args.channel)
+    if not passes:
+        print("所选时间范围内没有轮次记录")
+        return
+
+    total = sum(row['duration'] for row in passes)
+    print(f"📊 {fmt_time(passes[-1]['started_at'])} ~ {fmt_time(passes[0]['started_at'])}："
+          f"{len(passes)} 轮，合计 {fmt_seconds(total)}\n")
+
+    if args.recent:
+        show_recent(passes, args.recent)
+    elif args.slowest:
+        show_slowest(store, passes, args.slowest)
+    elif args.stages:
+        show_stages(passes)
+    else:
+        show_channels(passes, args.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+统计报表的公共格式化工具
+供 pass_stats.py、trace_report.py 使用：时间参数解析、百分位与耗时/时间格式化
+"""
+
+import math
+import argparse
+from datetime import datetime
+from typing import List, Optional
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """解析 YYYY-MM-DD[THH[:MM[:SS]]]（本地时间）"""
+    if not value:
+        return None
+    value = value.replace(' ', 'T')
+    for fmt in ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M', '%Y-%m-%dT%H', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"无法解析时间: {value}")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩百分位（values 为空时返回 0）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+def fmt_seconds(seconds: float) -> str:
+    """耗时：1 秒以下显示毫秒，其余按 s / m / h"""
+    if seconds >= 3600:
+        return f"{seconds / 3600:.1f}h"
+    if seconds >= 60:
+        return f"{seconds / 60:.1f}m"
+    if seconds >= 1 or seconds == 0:
+        return f"{seconds:.1f}s"
+    return f"{seconds * 1000:.0f}ms"
+
+
+def fmt_time(ts: float, with_seconds: bool = False) -> str:
+    return datetime.fromtimestamp(ts).strftime('%m-%d %H:%M:%S' if with_seconds else '%m-%d %H:%M')
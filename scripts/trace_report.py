@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+单集音频追踪报告
+读取 logs/traces.jsonl（含轮转备份），按 trace（一个视频从获取列表到发送完成）汇总：
+
+- 默认：各阶段独占耗时的分位数（p50 / p90 / p99 / max）与端到端耗时分布
+- --recent N：最近 N 个 trace 的端到端耗时与最慢阶段
+- --video ID / --trace ID：单集瀑布图
+
+用法:
+    python scripts/trace_report.py
+    python scripts/trace_report.py --since 2026-01-01 --complete
+    python scripts/trace_report.py --recent 20
+    python scripts/trace_report.py --video dQw4w9WgXcQ
+"""
+
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+from typing import Dict, List
+
+from log_query import list_log_files
+from report_format import fmt_seconds, fmt_time, parse_time, percentile
+
+# 阶段在一集中的先后顺序（瀑布图与报表按此排列）
+STAGE_ORDER = ('list', 'download', 'transcode', 'rename', 'wait', 'split', 'send', 'record')
+
+
+def load_traces(logs_dir: Path) -> Dict[str, List[Dict]]:
+    """trace_id -> 按开始时间排序的 span 列表"""
+    traces: Dict[str, List[Dict]] = {}
+    for path in list_log_files(logs_dir, 'traces.jsonl'):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and entry.get('trace_id') and entry.get('name'):
+                    traces.setdefault(entry['trace_id'], []).append(entry)
+    for spans in traces.values():
+        spans.sort(key=lambda s: (s.get('start', 0), STAGE_ORDER.index(s['name']) if s['name'] in STAGE_ORDER else 99))
+    return traces
+
+
+class Trace:
+    """一个 trace 的汇总视图"""
+
+    def __init__(self, trace_id: str, spans: List[Dict]):
+        self.trace_id = trace_id
+        self.spans = spans
+        self.start = min(s['start'] for s in spans)
+        self.end = max(s['start'] + s['duration'] for s in spans)
+        self.video_id = next((s['video_id'] for s in spans if s.get('video_id')), None)
+        self.channel = next((s['yt_channel'] for s in spans if s.get('yt_channel')), None)
+        self.stages = {s['name'] for s in spans}
+
+    @property
+    def total(self) -> float:
+        return self.end - self.start
+
+    @property
+    def complete(self) -> bool:
+        """已从下载走到发送完成"""
+        return 'download' in self.stages and 'record' in self.stages
+
+    def self_times(self) -> Dict[str, float]:
+        """各阶段独占耗时：父阶段（download）扣除其中的子阶段（transcode）"""
+        times: Dict[str, float] = {}
+        for s in self.spans:
+            times[s['name']] = times.get(s['name'], 0.0) + s['duration']
+        for s in self.spans:
+            parent = s.get('parent')
+            if parent in times:
+                times[parent] = max(times[parent] - s['duration'], 0.0)
+        return times
+
+
+def show_percentiles(traces: List[Trace]) -> None:
+    """各阶段独占耗时分位数（每个 trace 内同名阶段求和，如分片的多次 send）"""
+    per_stage: Dict[str, List[float]] = {}
+    for trace in traces:
+        for name, seconds in trace.self_times().items():
+            per_stage.setdefault(name, []).append(seconds)
+    names = [n for n in STAGE_ORDER if n in per_stage] + sorted(n for n in per_stage if n not in STAGE_ORDER)
+
+    print(f"{'阶段':<12} {'次数':>6} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9} {'合计':>9}")
+    print("-" * 70)
+    for name in names:
+        values = per_stage[name]
+        print(
+            f"{name:<12} {len(values):>6} {fmt_seconds(percentile(values, 50)):>9} "
+            f"{fmt_seconds(percentile(values, 90)):>9} {fmt_seconds(percentile(values, 99)):>9} "
+            f"{fmt_seconds(max(values)):>9} {fmt_seconds(sum(values)):>9}"
+        )
+    complete = [t.total for t in traces if t.complete]
+    if complete:
+        print("-" * 70)
+        print(
+            f"{'端到端':<11} {len(complete):>6} {fmt_seconds(percentile(complete, 50)):>9} "
+            f"{fmt_seconds(percentile(complete, 90)):>9} {fmt_seconds(percentile(complete, 99)):>9} "
+            f"{fmt_seconds(max(complete)):>9}"
+        )
+
+
+def show_recent(traces: List[Trace], limit: int) -> None:
+    print(f"{'开始时间':<16} {'trace_id':<17} {'视频ID':<13} {'频道':<20} {'端到端':>8} {'最慢阶段':<18} 完成")
+    print("-" * 104)
+    for trace in traces[:limit]:
+        times = trace.self_times()
+        slowest, seconds = max(times.items(), key=lambda item: item[1])
+        print(
+            f"{fmt_time(trace.start, with_seconds=True):<16} {trace.trace_id:<17} {str(trace.video_id or '-')[:13]:<13} "
+            f"{str(trace.channel or '-')[:20]:<20} {fmt_seconds(trace.total):>8} "
+            f"{slowest + ' ' + fmt_seconds(seconds):<18} {'✓' if trace.complete else '…'}"
+        )
+
+
+def show_waterfall(trace: Trace, width: int = 50) -> None:
+    """单个 trace 的瀑布图：每个 span 一行，条形位置按开始时间偏移"""
+    total = trace.total or 1e-9
+    print(f"trace {trace.trace_id}  视频 {trace.video_id or '-'}  频道 {trace.channel or '-'}")
+    print(f"开始 {fmt_time(trace.start, with_seconds=True)}  端到端 {fmt_seconds(trace.total)}")
+    print("-" * (width + 42))
+    for s in trace.spans:
+        offset = s['start'] - trace.start
+        begin = min(int(offset / total * width), width - 1)
+        length = max(1, int(round(s['duration'] / total * width)))
+        bar = ' ' * begin + '█' * min(length, width - begin)
+        label = ('  ' if s.get('parent') else '') + s['name']
+        note = s.get('error') or s.get('method') or ''
+        print(f"{label:<12} {fmt_seconds(offset):>8} {fmt_seconds(s['duration']):>8} |{bar:<{width}}| {note}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ChronoLullaby 单集追踪报告')
+    parser.add_argument('--since', type=parse_time, help='只统计此时间之后开始的 trace（YYYY-MM-DD[THH[:MM]]）')
+    parser.add_argument('--until', type=parse_time, help='只统计此时间之前开始的 trace')
+    parser.add_argument('--complete', action='store_true', help='只统计从下载走到发送完成的 trace')
+    parser.add_argument('--recent', type=int, metavar='N', help='最近 N 个 trace 列表')
+    parser.add_argument('--video', help='显示指定视频的瀑布图')
+    parser.add_argument('--trace', help='显示指定 trace 的瀑布图')
+    parser.add_argument('--limit', type=int, default=5, help='--video 匹配多个 trace 时最多显示的数量')
+    args = parser.parse_args()
+
+    project_root = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    logs_dir = project_root / 'logs'
+    if not list_log_files(logs_dir, 'traces.jsonl'):
+        print(f"❌ 追踪文件不存在: {logs_dir / 'traces.jsonl'}")
+        sys.exit(1)
+
+    traces = [Trace(trace_id, spans) for trace_id, spans in load_traces(logs_dir).items()]
+    if args.since is not None:
+        traces = [t for t in traces if t.start >= args.since]
+    if args.until is not None:
+        traces = [t for t in traces if t.start < args.until]
+    if args.complete:
+        traces = [t for t in traces if t.complete]
+    traces.sort(key=lambda t: t.start, reverse=True)
+
+    if args.trace or args.video:
+        matched = [t for t in traces if t.trace_id == args.trace or (args.video and t.video_id == args.video)]
+        if not matched:
+            print("未找到匹配的 trace")
+            return
+        for trace in matched[:args.limit]:
+            show_waterfall(trace)
+        return
+
+    if not traces:
+        print("所选范围内没有 trace")
+        return
+    print(f"📊 {len(traces)} 个 trace，其中 {sum(1 for t in traces if t.complete)} 个已完成发送\n")
+    if args.recent:
+        show_recent(traces, args.recent)
+    else:
+        show_percentiles(traces)
+
+
+if __name__ == '__main__':
+    main()
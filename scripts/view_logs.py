@@ -11,7 +11,16 @@ import os
 import argparse
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict
+from typing import Dict, Iterable, Optional
+
+from log_query import (
+    LogFilter,
+    follow_logs,
+    list_log_files,
+    load_rollup_stats,
+    prune_indexes,
+    query_logs,
+)
 
 # 颜色代码
 COLORS = {
@@ -65,21 +74,33 @@ def format_log_line(log_entry: Dict, raw: bool = False) -> str:
     return line
 
 
-def show_stats(logs: List[Dict]):
+def show_stats(logs: Iterable[Dict]):
     """显示日志统计信息"""
-    total = len(logs)
+    total = 0
     
     # 按级别统计
     by_level = {}
     by_component = {}
     
     for log in logs:
+        total += 1
         level = log.get('level', 'UNKNOWN')
         component = log.get('component', 'unknown')
         
         by_level[level] = by_level.get(level, 0) + 1
         by_component[component] = by_component.get(component, 0) + 1
     
+    print_stats(total, by_level, by_component)
+
+
+def print_stats(total: int, by_level: Dict[str, int], by_component: Dict[str, int],
+                by_error_type: Optional[Dict[str, int]] = None,
+                by_channel: Optional[Dict[str, int]] = None, top: int = 10):
+    """输出统计结果"""
+    if total == 0:
+        print(colorize("未找到匹配的日志", 'WARNING'))
+        return
+    
     print(colorize("\n=== 日志统计 ===", 'INFO'))
     print(f"总日志数: {total}\n")
     
@@ -95,30 +116,26 @@ def show_stats(logs: List[Dict]):
         count = by_component[component]
         percent = (count / total) * 100
         print(colorize(f"  {component:<30}: {count:>6} ({percent:>5.1f}%)", 'GRAY'))
+    
+    for title, counts in (("错误类型", by_error_type), ("频道", by_channel)):
+        if not counts:
+            continue
+        print(colorize(f"\n按{title}统计（前 {top}）:", 'WARNING'))
+        for key in sorted(counts.keys(), key=lambda x: counts[x], reverse=True)[:top]:
+            print(colorize(f"  {key:<30}: {counts[key]:>6}", 'GRAY'))
     print()
 
 
-def read_log_file(file_path: Path) -> List[Dict]:
-    """读取日志文件"""
-    logs = []
-    
-    if not file_path.exists():
-        return logs
-    
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            
-            try:
-                log_entry = json.loads(line)
-                logs.append(log_entry)
-            except json.JSONDecodeError:
-                # 跳过无效的行
-                continue
-    
-    return logs
+def show_rollup_stats(stats: Dict[str, Dict[str, int]]):
+    """显示日志进程维护的统计汇总"""
+    by_level = stats.get('level', {})
+    print_stats(
+        sum(by_level.values()),
+        by_level,
+        stats.get('component', {}),
+        by_error_type=stats.get('error_type'),
+        by_channel=stats.get('channel'),
+    )
 
 
 def main():
@@ -134,6 +151,8 @@ def main():
   python view_logs.py --last 50                # 显示最后 50 条日志
   python view_logs.py --stats                  # 显示统计信息
   python view_logs.py --error-only             # 只显示错误日志
+  python view_logs.py --since 2025-01-02T08    # 只看该时间之后的日志
+  python view_logs.py downloader -F -n 20      # 显示最后 20 条后持续跟踪新日志
         """
     )
     
@@ -151,6 +170,14 @@ def main():
                         help='显示原始 JSON 格式')
     parser.add_argument('--stats', '-s', action='store_true',
                         help='显示日志统计信息')
+    parser.add_argument('--since', type=str,
+                        help='起始时间（ISO 前缀，如 2025-01-02 或 2025-01-02T08）')
+    parser.add_argument('--until', type=str,
+                        help='结束时间（ISO 前缀，含该时间段）')
+    parser.add_argument('--follow', '-F', action='store_true',
+                        help='持续跟踪新日志（跨轮转），过滤条件同样生效')
+    parser.add_argument('--no-index', action='store_true',
+                        help='不使用/更新旁路索引（logs/.index），直接顺序扫描')
     
     args = parser.parse_args()
     
@@ -165,69 +192,41 @@ def main():
         print(colorize(f"错误: 日志目录不存在 {logs_dir}", 'ERROR'))
         sys.exit(1)
     
-    # 选择日志文件
-    log_files = sorted(
-        [f for f in logs_dir.glob('all.log*') if f.is_file()],
-        key=lambda f: f.stat().st_mtime
-    )
+    # 选择日志文件（按轮转顺序：all.log.N ... all.log.1, all.log）
+    log_files = list_log_files(logs_dir)
     
-    if not log_files:
+    if not log_files and not (args.stats and (logs_dir / 'log_stats.db').exists()):
         print(colorize('错误: 未找到日志文件 all.log', 'WARNING'))
         print(colorize('提示: 请先运行任一组件产生日志', 'GRAY'))
         sys.exit(1)
     
+    log_filter = LogFilter(
+        component=args.component,
+        level=args.level,
+        error_only=args.error_only,
+        text=args.filter,
+        since=args.since,
+        until=args.until,
+    )
+    use_index = not args.no_index
+    if use_index:
+        prune_indexes(logs_dir)
     
-    # 读取日志
-    all_logs = []
-    for log_file in log_files:
-        logs = read_log_file(log_file)
-        all_logs.extend(logs)
-    
-    # 应用过滤器
-    def _match_component(component_value: str) -> bool:
-        if args.component == 'all':
-            return True
-        if not component_value:
-            return False
-        normalized = component_value
-        if normalized.startswith('chronolullaby.'):
-            normalized = normalized[len('chronolullaby.'):]
-        if normalized == args.component or component_value == args.component:
-            return True
-        if normalized.startswith(f'{args.component}.'):
-            return True
-        base = normalized.split('.')[0]
-        return base == args.component
-
-    filtered_logs = []
-    for log in all_logs:
-        if not _match_component(log.get('component', '')):
-            continue
-        # 级别过滤
-        if args.level and log.get('level') != args.level:
-            continue
-        
-        # 错误过滤
-        if args.error_only and log.get('level') not in ('ERROR', 'CRITICAL'):
-            continue
-        
-        # 消息过滤
-        if args.filter and args.filter not in log.get('message', ''):
-            continue
-        
-        filtered_logs.append(log)
-    
-    # 按时间排序
-    filtered_logs.sort(key=lambda x: x.get('timestamp', ''))
-    
-    # 显示统计信息
+    # 显示统计信息：只有时间范围条件时直接读取统计汇总，其余条件扫描日志
     if args.stats:
-        show_stats(filtered_logs)
+        only_time_filters = not (args.filter or args.level or args.error_only or args.component != 'all')
+        rollup = load_rollup_stats(logs_dir, args.since, args.until) if only_time_filters and use_index else None
+        if rollup:
+            show_rollup_stats(rollup)
+        else:
+            show_stats(query_logs(log_files, log_filter, use_index=use_index))
         sys.exit(0)
     
-    # 应用 last 参数
-    if args.last and args.last > 0:
-        filtered_logs = filtered_logs[-args.last:]
+    # 流式读取；--last 从末尾倒序读取，凑够条数即停止
+    last = args.last
+    if args.follow and not last:
+        last = 10
+    filtered_logs = query_logs(log_files, log_filter, last=last, use_index=use_index)
     
     # 显示日志
     print(colorize("=== ChronoLullaby 日志查看器 ===", 'INFO'))
@@ -238,14 +237,21 @@ def main():
         print(colorize(f"过滤关键词: {args.filter}", 'GRAY'))
     print()
     
-    if not filtered_logs:
-        print(colorize("未找到匹配的日志", 'WARNING'))
-        sys.exit(0)
-    
+    count = 0
     for log in filtered_logs:
         print(format_log_line(log, args.raw))
+        count += 1
+    
+    if args.follow:
+        print(colorize("--- 持续跟踪中（Ctrl+C 退出）---", 'GRAY'))
+        for log in follow_logs(logs_dir / 'all.log', log_filter):
+            print(format_log_line(log, args.raw), flush=True)
+    
+    if count == 0:
+        print(colorize("未找到匹配的日志", 'WARNING'))
+        sys.exit(0)
     
-    print(colorize(f"\n共 {len(filtered_logs)} 条日志", 'GRAY'))
+    print(colorize(f"\n共 {count} 条日志", 'GRAY'))
 
 
 if __name__ == '__main__':
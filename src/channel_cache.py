@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+YouTube 频道解析缓存
+持久化 handle（如 @foo）到 channel_id / 显示名的映射，
+避免每轮都让 yt-dlp 重新解析 handle
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Optional, Dict, Any
+
+from config import PROJECT_ROOT, get_config_value
+from logger import get_logger
+
+logger = get_logger('downloader.channel_cache')
+
+CHANNEL_CACHE_FILE = os.path.join(PROJECT_ROOT, "data", "channel_cache.json")
+
+# 默认刷新周期：7 天（handle 变更非常少见）
+DEFAULT_CHANNEL_CACHE_TTL = 7 * 24 * 3600
+
+
+class ChannelCache:
+    """handle -> 频道信息 的持久化缓存"""
+
+    def __init__(self, cache_file: str = CHANNEL_CACHE_FILE, ttl: Optional[int] = None):
+        """
+        Args:
+            cache_file: 缓存文件路径
+            ttl: 条目刷新周期（秒），None 时从配置 downloader.channel_cache_ttl 读取
+        """
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    def _get_ttl(self) -> int:
+        if self.ttl is not None:
+            return self.ttl
+        value = get_config_value('downloader.channel_cache_ttl', DEFAULT_CHANNEL_CACHE_TTL)
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return DEFAULT_CHANNEL_CACHE_TTL
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is not None:
+            return self._entries
+        entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    entries = data
+            except Exception as e:
+                logger.warning(f"读取频道缓存失败，已忽略: {e}")
+        self._entries = entries
+        return self._entries
+
+    def _save(self) -> None:
+        if self._entries is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_file = self.cache_file + ".tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            logger.warning(f"保存频道缓存失败: {e}")
+
+    def get(self, channel_name: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        获取频道缓存条目
+
+        Args:
+            channel_name: 配置中的频道名（handle 或 channel/UC... 路径）
+            allow_stale: 是否允许返回已超过 TTL 的条目（如仅用于显示名回退）
+
+        Returns:
+            包含 channel_id / display_name / resolved_at 的字典，或 None
+        """
+        with self._lock:
+            entry = self._load().get(channel_name)
+        if not entry:
+            return None
+        if not allow_stale:
+            resolved_at = entry.get('resolved_at') or 0
+            if time.time() - resolved_at > self._get_ttl():
+                return None
+        return entry
+
+    def update(self, channel_name: str, channel_id: Optional[str] = None,
+               display_name: Optional[str] = None) -> None:
+        """记录一次成功解析的结果（channel_id 为空时只更新显示名）"""
+        if not channel_id and not display_name:
+            return
+        with self._lock:
+            entries = self._load()
+            entry = dict(entries.get(channel_name) or {})
+            changed = False
+            if channel_id and channel_id != entry.get('channel_id'):
+                entry['channel_id'] = channel_id
+                changed = True
+            if channel_id:
+                # 只有真正通过 handle 重新解析（条目缺失/已过期/ID 变化）时才刷新 TTL，
+                # 使用缓存地址拉取列表不会无限续期
+                resolved_at = entry.get('resolved_at') or 0
+                if changed or time.time() - resolved_at > self._get_ttl():
+                    entry['resolved_at'] = int(time.time())
+                    changed = True
+            if display_name and display_name != entry.get('display_name'):
+                entry['display_name'] = display_name
+                changed = True
+            if changed:
+                entries[channel_name] = entry
+                self._save()
+
+    def invalidate(self, channel_name: str) -> None:
+        """删除条目（如缓存的 channel_id 已无法访问）"""
+        with self._lock:
+            entries = self._load()
+            if entries.pop(channel_name, None) is not None:
+                self._save()
+
+    def videos_url(self, channel_name: str, base_url: str) -> str:
+        """
+        构建频道 /videos 页面地址：缓存命中时直接使用 channel/UC... 路径，
+        跳过 handle 解析；否则回退到配置中的原始名称
+        """
+        entry = self.get(channel_name)
+        if entry and entry.get('channel_id'):
+            return f"{base_url}channel/{entry['channel_id']}/videos"
+        return f"{base_url}{channel_name}/videos"
+
+
+_channel_cache: Optional[ChannelCache] = None
+
+
+def get_channel_cache() -> ChannelCache:
+    """获取进程内共享的频道缓存实例"""
+    global _channel_cache
+    if _channel_cache is None:
+        _channel_cache = ChannelCache()
+    return _channel_cache
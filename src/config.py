@@ -12,6 +12,8 @@ if sys.stderr.encoding != 'utf-8':
 
 from dotenv import load_dotenv
 
+from config_watch import FileChangeDetector
+
 # 延迟导入系统日志以避免循环依赖
 _sys_logger = None
 
@@ -44,6 +46,11 @@ ENV_FILE = os.path.join(PROJECT_ROOT, ".env")
 DEBUG_INFO = os.path.join(PROJECT_ROOT, "debug_closest_video.json")
 STORY_FILE = os.path.join(PROJECT_ROOT, "story.txt")
 STORY_PROGRESS_FILE = os.path.join(PROJECT_ROOT, "data", "story_progress.json")
+CONFIG_SNAPSHOT_FILE = os.path.join(PROJECT_ROOT, "data", "config_snapshot.json")
+
+# 进程间共享的频道组快照（见 config_snapshot.py）
+_config_snapshot = None
+_channel_groups_version: Optional[int] = None
 
 # ============================================================
 # 配置源初始化
@@ -159,6 +166,7 @@ def get_config_provider():
 # YAML 配置加载
 # ============================================================
 _config_cache: Optional[Dict[str, Any]] = None
+_config_file_detector = FileChangeDetector(CONFIG_YAML_FILE)
 
 def load_yaml_config(reload: bool = False) -> Optional[Dict[str, Any]]:
     """
@@ -182,10 +190,17 @@ def load_yaml_config(reload: bool = False) -> Optional[Dict[str, Any]]:
         return None
     
     try:
-        with open(CONFIG_YAML_FILE, 'r', encoding='utf-8') as f:
-            _config_cache = yaml.safe_load(f)
+        # reload 时先检测变更：mtime/size 与内容哈希都未变则沿用已解析的配置
+        changed, content = _config_file_detector.check()
+        if not changed and _config_cache is not None:
             return _config_cache
+        if content is None:
+            with open(CONFIG_YAML_FILE, 'rb') as f:
+                content = f.read()
+        _config_cache = yaml.safe_load(content.decode('utf-8'))
+        return _config_cache
     except Exception as e:
+        _config_file_detector.reset()
         print(f"警告：加载 config.yaml 失败: {e}")
         print("将回退到使用 channels.txt 和 .env")
         return None
@@ -374,8 +389,36 @@ def get_all_channel_groups(use_cache: bool = True) -> List[Dict[str, Any]]:
     Returns:
         频道组列表
     """
+    global _channel_groups_version
     provider = get_config_provider()
-    return provider.get_channel_groups(use_cache=use_cache)
+    if use_cache and _channel_groups_version is not None:
+        return provider.get_channel_groups(use_cache=True)
+    if not get_config_value('config_snapshot.enabled', True):
+        return provider.get_channel_groups(use_cache=use_cache)
+
+    # 与其他进程共享同一份频道组快照，过期后只有一个进程真正重新加载
+    not_before = 0.0
+    if getattr(provider, 'config_file', None) and os.path.exists(provider.config_file):
+        not_before = os.path.getmtime(provider.config_file)
+    entry = _get_config_snapshot().get_or_refresh(
+        'channel_groups',
+        lambda: provider.get_channel_groups(use_cache=False),
+        max_age=get_config_check_interval(),
+        not_before=not_before,
+    )
+    groups = entry.get('value') or []
+    if entry.get('writer_pid') != os.getpid() or entry.get('version') != _channel_groups_version:
+        provider.adopt_channel_groups(groups)
+    _channel_groups_version = entry.get('version')
+    return groups
+
+
+def _get_config_snapshot():
+    global _config_snapshot
+    if _config_snapshot is None:
+        from config_snapshot import ConfigSnapshot
+        _config_snapshot = ConfigSnapshot(CONFIG_SNAPSHOT_FILE)
+    return _config_snapshot
 
 # ============================================================
 # 初始化
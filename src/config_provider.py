@@ -18,6 +18,8 @@ import yaml
 
 import json
 
+import time
+
 from abc import ABC, abstractmethod
 
 from typing import Optional, Dict, Any, List
@@ -26,6 +28,8 @@ from datetime import datetime, timezone
 
 from pathlib import Path
 
+from config_watch import FileChangeDetector
+
 
 
 # 设置默认编码为UTF-8
@@ -40,6 +44,22 @@ if sys.stderr.encoding != 'utf-8':
 
 
 
+# 故事进度在状态存储中的命名空间
+
+STORY_PROGRESS_NAMESPACE = "story_progress"
+
+
+
+def _get_state_store():
+
+    """延迟导入状态存储（避免与 config 模块循环导入）"""
+
+    from state_store import get_state_store
+
+    return get_state_store()
+
+
+
 # 系统日志（延迟初始化）
 
 _sys_logger = None
@@ -371,6 +391,14 @@ class BaseConfigProvider(ABC):
 
 
 
+    def adopt_channel_groups(self, groups: List[Dict[str, Any]]) -> None:
+
+        """接收由其他进程加载的频道组（共享配置快照），默认只作为缓存"""
+
+        self._channel_groups_cache = groups
+
+
+
 
 
 class LocalConfigProvider(BaseConfigProvider):
@@ -407,7 +435,13 @@ class LocalConfigProvider(BaseConfigProvider):
 
         self._channel_groups_cache: Optional[List[Dict[str, Any]]] = None
 
-        self._story_progress_cache: Optional[Dict[str, Any]] = None
+        self._config_detector = FileChangeDetector(self.config_file)
+
+        # (配置内容哈希, 处理后的频道组)：配置未变时强制刷新也直接返回
+
+        self._processed_groups: Optional[tuple] = None
+
+        self._story_progress_migrated = False
 
         self._story_progress_file = Path(self.project_root) / "data" / "story_progress.json"
 
@@ -431,14 +465,28 @@ class LocalConfigProvider(BaseConfigProvider):
 
         try:
 
-            with open(self.config_file, 'r', encoding='utf-8') as f:
+            # 先检测变更：mtime/size 与内容哈希都未变则沿用已解析的配置
 
-                self._config_cache = yaml.safe_load(f)
+            changed, content = self._config_detector.check()
+
+            if not changed and self._config_cache is not None:
 
                 return self._config_cache
 
+            if content is None:
+
+                with open(self.config_file, 'rb') as f:
+
+                    content = f.read()
+
+            self._config_cache = yaml.safe_load(content.decode('utf-8'))
+
+            return self._config_cache
+
         except Exception as e:
 
+            self._config_detector.reset()
+
             print(f"警告：加载配置文件失败: {e}")
 
             return None
@@ -481,6 +529,13 @@ class LocalConfigProvider(BaseConfigProvider):
             return self._channel_groups_cache
 
         raw_groups = self._get_config_value('channel_groups', [], reload=not use_cache) or []
+        content_hash = self._config_detector.content_hash
+        if self._processed_groups is not None and content_hash and self._processed_groups[0] == content_hash:
+            processed = self._processed_groups[1]
+            if use_cache:
+                self._channel_groups_cache = processed
+            return processed
+
         processed: List[Dict[str, Any]] = []
 
         for group in raw_groups:
@@ -495,6 +550,8 @@ class LocalConfigProvider(BaseConfigProvider):
 
             processed.append(grp)
 
+        if content_hash:
+            self._processed_groups = (content_hash, processed)
         if use_cache:
             self._channel_groups_cache = processed
 
@@ -871,15 +928,15 @@ class LocalConfigProvider(BaseConfigProvider):
 
 
 
-    def _load_story_progress(self) -> Dict[str, Any]:
-
-        """加载故事型频道进度缓存"""
+    def _migrate_story_progress(self):
 
-        if self._story_progress_cache is not None:
+        """首次使用状态存储时导入旧的 story_progress.json（每个实例只检查一次）"""
 
-            return self._story_progress_cache
+        if self._story_progress_migrated:
 
+            return
 
+        self._story_progress_migrated = True
 
         progress: Dict[str, Any] = {}
 
@@ -897,39 +954,24 @@ class LocalConfigProvider(BaseConfigProvider):
 
             progress = {}
 
-
-
-        self._story_progress_cache = progress
-
-        return self._story_progress_cache
-
-
-
-    def _save_story_progress(self):
-
-        if self._story_progress_cache is None:
-
-            return
-
         try:
 
-            self._story_progress_file.parent.mkdir(parents=True, exist_ok=True)
+            if _get_state_store().import_if_empty(STORY_PROGRESS_NAMESPACE, {k: v for k, v in progress.items() if v}):
 
-            with open(self._story_progress_file, "w", encoding="utf-8") as f:
-
-                json.dump(self._story_progress_cache, f, ensure_ascii=False, indent=2)
+                print(f"已将 {self._story_progress_file} 迁移到状态存储")
 
         except Exception as e:
 
-            print(f"警告：保存故事进度失败: {e}")
+            print(f"警告：迁移故事进度失败: {e}")
 
 
 
     def get_story_progress(self, group_name: str) -> Dict[str, Any]:
-        # 优先从 story_progress.json 读取
-        progress = self._load_story_progress()
-        if group_name in progress and progress[group_name]:
-            return progress[group_name]
+        # 优先从状态存储读取
+        self._migrate_story_progress()
+        stored = _get_state_store().get(STORY_PROGRESS_NAMESPACE, group_name)
+        if stored:
+            return stored
         
         # 如果没有，尝试从 config.yaml 的 channel_groups 读取初始进度
         channel_groups = self.get_channel_groups()
@@ -950,15 +992,21 @@ class LocalConfigProvider(BaseConfigProvider):
 
     def update_story_progress(self, group_name: str, progress: Dict[str, Any]) -> bool:
 
-        cache = self._load_story_progress()
+        # 单组事务合并，只更新传入的字段（与 Notion 模式一致）
 
-        cache[group_name] = progress
+        self._migrate_story_progress()
 
-        self._story_progress_cache = cache
+        try:
+
+            _get_state_store().merge(STORY_PROGRESS_NAMESPACE, group_name, progress)
 
-        self._save_story_progress()
+            return True
 
-        return True
+        except Exception as e:
+
+            print(f"警告：保存故事进度失败: {e}")
+
+            return False
 
 
 
@@ -999,6 +1047,18 @@ class NotionConfigProvider(BaseConfigProvider):
         self._sent_archives_cache: Dict[str, set] = {}
 
         self._channel_page_id_map: Dict[str, str] = {}
+
+        # 故事进度快照：group_name -> {progress, version(last_edited_time), fetched_at}
+
+        self._story_progress_snapshot: Dict[str, Dict[str, Any]] = {}
+
+        # 频道组快照与同步时间（用于 last_edited_time 增量查询）
+
+        self._groups_snapshot: Optional[List[Dict[str, Any]]] = None
+
+        self._groups_synced_at: Optional[float] = None
+
+        self._groups_full_synced_at: float = 0.0
     
 
     def _load_global_settings(self) -> Dict[str, Any]:
@@ -1210,7 +1270,13 @@ class NotionConfigProvider(BaseConfigProvider):
     
 
     def get_channel_groups(self, use_cache: bool = True) -> List[Dict[str, Any]]:
-        """获取所有频道组配置"""
+        """
+        获取所有频道组配置
+
+        use_cache=False 时做变更检测：只查询上次同步后编辑过的页面并合并到快照，
+        没有变化时直接返回快照；每隔 notion.sync.full_resync_interval 做一次完整查询，
+        以发现被删除/归档的页面
+        """
         if use_cache and self._channel_groups_cache is not None:
             return self._channel_groups_cache
 
@@ -1219,62 +1285,44 @@ class NotionConfigProvider(BaseConfigProvider):
             return []
 
         try:
-            pages = self.adapter.query_database(database_id)
-            groups = []
-            self._channel_page_id_map = {}
-
-            for page in pages:
-                name = self.adapter.extract_property_value(page, 'name')
-                description = self.adapter.extract_property_value(page, 'description')
-                enabled = self.adapter.extract_property_value(page, 'enabled')
-                chat_id = self.adapter.extract_property_value(page, 'telegram_chat_id')
-                audio_folder = self.adapter.extract_property_value(page, 'audio_folder')
-                youtube_channels_data = self.adapter.extract_property_value(page, 'youtube_channels')
-                channel_type = self.adapter.extract_property_value(page, 'channel_type') or 'realtime'
-                story_last_video_id = self.adapter.extract_property_value(page, 'story_last_video_id')
-                story_last_timestamp = self.adapter.extract_property_value(page, 'story_last_timestamp')
-                story_interval_seconds = self.adapter.extract_property_value(page, 'story_interval_seconds')
-                story_items_per_run = self.adapter.extract_property_value(page, 'story_items_per_run')
-                story_last_run_ts = self.adapter.extract_property_value(page, 'story_last_run_ts')
-                story_last_run_ts = self.adapter.extract_property_value(page, 'story_last_run_ts')
-
-                youtube_channels = []
-                if isinstance(youtube_channels_data, list):
-                    youtube_channels = [ch.strip() for ch in youtube_channels_data if ch and ch.strip()]
-                elif isinstance(youtube_channels_data, str):
-                    youtube_channels = [ch.strip() for ch in youtube_channels_data.split('\n') if ch.strip()]
-                normalized_type = 'story' if str(channel_type).lower() == 'story' else 'realtime'
-
-                group = {
-                    'name': name or '',
-                    'description': description or '',
-                    'enabled': enabled if enabled is not None else True,
-                    'telegram_chat_id': chat_id or '',
-                    'audio_folder': audio_folder or '',
-                    'youtube_channels': youtube_channels,
-                    'channel_type': normalized_type,
-                    'story_interval_seconds': int(story_interval_seconds or 86400),
-                    'story_items_per_run': int(story_items_per_run or 1),
-                    'story_last_run_ts': int(story_last_run_ts) if story_last_run_ts is not None else None,
-                }
-
-                if normalized_type == 'story':
-                    if story_last_video_id:
-                        group['story_last_video_id'] = story_last_video_id
-                    if story_last_timestamp is not None:
-                        try:
-                            group['story_last_timestamp'] = int(story_last_timestamp)
-                        except Exception:
-                            pass
-
-                page_id = page.get('id') if isinstance(page, dict) else None
-                if page_id:
-                    group['_notion_page_id'] = page_id
-                    if name:
-                        self._channel_page_id_map[name] = page_id
-
-                groups.append(group)
+            now_ts = time.time()
+            full_resync_interval = int((self.config_data.get('sync') or {}).get('full_resync_interval', 6 * 3600))
+            incremental = (
+                self._groups_snapshot is not None
+                and self._groups_synced_at is not None
+                and now_ts - self._groups_full_synced_at < full_resync_interval
+            )
+            if incremental:
+                # last_edited_time 只精确到分钟，回退一分钟避免漏掉同一分钟内的编辑
+                since = datetime.fromtimestamp(self._groups_synced_at - 60, tz=timezone.utc)
+                pages = self.adapter.query_database(database_id, filter_obj={
+                    "timestamp": "last_edited_time",
+                    "last_edited_time": {"on_or_after": since.isoformat()},
+                })
+                self._groups_synced_at = now_ts
+                # 未出现在增量结果中的页面视为仍是最新，顺延故事进度快照的有效期
+                for entry in self._story_progress_snapshot.values():
+                    entry['fetched_at'] = now_ts
+                if not pages:
+                    groups = self._groups_snapshot
+                else:
+                    updated = {}
+                    for page in pages:
+                        group = self._parse_group_page(page)
+                        updated[group.get('_notion_page_id') or group['name']] = group
+                    groups = []
+                    for group in self._groups_snapshot:
+                        key = group.get('_notion_page_id') or group['name']
+                        groups.append(updated.pop(key, group))
+                    groups.extend(updated.values())
+            else:
+                pages = self.adapter.query_database(database_id)
+                self._channel_page_id_map = {}
+                groups = [self._parse_group_page(page) for page in pages]
+                self._groups_synced_at = now_ts
+                self._groups_full_synced_at = now_ts
 
+            self._groups_snapshot = groups
             if use_cache:
                 self._channel_groups_cache = groups
 
@@ -1282,6 +1330,82 @@ class NotionConfigProvider(BaseConfigProvider):
         except Exception as e:
             print(f"警告：从 Notion 获取频道分组失败: {e}")
             return []
+
+    def adopt_channel_groups(self, groups: List[Dict[str, Any]]) -> None:
+        """接收共享快照中的频道组：重建页面 ID 映射，使进度写回等操作无需重新查询"""
+        self._channel_groups_cache = groups
+        for group in groups:
+            name = group.get('name')
+            page_id = group.get('_notion_page_id')
+            if name and page_id:
+                self._channel_page_id_map[name] = page_id
+            if name and group.get('channel_type') == 'story':
+                self._remember_story_progress(name, {}, {
+                    'last_video_id': group.get('story_last_video_id'),
+                    'last_timestamp': group.get('story_last_timestamp'),
+                    'last_run_ts': group.get('story_last_run_ts'),
+                })
+
+    def _parse_group_page(self, page: Dict[str, Any]) -> Dict[str, Any]:
+        """把配置库中的一页解析为频道组配置（同时更新页面 ID 映射与故事进度快照）"""
+        name = self.adapter.extract_property_value(page, 'name')
+        description = self.adapter.extract_property_value(page, 'description')
+        enabled = self.adapter.extract_property_value(page, 'enabled')
+        chat_id = self.adapter.extract_property_value(page, 'telegram_chat_id')
+        audio_folder = self.adapter.extract_property_value(page, 'audio_folder')
+        youtube_channels_data = self.adapter.extract_property_value(page, 'youtube_channels')
+        channel_type = self.adapter.extract_property_value(page, 'channel_type') or 'realtime'
+        story_last_video_id = self.adapter.extract_property_value(page, 'story_last_video_id')
+        story_last_timestamp = self.adapter.extract_property_value(page, 'story_last_timestamp')
+        story_interval_seconds = self.adapter.extract_property_value(page, 'story_interval_seconds')
+        story_items_per_run = self.adapter.extract_property_value(page, 'story_items_per_run')
+        story_last_run_ts = self.adapter.extract_property_value(page, 'story_last_run_ts')
+        story_last_run_ts = self.adapter.extract_property_value(page, 'story_last_run_ts')
+
+        youtube_channels = []
+        if isinstance(youtube_channels_data, list):
+            youtube_channels = [ch.strip() for ch in youtube_channels_data if ch and ch.strip()]
+        elif isinstance(youtube_channels_data, str):
+            youtube_channels = [ch.strip() for ch in youtube_channels_data.split('\n') if ch.strip()]
+        normalized_type = 'story' if str(channel_type).lower() == 'story' else 'realtime'
+
+        group = {
+            'name': name or '',
+            'description': description or '',
+            'enabled': enabled if enabled is not None else True,
+            'telegram_chat_id': chat_id or '',
+            'audio_folder': audio_folder or '',
+            'youtube_channels': youtube_channels,
+            'channel_type': normalized_type,
+            'story_interval_seconds': int(story_interval_seconds or 86400),
+            'story_items_per_run': int(story_items_per_run or 1),
+            'story_last_run_ts': int(story_last_run_ts) if story_last_run_ts is not None else None,
+        }
+
+        if normalized_type == 'story':
+            if story_last_video_id:
+                group['story_last_video_id'] = story_last_video_id
+            if story_last_timestamp is not None:
+                try:
+                    group['story_last_timestamp'] = int(story_last_timestamp)
+                except Exception:
+                    pass
+
+        page_id = page.get('id') if isinstance(page, dict) else None
+        if page_id:
+            group['_notion_page_id'] = page_id
+            if name:
+                self._channel_page_id_map[name] = page_id
+
+        if normalized_type == 'story' and name:
+            self._remember_story_progress(name, page, {
+                'last_video_id': group.get('story_last_video_id'),
+                'last_timestamp': group.get('story_last_timestamp'),
+                'last_run_ts': group.get('story_last_run_ts'),
+            })
+
+        return group
+
     def get_telegram_token(self, group_index: int = 0) -> Optional[str]:
 
         """��ȡ Telegram Bot Token"""
@@ -1777,7 +1901,46 @@ class NotionConfigProvider(BaseConfigProvider):
         return list(self._load_sent_archive(chat_id))
 
 
+    def _remember_story_progress(self, group_name: str, page: Dict[str, Any],
+                                 progress: Dict[str, Any], written: bool = False) -> None:
+        """
+        记录故事进度快照；页面版本（last_edited_time）比已有快照旧时忽略，
+        避免查询结果滞后覆盖刚写入的进度。
+        last_edited_time 只精确到分钟，与自己写入同一分钟的版本再比较属性值：
+        与写入前的进度相同视为滞后的查询结果，否则是用户在同一分钟内的编辑
+        """
+        version = page.get('last_edited_time') if isinstance(page, dict) else None
+        progress = {k: v for k, v in progress.items() if v is not None}
+        current = self._story_progress_snapshot.get(group_name)
+        previous = current.get('progress') if current else None
+        if current and not written and current.get('written'):
+            current_version = current.get('version')
+            if version is None or (current_version is not None and version < current_version):
+                return
+            if version == current_version and progress in (current['progress'], current.get('previous')):
+                return
+        self._story_progress_snapshot[group_name] = {
+            'progress': progress,
+            'previous': previous if written else None,
+            'version': version,
+            'fetched_at': time.time(),
+            'written': written,
+        }
+
+    def _get_story_progress_snapshot(self, group_name: str) -> Optional[Dict[str, Any]]:
+        """返回未过期的故事进度快照（有效期为一个配置检查周期）"""
+        entry = self._story_progress_snapshot.get(group_name)
+        if not entry:
+            return None
+        if time.time() - entry['fetched_at'] > self.get_config_check_interval():
+            return None
+        return dict(entry['progress'])
+
     def get_story_progress(self, group_name: str) -> Dict[str, Any]:
+        # 同一调度周期内 get_channel_groups 已查询整个配置库，直接使用快照
+        snapshot = self._get_story_progress_snapshot(group_name)
+        if snapshot is not None:
+            return snapshot
         page_id = self._channel_page_id_map.get(group_name)
         if not page_id:
             return {}
@@ -1800,6 +1963,7 @@ class NotionConfigProvider(BaseConfigProvider):
                     progress['last_run_ts'] = int(last_run_ts)
                 except Exception:
                     pass
+            self._remember_story_progress(group_name, page, progress)
             return progress
         except Exception as e:
             print(f"警告：从 Notion 获取故事进度失败: {e}")
@@ -1828,7 +1992,11 @@ class NotionConfigProvider(BaseConfigProvider):
         if not properties:
             return False
         try:
-            self.adapter.update_page(page_id, properties)
+            page = self.adapter.update_page(page_id, properties)
+            # 写穿快照：与 Notion 相同只合并传入的字段
+            merged = dict((self._story_progress_snapshot.get(group_name) or {}).get('progress') or {})
+            merged.update({k: v for k, v in progress.items() if k in ('last_video_id', 'last_timestamp', 'last_run_ts')})
+            self._remember_story_progress(group_name, page, merged, written=True)
             return True
         except Exception as e:
             print(f"警告：更新 Notion 故事进度失败: {e}")
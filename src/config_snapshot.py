@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+进程间共享的配置快照
+launcher 分别启动的下载器和机器人进程共用 data/config_snapshot.json：
+快照仍新鲜时直接读取，过期后由抢到写锁的进程刷新并原子替换，
+其他进程读到同一个版本，Notion / YAML 的加载开销只付一次。
+
+使用普通文件 + 原子替换 + 锁文件实现，Windows 与 Linux 行为一致。
+"""
+
+import os
+import json
+import time
+from typing import Any, Callable, Dict, Optional
+
+from config_watch import FileChangeDetector
+
+# 写锁超过该秒数视为持有者已崩溃，可被接管
+LOCK_STALE_SECONDS = 120
+# 未抢到写锁时等待其他进程写入新快照的最长时间
+WAIT_FOR_WRITER_SECONDS = 30
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    except Exception:
+        # Windows 上 os.kill(pid, 0) 不可用于探测，按存活处理，依赖超时接管
+        return True
+    return True
+
+
+class ConfigSnapshot:
+    """共享配置快照：section -> {version, written_at, writer_pid, value}"""
+
+    def __init__(self, snapshot_file: str):
+        self.snapshot_file = snapshot_file
+        self.lock_file = snapshot_file + ".lock"
+        self._detector = FileChangeDetector(snapshot_file)
+        self._data: Dict[str, Any] = {}
+
+    # ---------- 读取 ----------
+
+    def _read(self) -> Dict[str, Any]:
+        """读取快照文件（文件未变化时复用上次解析结果）"""
+        try:
+            changed, content = self._detector.check()
+        except OSError:
+            return self._data
+        if changed:
+            try:
+                self._data = json.loads(content.decode('utf-8')) if content else {}
+            except ValueError:
+                # 正在被替换或已损坏：下次重新读取
+                self._detector.reset()
+                self._data = {}
+        return self._data
+
+    def get_section(self, section: str) -> Optional[Dict[str, Any]]:
+        entry = self._read().get(section)
+        return entry if isinstance(entry, dict) else None
+
+    def get_fresh(self, section: str, max_age: float, not_before: float = 0) -> Optional[Dict[str, Any]]:
+        """返回未超过 max_age 秒、且写入时间不早于 not_before 的快照条目"""
+        entry = self.get_section(section)
+        if not entry:
+            return None
+        written_at = float(entry.get('written_at') or 0)
+        if time.time() - written_at > max_age or written_at < not_before:
+            return None
+        return entry
+
+    # ---------- 写入 ----------
+
+    def _acquire_lock(self) -> bool:
+        os.makedirs(os.path.dirname(self.lock_file), exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if self._lock_is_stale():
+                    try:
+                        os.remove(self.lock_file)
+                    except OSError:
+                        pass
+                    continue
+                return False
+            with os.fdopen(fd, 'w') as f:
+                f.write(f"{os.getpid()} {time.time()}")
+            return True
+        return False
+
+    def _lock_is_stale(self) -> bool:
+        try:
+            with open(self.lock_file, 'r') as f:
+                pid_text, ts_text = (f.read().split() + ['0', '0'])[:2]
+            pid, locked_at = int(pid_text), float(ts_text)
+        except (OSError, ValueError):
+            return True
+        return time.time() - locked_at > LOCK_STALE_SECONDS or not _pid_alive(pid)
+
+    def _release_lock(self) -> None:
+        try:
+            os.remove(self.lock_file)
+        except OSError:
+            pass
+
+    def _write_section(self, section: str, value: Any) -> Dict[str, Any]:
+        data = dict(self._read())
+        previous = data.get(section) if isinstance(data.get(section), dict) else {}
+        entry = {
+            'version': int(previous.get('version') or 0) + 1,
+            'written_at': time.time(),
+            'writer_pid': os.getpid(),
+            'value': value,
+        }
+        data[section] = entry
+        tmp_file = f"{self.snapshot_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_file, self.snapshot_file)
+        self._data = data
+        return entry
+
+    def get_or_refresh(self, section: str, loader: Callable[[], Any], max_age: float,
+                       not_before: float = 0) -> Dict[str, Any]:
+        """
+        读取共享快照；过期时由当前进程刷新（抢到写锁）或等待其他进程刷新
+
+        Args:
+            section: 快照分区名（如 channel_groups）
+            loader: 实际加载配置的函数
+            max_age: 快照有效期（秒）
+            not_before: 早于该时间写入的快照视为过期（如配置文件的修改时间）
+
+        Returns:
+            快照条目 {version, written_at, writer_pid, value}
+        """
+        entry = self.get_fresh(section, max_age, not_before)
+        if entry is not None:
+            return entry
+
+        if self._acquire_lock():
+            try:
+                # 抢锁期间可能已有其他进程写入
+                entry = self.get_fresh(section, max_age, not_before)
+                if entry is not None:
+                    return entry
+                value = loader()
+                try:
+                    return self._write_section(section, value)
+                except Exception as e:
+                    print(f"警告：写入共享配置快照失败: {e}")
+                    return {'version': 0, 'written_at': time.time(), 'writer_pid': os.getpid(), 'value': value}
+            finally:
+                self._release_lock()
+
+        # 其他进程正在刷新：等待新快照，超时后自行加载（不写入）
+        deadline = time.time() + WAIT_FOR_WRITER_SECONDS
+        while time.time() < deadline:
+            time.sleep(0.5)
+            entry = self.get_fresh(section, max_age, not_before)
+            if entry is not None:
+                return entry
+            if not os.path.exists(self.lock_file):
+                break
+        entry = self.get_fresh(section, max_age, not_before)
+        if entry is not None:
+            return entry
+        return {'version': 0, 'written_at': time.time(), 'writer_pid': os.getpid(), 'value': loader()}
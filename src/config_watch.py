@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+配置变更检测
+- 文件：先比较 mtime/size/inode，变化后再比较内容哈希，内容未变时沿用已解析的结果
+- 频道组：按组名计算新增/删除/变更的结构化差异，并通知订阅者
+
+注意：本模块不依赖 config / logger，避免与最底层的配置加载形成循环导入。
+"""
+
+import os
+import hashlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class FileChangeDetector:
+    """单个配置文件的变更检测"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._stat_signature: Optional[Tuple[int, int, int]] = None
+        self.content_hash: Optional[str] = None
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        # 原子替换会改变 inode，即使 mtime/size 恰好相同也能发现
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def check(self) -> Tuple[bool, Optional[bytes]]:
+        """
+        检查文件是否变化
+
+        Returns:
+            (changed, content)：changed 为 True 时 content 为新内容（文件不存在时为 None）；
+            mtime/size 未变或内容哈希未变时返回 (False, None)
+        """
+        signature = self._stat()
+        if signature is not None and signature == self._stat_signature:
+            return False, None
+        if signature is None:
+            changed = self._stat_signature is not None or self.content_hash is not None
+            self._stat_signature = None
+            self.content_hash = None
+            return changed, None
+        with open(self.path, 'rb') as f:
+            content = f.read()
+        content_hash = hashlib.sha1(content).hexdigest()
+        self._stat_signature = signature
+        if content_hash == self.content_hash:
+            return False, None
+        self.content_hash = content_hash
+        return True, content
+
+    def reset(self) -> None:
+        """清除记录，下一次 check 必然返回变化"""
+        self._stat_signature = None
+        self.content_hash = None
+
+
+def diff_channel_groups(old_groups: List[Dict[str, Any]],
+                        new_groups: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """
+    按组名比较两份频道组配置
+
+    Returns:
+        {'added': [...], 'removed': [...], 'changed': [...]}（组名列表）
+    """
+    old_map = {g.get('name'): g for g in old_groups or []}
+    new_map = {g.get('name'): g for g in new_groups or []}
+    return {
+        'added': [name for name in new_map if name not in old_map],
+        'removed': [name for name in old_map if name not in new_map],
+        'changed': [
+            name for name, group in new_map.items()
+            if name in old_map and old_map[name] != group
+        ],
+    }
+
+
+def has_changes(diff: Optional[Dict[str, List[str]]]) -> bool:
+    return bool(diff) and any(diff.get(key) for key in ('added', 'removed', 'changed'))
+
+
+_listeners: List[Callable[[Dict[str, List[str]], List[Dict[str, Any]]], None]] = []
+
+
+def add_config_listener(callback: Callable[[Dict[str, List[str]], List[Dict[str, Any]]], None]) -> None:
+    """订阅频道组变更：callback(diff, groups)"""
+    if callback not in _listeners:
+        _listeners.append(callback)
+
+
+def remove_config_listener(callback) -> None:
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+
+def publish_config_diff(diff: Dict[str, List[str]], groups: List[Dict[str, Any]]) -> None:
+    """通知所有订阅者（单个订阅者出错不影响其他订阅者）"""
+    for callback in list(_listeners):
+        try:
+            callback(diff, groups)
+        except Exception as e:
+            print(f"警告：配置变更回调执行失败: {e}")
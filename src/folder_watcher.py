@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+音频目录监听
+新的音频文件出现时立即通知对应频道组的发送任务，而不是等到下一次轮询。
+
+- 安装了 watchdog（可选依赖 watch）时使用系统文件通知（Linux inotify / Windows ReadDirectoryChangesW / macOS FSEvents）
+- 否则回退为轮询目录的 mtime（只 stat 目录本身，不列出文件）
+"""
+
+import os
+import threading
+from typing import Callable, Dict, Optional
+
+from logger import get_logger
+
+logger = get_logger('bot.folder_watcher')
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
+
+
+def is_sendable_file_name(file_name: str) -> bool:
+    """与发送任务相同的过滤规则：忽略隐藏文件和 .tmp 临时文件"""
+    return (
+        bool(file_name)
+        and not file_name.startswith('.')
+        and not file_name.endswith('.tmp')
+        and '.tmp.' not in file_name
+        and not file_name.endswith('.part')
+    )
+
+
+class _AudioEventHandler(FileSystemEventHandler):
+    def __init__(self, watcher: 'FolderWatcher', folder: str):
+        super().__init__()
+        self.watcher = watcher
+        self.folder = folder
+
+    def _handle(self, path: Optional[str]) -> None:
+        if path and is_sendable_file_name(os.path.basename(path)):
+            self.watcher._notify(self.folder)
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._handle(event.src_path)
+
+    def on_moved(self, event):
+        # 下载器先写 .tmp 再重命名，重命名的目标才是可发送文件
+        if not event.is_directory:
+            self._handle(getattr(event, 'dest_path', None))
+
+
+class FolderWatcher:
+    """
+    监听多个音频目录，目录出现可发送文件时调用 on_change(group_name)
+
+    on_change 在监听线程中调用，调用方负责切换回事件循环（如 loop.call_soon_threadsafe）
+    """
+
+    def __init__(self, on_change: Callable[[str], None], poll_interval: float = 5.0):
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self._folders: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._observer = None
+        self._watches: Dict[str, object] = {}
+        self._poll_thread: Optional[threading.Thread] = None
+        self._poll_mtimes: Dict[str, Optional[int]] = {}
+        self._stop_event = threading.Event()
+
+    @property
+    def mode(self) -> str:
+        return "watchdog" if WATCHDOG_AVAILABLE else "polling"
+
+    def start(self) -> None:
+        self._stop_event.clear()
+        if WATCHDOG_AVAILABLE:
+            self._observer = Observer()
+            self._observer.daemon = True
+            self._observer.start()
+        else:
+            self._poll_thread = threading.Thread(target=self._poll_loop, name="folder-watcher", daemon=True)
+            self._poll_thread.start()
+        logger.info(f"👀 音频目录监听已启动 (模式: {self.mode})")
+        if not WATCHDOG_AVAILABLE:
+            logger.info(
+                f"未安装 watchdog，每 {self.poll_interval} 秒轮询一次目录；"
+                f"uv sync --extra watch 后改用系统文件通知"
+            )
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+
+    def set_folders(self, folders: Dict[str, str]) -> None:
+        """
+        更新监听目录
+
+        Args:
+            folders: 音频目录 -> 频道组名
+        """
+        normalized = {os.path.abspath(folder): group for folder, group in folders.items() if folder}
+        with self._lock:
+            removed = [f for f in self._folders if f not in normalized]
+            added = [f for f in normalized if f not in self._folders]
+            self._folders = normalized
+            for folder in removed:
+                self._poll_mtimes.pop(folder, None)
+                watch = self._watches.pop(folder, None)
+                if watch is not None and self._observer is not None:
+                    try:
+                        self._observer.unschedule(watch)
+                    except Exception:
+                        pass
+            for folder in added:
+                if self._observer is not None:
+                    try:
+                        os.makedirs(folder, exist_ok=True)
+                        self._watches[folder] = self._observer.schedule(
+                            _AudioEventHandler(self, folder), folder, recursive=False
+                        )
+                    except Exception as e:
+                        logger.warning(f"无法监听目录 {folder}: {e}")
+                else:
+                    self._poll_mtimes[folder] = self._dir_mtime(folder)
+
+    def _notify(self, folder: str) -> None:
+        with self._lock:
+            group_name = self._folders.get(folder)
+        if group_name is None:
+            return
+        try:
+            self.on_change(group_name)
+        except Exception as e:
+            logger.warning(f"目录变化回调失败 ({group_name}): {e}")
+
+    @staticmethod
+    def _dir_mtime(folder: str) -> Optional[int]:
+        try:
+            return os.stat(folder).st_mtime_ns
+        except OSError:
+            return None
+
+    def _poll_loop(self) -> None:
+        while not self._stop_event.wait(self.poll_interval):
+            with self._lock:
+                folders = list(self._poll_mtimes.keys())
+            for folder in folders:
+                mtime = self._dir_mtime(folder)
+                with self._lock:
+                    if folder not in self._poll_mtimes:
+                        continue
+                    changed = mtime is not None and mtime != self._poll_mtimes[folder]
+                    self._poll_mtimes[folder] = mtime
+                if changed:
+                    self._notify(folder)
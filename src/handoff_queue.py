@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+下载器 -> Bot 的本地交接队列
+下载器在音频文件落盘（重命名为正式文件名）后登记完整元数据，
+Bot 发送时直接使用这些元数据，不再从文件名反解析频道/视频ID/标题。
+
+基于 WAL 模式 SQLite，两个进程可同时读写；Windows 与 Linux 行为一致。
+文件系统仍是唯一的事实来源：队列里没有的文件照常按文件名解析发送。
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+from config import PROJECT_ROOT
+
+HANDOFF_DB_FILE = os.path.join(PROJECT_ROOT, "data", "handoff.db")
+
+
+def _normalize_path(file_path: str) -> str:
+    return os.path.normcase(os.path.abspath(file_path))
+
+
+class HandoffQueue:
+    """file ready 消息队列：以文件绝对路径为键"""
+
+    def __init__(self, db_path: str = HANDOFF_DB_FILE):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ready_files ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " path TEXT NOT NULL UNIQUE,"
+            " folder TEXT NOT NULL,"
+            " metadata TEXT NOT NULL,"
+            " ready_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ready_files_folder ON ready_files (folder, id)")
+        self._conn = conn
+        return conn
+
+    def publish(self, file_path: str, metadata: Dict[str, Any]) -> None:
+        """
+        登记一个可发送的文件
+
+        Args:
+            file_path: 音频文件路径（已是正式文件名）
+            metadata: video_id / uploader / title / yt_channel / group_name / timestamp / duration 等
+        """
+        path = _normalize_path(file_path)
+        with self._lock:
+            self._connect().execute(
+                "INSERT INTO ready_files (path, folder, metadata, ready_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET metadata = excluded.metadata, ready_at = excluded.ready_at",
+                (path, os.path.dirname(path), json.dumps(metadata, ensure_ascii=False), time.time()),
+            )
+
+    def get(self, file_path: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT metadata FROM ready_files WHERE path = ?", (_normalize_path(file_path),)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def pending_for_folder(self, folder: str) -> Dict[str, Dict[str, Any]]:
+        """
+        返回目录中已登记的文件（按登记顺序），并清理文件已不存在的记录
+
+        Returns:
+            {文件名: 元数据}
+        """
+        folder_key = _normalize_path(folder)
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT path, metadata FROM ready_files WHERE folder = ? ORDER BY id", (folder_key,)
+            ).fetchall()
+        result: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for path, metadata in rows:
+            if not os.path.exists(path):
+                missing.append(path)
+                continue
+            try:
+                result[os.path.basename(path)] = json.loads(metadata)
+            except ValueError:
+                continue
+        if missing:
+            with self._lock:
+                self._connect().executemany("DELETE FROM ready_files WHERE path = ?", [(p,) for p in missing])
+        return result
+
+    def ack(self, file_path: str) -> None:
+        """文件已发送（或被丢弃）后移除记录"""
+        with self._lock:
+            self._connect().execute("DELETE FROM ready_files WHERE path = ?", (_normalize_path(file_path),))
+
+
+_handoff_queue: Optional[HandoffQueue] = None
+
+
+def get_handoff_queue() -> HandoffQueue:
+    """获取进程内共享的交接队列实例"""
+    global _handoff_queue
+    if _handoff_queue is None:
+        _handoff_queue = HandoffQueue()
+    return _handoff_queue
@@ -4,14 +4,23 @@ ChronoLullaby 统一日志配置模块
 支持 JSONL 格式、日志轮转、多组件日志
 """
 
+import io
 import os
 import sys
+import copy
 import json
+import math
+import time
+import queue
+import atexit
+import sqlite3
 import logging
 import logging.handlers
+import traceback
+from collections import Counter
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Iterable, List, Optional
 
 
 TRACE_LEVEL = 5
@@ -28,23 +37,78 @@ def _trace(self, message, *args, **kwargs):
 logging.Logger.trace = _trace
 
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def _get_configured_json_backend() -> str:
+    """读取 log.json_backend：json（默认，输出与标准库逐字节一致）/ orjson / auto"""
+    try:
+        import config as config_module
+        yaml_config = config_module.load_yaml_config() or {}
+        log_config = yaml_config.get('log') or yaml_config.get('logging') or {}
+        value = log_config.get('json_backend')
+        if isinstance(value, str):
+            return value.lower()
+    except Exception:
+        pass
+    return 'json'
+
+
 class JSONFormatter(logging.Formatter):
     """
     JSON 格式化器，输出 JSONL 格式的日志
+
+    - 时间戳按秒缓存 "YYYY-MM-DDTHH:MM:SS" 前缀，只拼接微秒部分
+    - 复用同一个 JSONEncoder；可选 orjson 后端（紧凑输出，字段和值不变）
     """
+
+    def __init__(self, *args, json_backend: Optional[str] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        backend = (json_backend or _get_configured_json_backend()).lower()
+        self.use_orjson = ORJSON_AVAILABLE and backend in ('orjson', 'auto')
+        self._encoder = json.JSONEncoder(ensure_ascii=False, default=str)
+        self._ts_cache = (None, '')
+
+    def _format_timestamp(self, created: float) -> str:
+        """与 datetime.fromtimestamp(created).isoformat() 输出一致"""
+        fraction, whole = math.modf(created)
+        seconds = int(whole)
+        micros = round(fraction * 1e6)
+        if micros >= 1000000:
+            seconds += 1
+            micros -= 1000000
+        cached_second, prefix = self._ts_cache
+        if cached_second != seconds:
+            prefix = datetime.fromtimestamp(seconds).strftime('%Y-%m-%dT%H:%M:%S')
+            self._ts_cache = (seconds, prefix)
+        return f"{prefix}.{micros:06d}" if micros else prefix
+
+    def _dumps(self, log_data: dict) -> str:
+        if self.use_orjson:
+            try:
+                return orjson.dumps(log_data, default=str).decode('utf-8')
+            except TypeError:
+                pass
+        return self._encoder.encode(log_data)
     
     def format(self, record: logging.LogRecord) -> str:
         """格式化日志记录为 JSON 字符串"""
         log_data = {
-            "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+            "timestamp": self._format_timestamp(record.created),
             "level": record.levelname,
             "component": record.name,
             "message": record.getMessage(),
         }
         
         # 添加额外的上下文信息
-        if hasattr(record, 'extra_data'):
-            log_data.update(record.extra_data)
+        extra_data = getattr(record, 'extra_data', None)
+        if extra_data is not None:
+            log_data.update(extra_data)
         
         # 添加异常信息
         if record.exc_info:
@@ -60,7 +124,67 @@ class JSONFormatter(logging.Formatter):
             log_data["line"] = record.lineno
             log_data["function"] = record.funcName
         
-        return json.dumps(log_data, ensure_ascii=False)
+        return self._dumps(log_data)
+
+
+class _CallerOnWarningLogger(logging.Logger):
+    """
+    WARNING 以下的记录不查找调用位置（findCaller 需要遍历调用栈），
+    JSON 输出中 file/line/function 本来也只对 WARNING 及以上记录
+    """
+
+    def findCaller(self, stack_info=False, stacklevel=1):
+        """
+        自行回溯调用栈：跳过 logging 内部、本方法所在的 _log 与 _trace 帧后，取第 stacklevel 个帧
+
+        Python 3.10 先按 stacklevel 回退再跳过 logging 内部帧，3.11 起改为只对非内部帧计数，
+        直接依赖标准实现时多出的 _log 一层在不同版本下需要不同的 stacklevel
+        """
+        f = sys._getframe(1)
+        while stacklevel > 0:
+            next_f = f.f_back
+            if next_f is None:
+                break
+            f = next_f
+            if not _is_internal_log_frame(f):
+                stacklevel -= 1
+        co = f.f_code
+        sinfo = None
+        if stack_info:
+            with io.StringIO() as sio:
+                sio.write("Stack (most recent call last):\n")
+                traceback.print_stack(f, file=sio)
+                sinfo = sio.getvalue().rstrip("\n")
+        return co.co_filename, f.f_lineno, co.co_name, sinfo
+
+    def _log(self, level, msg, args, exc_info=None, extra=None, stack_info=False, stacklevel=1):
+        if level >= logging.WARNING or stack_info:
+            return super()._log(level, msg, args, exc_info, extra, stack_info, stacklevel)
+        if exc_info:
+            if isinstance(exc_info, BaseException):
+                exc_info = (type(exc_info), exc_info, exc_info.__traceback__)
+            elif not isinstance(exc_info, tuple):
+                exc_info = sys.exc_info()
+        record = self.makeRecord(
+            self.name, level, "(unknown file)", 0, msg, args, exc_info,
+            "(unknown function)", extra, None
+        )
+        self.handle(record)
+
+
+_INTERNAL_LOG_CODES = (_CallerOnWarningLogger._log.__code__, _trace.__code__)
+
+
+def _is_internal_log_frame(frame) -> bool:
+    return (
+        frame.f_code in _INTERNAL_LOG_CODES
+        or os.path.normcase(frame.f_code.co_filename) == logging._srcfile
+    )
+
+
+def _use_fast_logger_class(logger: logging.Logger) -> None:
+    if type(logger) is logging.Logger:
+        logger.__class__ = _CallerOnWarningLogger
 
 
 class ConsoleFormatter(logging.Formatter):
@@ -188,6 +312,318 @@ class NotionLogHandler(logging.Handler):
             return
 
 
+class SharedRotatingFileHandler(logging.Handler):
+    """
+    多进程共享的轮转日志文件（用于 all.log）
+
+    - 每条记录以 O_APPEND 方式一次 write 写入，多个进程同时追加不会互相覆盖
+    - 轮转由锁文件（<文件>.lock，O_EXCL 创建）协调，同一时刻只有一个进程改名备份
+    - 其他进程发现文件 inode 变化后重新打开新文件，不会继续写入已改名的备份
+    """
+
+    # 未抢到轮转锁时，锁文件超过该秒数视为持有者已崩溃
+    LOCK_STALE_SECONDS = 30
+    # 检查文件是否已被其他进程轮转的间隔（秒）
+    REOPEN_CHECK_INTERVAL = 1.0
+    # 轮转失败（Windows 上文件被其他进程占用）后，间隔该秒数再尝试
+    ROTATION_RETRY_INTERVAL = 60.0
+
+    def __init__(self, filename, max_bytes: int = 20 * 1024 * 1024, backup_count: int = 10,
+                 encoding: str = 'utf-8'):
+        super().__init__()
+        self.filename = os.path.abspath(str(filename))
+        self.lock_file = self.filename + ".lock"
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.encoding = encoding
+        self._fd: Optional[int] = None
+        self._ino: Optional[int] = None
+        self._next_check = 0.0
+        self._next_rotation = 0.0
+        self._open()
+
+    def _open(self) -> None:
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+        self._fd = os.open(self.filename, flags, 0o644)
+        self._ino = os.fstat(self._fd).st_ino
+
+    def _close_fd(self) -> None:
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+
+    def _reopen_if_rotated(self) -> None:
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.REOPEN_CHECK_INTERVAL
+        try:
+            current_ino = os.stat(self.filename).st_ino
+        except FileNotFoundError:
+            current_ino = None
+        if current_ino != self._ino:
+            self._close_fd()
+            self._open()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            data = (self.format(record) + "\n").encode(self.encoding)
+            self.acquire()
+            try:
+                if self._fd is None:
+                    self._open()
+                self._reopen_if_rotated()
+                os.write(self._fd, data)
+                if (self.max_bytes > 0 and time.monotonic() >= self._next_rotation
+                        and os.fstat(self._fd).st_size >= self.max_bytes):
+                    self._rollover()
+            finally:
+                self.release()
+        except Exception:
+            self.handleError(record)
+
+    def _acquire_rotation_lock(self) -> bool:
+        for _ in range(2):
+            try:
+                fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    stale = time.time() - os.path.getmtime(self.lock_file) > self.LOCK_STALE_SECONDS
+                except OSError:
+                    stale = True
+                if not stale:
+                    return False
+                try:
+                    os.remove(self.lock_file)
+                except OSError:
+                    pass
+                continue
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            return True
+        return False
+
+    def _shift_backups(self, pending: str) -> None:
+        """已改名为 pending 的旧日志放到 .1，原有备份依次后移"""
+        if self.backup_count <= 0:
+            os.remove(pending)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            src = f"{self.filename}.{index}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.filename}.{index + 1}")
+        os.replace(pending, f"{self.filename}.1")
+
+    def _rollover(self) -> None:
+        # 其他进程正在轮转：本进程稍后通过 inode 检查切换到新文件
+        if not self._acquire_rotation_lock():
+            return
+        pending = self.filename + ".rotating"
+        try:
+            # 上次轮转在改名后中断：先把遗留的文件归入备份
+            if os.path.exists(pending):
+                self._shift_backups(pending)
+            # 拿到锁后确认文件仍是本进程打开的那个且确实超限（可能已被其他进程轮转）
+            try:
+                stat = os.stat(self.filename)
+            except FileNotFoundError:
+                stat = None
+            if stat is not None and stat.st_ino == self._ino and stat.st_size >= self.max_bytes:
+                self._close_fd()
+                # 先改名当前文件：Windows 上其他进程仍打开该文件时这里失败，备份不会被提前挪动
+                os.replace(self.filename, pending)
+                self._shift_backups(pending)
+            self._close_fd()
+            self._open()
+            self._next_check = time.monotonic() + self.REOPEN_CHECK_INTERVAL
+        except OSError:
+            # 暂时无法改名：继续写当前文件，隔一段时间再尝试，不在每次写入时重试
+            self._next_rotation = time.monotonic() + self.ROTATION_RETRY_INTERVAL
+            if self._fd is None:
+                self._open()
+        finally:
+            try:
+                os.remove(self.lock_file)
+            except OSError:
+                pass
+
+    def flush(self) -> None:
+        # 每条记录直接 write 到内核，无用户态缓冲
+        pass
+
+    def close(self) -> None:
+        self.acquire()
+        try:
+            self._close_fd()
+        finally:
+            self.release()
+        super().close()
+
+
+class LogStatsHandler(logging.Handler):
+    """
+    日志统计汇总（logs/log_stats.db）
+
+    按分钟和小时累计各级别、组件、错误类型、频道的日志条数，
+    view_logs --stats 直接读取汇总结果，无需解析日志文件。
+    计数先在内存累积，每隔 FLUSH_INTERVAL 秒合并写入；SQLite WAL 允许下载器和 Bot 同时写入
+    """
+
+    FLUSH_INTERVAL = 10
+    # 分钟粒度保留天数 / 小时粒度保留天数
+    MINUTE_RETENTION_DAYS = 3
+    HOUR_RETENTION_DAYS = 90
+    PRUNE_INTERVAL = 3600
+
+    def __init__(self, db_path):
+        super().__init__()
+        self.db_path = str(db_path)
+        self._pending: Counter = Counter()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._next_flush = time.monotonic() + self.FLUSH_INTERVAL
+        self._next_prune = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rollup ("
+                " granularity TEXT NOT NULL,"
+                " bucket TEXT NOT NULL,"
+                " dimension TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " count INTEGER NOT NULL,"
+                " PRIMARY KEY (granularity, bucket, dimension, key)) WITHOUT ROWID"
+            )
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _dimensions(record: logging.LogRecord):
+        yield 'level', record.levelname
+        yield 'component', record.name
+        extra = getattr(record, 'extra_data', None) or {}
+        error_type = extra.get('error_type')
+        if not error_type and record.exc_info and record.exc_info[0] is not None:
+            error_type = record.exc_info[0].__name__
+        if error_type:
+            yield 'error_type', str(error_type)
+        channel = extra.get('yt_channel') or extra.get('channel')
+        if channel:
+            yield 'channel', str(channel)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            # 桶与日志 timestamp 字段同为本地时间，便于按前缀对应
+            minute = time.strftime('%Y-%m-%dT%H:%M', time.localtime(record.created))
+            hour = minute[:13]
+            for dimension, key in self._dimensions(record):
+                self._pending[('minute', minute, dimension, key)] += 1
+                self._pending[('hour', hour, dimension, key)] += 1
+            if time.monotonic() >= self._next_flush:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            self._next_flush = time.monotonic() + self.FLUSH_INTERVAL
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, Counter()
+            try:
+                conn = self._connect()
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO rollup (granularity, bucket, dimension, key, count) VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT(granularity, bucket, dimension, key) DO UPDATE SET count = count + excluded.count",
+                        [(*key, count) for key, count in pending.items()],
+                    )
+                    if time.monotonic() >= self._next_prune:
+                        self._next_prune = time.monotonic() + self.PRUNE_INTERVAL
+                        now = time.time()
+                        conn.execute(
+                            "DELETE FROM rollup WHERE granularity = 'minute' AND bucket < ?",
+                            (time.strftime('%Y-%m-%dT%H:%M', time.localtime(now - self.MINUTE_RETENTION_DAYS * 86400)),),
+                        )
+                        conn.execute(
+                            "DELETE FROM rollup WHERE granularity = 'hour' AND bucket < ?",
+                            (time.strftime('%Y-%m-%dT%H', time.localtime(now - self.HOUR_RETENTION_DAYS * 86400)),),
+                        )
+            except sqlite3.Error:
+                # 数据库被锁等情况：计数留到下次合并
+                self._pending.update(pending)
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        self.flush()
+        self.acquire()
+        try:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        finally:
+            self.release()
+        super().close()
+
+
+class _TargetedQueueHandler(logging.handlers.QueueHandler):
+    """
+    只负责把记录放入进程内队列；格式化、写文件、转发 Notion 由后台监听线程完成
+
+    每个 logger 的输出目标（控制台 / 组件文件 / all.log / Notion）挂在记录上，
+    由监听线程按目标分发
+    """
+
+    def __init__(self, log_queue: queue.Queue, targets: List[logging.Handler]):
+        super().__init__(log_queue)
+        self.targets = targets
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 在生产者线程合并 args（参数可能随后被修改），其余格式化留给监听线程
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        record.log_targets = self.targets
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # 后台线程已停止（进程退出阶段）时直接在当前线程写出，避免丢日志
+        if LoggerManager._listener is None:
+            _dispatch_record(record)
+        else:
+            self.queue.put_nowait(record)
+
+
+def _dispatch_record(record: logging.LogRecord) -> None:
+    for handler in getattr(record, 'log_targets', ()):
+        if record.levelno >= handler.level:
+            handler.handle(record)
+
+
+class _RoutingQueueListener(logging.handlers.QueueListener):
+    """进程内唯一的后台日志线程：按记录上的目标分发"""
+
+    def handle(self, record: logging.LogRecord) -> None:
+        _dispatch_record(record)
+
+
+def _iter_target_handlers(logger: logging.Logger) -> Iterable[logging.Handler]:
+    """logger 的实际输出 Handler（展开队列 Handler 的目标）"""
+    for handler in logger.handlers:
+        if isinstance(handler, _TargetedQueueHandler):
+            yield from handler.targets
+        else:
+            yield handler
+
+
 class LoggerManager:
     """
     日志管理器，负责创建和配置各个组件的 logger
@@ -196,6 +632,9 @@ class LoggerManager:
     _instance = None
     _initialized = False
     aggregate_handler: Optional[logging.Handler] = None
+    stats_handler: Optional[LogStatsHandler] = None
+    _queue: Optional[queue.Queue] = None
+    _listener: Optional[_RoutingQueueListener] = None
     
     def __new__(cls):
         if cls._instance is None:
@@ -209,6 +648,8 @@ class LoggerManager:
             self.single_file_mode = self._load_single_file_flag()
             self.rotation_config = self._load_rotation_config()
             self.aggregate_handler = self._create_aggregate_handler()
+            self.queue_enabled = self._load_queue_flag()
+            LoggerManager.stats_handler = self._create_stats_handler()
             LoggerManager._initialized = True
         else:
             if not hasattr(self, "single_file_mode"):
@@ -217,6 +658,8 @@ class LoggerManager:
                 self.rotation_config = self._load_rotation_config()
             if not hasattr(self, "aggregate_handler") or self.aggregate_handler is None:
                 self.aggregate_handler = self._create_aggregate_handler()
+            if not hasattr(self, "queue_enabled"):
+                self.queue_enabled = self._load_queue_flag()
 
     def _load_single_file_flag(self) -> bool:
         """
@@ -233,6 +676,34 @@ class LoggerManager:
             pass
         return True
 
+    def _load_queue_flag(self) -> bool:
+        """
+        log.queue：日志是否经由后台线程写出（默认开启）
+        """
+        try:
+            import config as config_module
+            yaml_config = config_module.load_yaml_config() or {}
+            log_config = yaml_config.get('log') or yaml_config.get('logging') or {}
+            value = log_config.get('queue')
+            if isinstance(value, bool):
+                return value
+        except Exception:
+            pass
+        return True
+
+    def _attach_handlers(self, logger: logging.Logger, handlers: List[logging.Handler]) -> None:
+        """把输出 Handler 挂到 logger 上；启用队列时由一个 QueueHandler 代理"""
+        if not self.queue_enabled:
+            for handler in handlers:
+                logger.addHandler(handler)
+            return
+        if LoggerManager._listener is None:
+            LoggerManager._queue = queue.SimpleQueue()
+            LoggerManager._listener = _RoutingQueueListener(LoggerManager._queue)
+            LoggerManager._listener.start()
+            atexit.register(shutdown_logging)
+        logger.addHandler(_TargetedQueueHandler(LoggerManager._queue, handlers))
+
     def _load_rotation_config(self) -> dict:
         """
         Load rotation settings for the aggregated log file.
@@ -268,10 +739,11 @@ class LoggerManager:
         """
         try:
             log_file = self.log_dir / "all.log"
-            handler = logging.handlers.RotatingFileHandler(
+            # 下载器与 Bot 两个进程同时写 all.log，使用多进程安全的追加写入与轮转
+            handler = SharedRotatingFileHandler(
                 log_file,
-                maxBytes=self.rotation_config.get("max_bytes", 20 * 1024 * 1024),
-                backupCount=self.rotation_config.get("backup_count", 10),
+                max_bytes=self.rotation_config.get("max_bytes", 20 * 1024 * 1024),
+                backup_count=self.rotation_config.get("backup_count", 10),
                 encoding='utf-8'
             )
             handler.setLevel(logging.NOTSET)
@@ -284,6 +756,29 @@ class LoggerManager:
             )
             return None
     
+    def _create_stats_handler(self) -> Optional[LogStatsHandler]:
+        """
+        创建日志统计汇总 Handler（log.stats: false 时关闭）
+        """
+        try:
+            import config as config_module
+            yaml_config = config_module.load_yaml_config() or {}
+            log_config = yaml_config.get('log') or yaml_config.get('logging') or {}
+            if log_config.get('stats') is False:
+                return None
+        except Exception:
+            pass
+        try:
+            handler = LogStatsHandler(self.log_dir / "log_stats.db")
+            handler.setLevel(logging.NOTSET)
+            return handler
+        except Exception as exc:
+            print(
+                f"[LoggerManager] Failed to initialize log stats handler: {exc}",
+                file=sys.stderr
+            )
+            return None
+    
     def get_logger(
         self,
         component: str,
@@ -306,22 +801,25 @@ class LoggerManager:
             配置好的 logger 对象
         """
         logger = logging.getLogger(f"chronolullaby.{component}")
+        _use_fast_logger_class(logger)
         target_level = _get_configured_log_level(level)
         logger.setLevel(target_level)
         logger.propagate = False
 
         if logger.handlers:
-            for handler in logger.handlers:
+            for handler in _iter_target_handlers(logger):
                 if handler.level not in (logging.ERROR, logging.NOTSET):
                     handler.setLevel(target_level)
             return logger
 
+        handlers: List[logging.Handler] = []
+
         # 控制台 Handler（人类可读格式）
         if console:
             console_handler = logging.StreamHandler(sys.stdout)
             console_handler.setLevel(target_level)
             console_handler.setFormatter(ConsoleFormatter())
-            logger.addHandler(console_handler)
+            handlers.append(console_handler)
 
         # 文件 Handler（JSONL 格式）
         if file and not self.single_file_mode:
@@ -335,7 +833,7 @@ class LoggerManager:
             )
             file_handler.setLevel(target_level)
             file_handler.setFormatter(JSONFormatter())
-            logger.addHandler(file_handler)
+            handlers.append(file_handler)
 
             # 错误日志文件（仅 ERROR 及以上）
             if separate_error_file:
@@ -348,19 +846,41 @@ class LoggerManager:
                 )
                 error_handler.setLevel(logging.ERROR)
                 error_handler.setFormatter(JSONFormatter())
-                logger.addHandler(error_handler)
+                handlers.append(error_handler)
 
         # 增加统一聚合日志，便于本地汇总检索
-        if self.aggregate_handler and self.aggregate_handler not in logger.handlers:
-            logger.addHandler(self.aggregate_handler)
+        if self.aggregate_handler:
+            handlers.append(self.aggregate_handler)
+        if self.stats_handler:
+            handlers.append(self.stats_handler)
 
         base_component = component.split('.')[0] if component else ''
         notion_log_type = base_component if base_component in ('downloader', 'bot') else 'system'
         notion_handler = NotionLogHandler(notion_log_type, component or base_component or 'unknown')
         notion_handler.setLevel(logging.NOTSET)
-        logger.addHandler(notion_handler)
+        handlers.append(notion_handler)
 
+        self._attach_handlers(logger, handlers)
         return logger
+
+
+def shutdown_logging() -> None:
+    """
+    写出队列中剩余的日志并停止后台日志线程
+
+    进程通过 os._exit 退出时不会执行 atexit，需要先调用本函数
+    """
+    listener = LoggerManager._listener
+    if listener is not None:
+        try:
+            listener.stop()
+        except Exception:
+            pass
+        LoggerManager._listener = None
+    if LoggerManager.stats_handler is not None:
+        LoggerManager.stats_handler.flush()
+
+
 def get_logger(component: str, **kwargs) -> logging.Logger:
     """
     便捷函数：获取指定组件的 logger
@@ -409,24 +929,26 @@ def get_system_logger() -> logging.Logger:
         >>> sys_logger.error("配置加载失败", extra={'extra_data': {'config_file': 'config.yaml', 'error': 'not found'}})
     """
     logger = logging.getLogger("chronolullaby.system")
+    _use_fast_logger_class(logger)
     target_level = _get_configured_log_level(logging.DEBUG)  # 系统日志默认支持 DEBUG
     logger.setLevel(target_level)
     logger.propagate = False
 
     # 如果已经配置过，直接返回
     if logger.handlers:
-        for handler in logger.handlers:
+        for handler in _iter_target_handlers(logger):
             if handler.level not in (logging.ERROR, logging.NOTSET):
                 handler.setLevel(target_level)
         return logger
 
     manager = LoggerManager()
+    handlers: List[logging.Handler] = []
     
     # 控制台 Handler（人类可读格式）
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(target_level)
     console_handler.setFormatter(ConsoleFormatter())
-    logger.addHandler(console_handler)
+    handlers.append(console_handler)
 
     # 文件 Handler（JSONL 格式）- 系统日志
     if not manager.single_file_mode:
@@ -439,33 +961,79 @@ def get_system_logger() -> logging.Logger:
         )
         file_handler.setLevel(target_level)
         file_handler.setFormatter(JSONFormatter())
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
 
-    if manager.aggregate_handler and manager.aggregate_handler not in logger.handlers:
-        logger.addHandler(manager.aggregate_handler)
+    if manager.aggregate_handler:
+        handlers.append(manager.aggregate_handler)
+    if manager.stats_handler:
+        handlers.append(manager.stats_handler)
 
     # 系统日志不添加 Notion Handler，确保完全本地化
     # 这样即使 Notion 同步出问题，系统日志也能正常工作
 
+    manager._attach_handlers(logger, handlers)
     return logger
 
 
-def log_with_context(logger: logging.Logger, level: int, message: str, **context):
+class LazyValue:
+    """延迟计算的上下文值：只有日志确实输出时才调用"""
+
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func: Callable[..., Any], *args):
+        self.func = func
+        self.args = args
+
+    def resolve(self) -> Any:
+        return self.func(*self.args)
+
+
+def lazy(func: Callable[..., Any], *args) -> LazyValue:
+    """
+    把上下文值包装为延迟计算
+
+    Examples:
+        >>> log_with_context(logger, TRACE_LEVEL, '跳过视频', title=lazy(shorten, video_title, 60))
+    """
+    return LazyValue(func, *args)
+
+
+def log_with_context(logger: logging.Logger, level: int, message: str,
+                     context_factory: Optional[Callable[[], dict]] = None, **context):
     """
     带上下文信息的日志记录
     
+    级别未启用时直接返回，不构建上下文（TRACE 日志在热循环中几乎没有开销）
+    
     Args:
         logger: logger 对象
         level: 日志级别
         message: 日志消息
-        **context: 额外的上下文信息
+        context_factory: 可选，返回上下文字典的函数，仅在日志输出时调用
+        **context: 额外的上下文信息；lazy(...) 包装的值仅在日志输出时计算
     
     Examples:
         >>> logger = get_logger('bot')
         >>> log_with_context(logger, logging.INFO, 'File sent', file_name='audio.mp3', size_mb=5.2)
+        >>> log_with_context(logger, TRACE_LEVEL, 'Stats', context_factory=lambda: {'rss_mb': get_rss()})
     """
+    if not logger.isEnabledFor(level):
+        return
+    if context_factory is not None:
+        context = {**context_factory(), **context}
+    for key, value in context.items():
+        if isinstance(value, LazyValue):
+            context[key] = value.resolve()
     extra = {'extra_data': context} if context else {}
-    logger.log(level, message, extra=extra)
+    # stacklevel=2：WARNING 及以上记录的 file/line 指向调用方而不是本函数
+    logger.log(level, message, extra=extra, stacklevel=2)
+
+
+def shorten(text: Optional[str], limit: int) -> Optional[str]:
+    """日志用的标题截断：超过 limit 个字符时截断并加省略号"""
+    if text is None or len(text) <= limit:
+        return text
+    return text[:limit] + "..."
 
 
 # 便捷函数别名
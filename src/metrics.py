@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+进程内运行指标（Prometheus 文本格式）
+下载器与 Bot 各自维护计数器 / 直方图 / 仪表，并可选地在本地端口提供 /metrics：
+
+配置（config.yaml -> metrics）::
+
+    metrics:
+      enabled: false
+      host: 127.0.0.1
+      downloader_port: 9464
+      bot_port: 9465
+
+模块级别不导入项目内其他模块（config / logger 在启动服务时才导入），可在底层模块
+（scheduler、notion_adapter）中直接引用；未启动 HTTP 服务时指标只在内存中累加，开销为一次加锁的字典更新。
+"""
+
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 秒级耗时的默认分桶：覆盖 API 调用（亚秒）到单个视频下载 / 上传（数十分钟）
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+METRICS_DEFAULT_PORTS = {'downloader': 9464, 'bot': 9465}
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """指标基类：按标签值保存样本，也可以由回调在抓取时提供样本"""
+
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._callback: Optional[Callable[[], Dict[LabelValues, float]]] = None
+
+    def _label_values(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}，实际 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(f'{extra[0]}="{extra[1]}"')
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def set_function(self, func: Callable[[], Dict[LabelValues, float]]) -> None:
+        """
+        抓取时调用 func 获取样本 {标签值元组: 数值}（无标签时键为空元组）；
+        用于读取已有的统计（如连接池占用、待发送文件数），不必在每次变化时更新
+        """
+        self._callback = func
+
+    def _samples(self) -> List[Tuple[str, LabelValues, float, Optional[Tuple[str, str]]]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        if self._callback is not None:
+            try:
+                samples = [(self.name, tuple(str(v) for v in key), value, None)
+                           for key, value in self._callback().items()]
+            except Exception:
+                samples = []
+        else:
+            samples = self._samples()
+        for name, values, value, extra in samples:
+            lines.append(f"{name}{self._format_labels(values, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, value, None) for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """可增可减的当前值（队列长度等）"""
+
+    type_name = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, value, None) for key, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    """累积分桶直方图（_bucket / _sum / _count）"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> [各分桶计数..., +Inf 计数, 总和]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._label_values(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """计时上下文：with SEND_SECONDS.time(method='upload'): ..."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - started, **labels)
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), state[:-1]):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", key, cumulative, ('le', _format_value(bound))))
+            samples.append((f"{self.name}_sum", key, state[-1], None))
+            samples.append((f"{self.name}_count", key, cumulative, None))
+        return samples
+
+
+class Registry:
+    """指标注册表：同名指标只创建一次"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"指标 {name} 已以不同的类型或标签注册")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# ------------------------------------------------------------
+# 指标定义（下载器 / Bot 共用同一份定义，各进程只会产生自己用到的样本）
+# ------------------------------------------------------------
+
+PROCESS_START_TIME = REGISTRY.gauge(
+    'chronolullaby_process_start_time_seconds', '进程启动时间（Unix 时间戳）')
+PROCESS_START_TIME.set(time.time())
+
+# 下载器
+CHANNEL_LIST_SECONDS = REGISTRY.histogram(
+    'chronolullaby_channel_list_seconds', '获取频道视频列表耗时', ('channel',))
+VIDEO_DOWNLOAD_SECONDS = REGISTRY.histogram(
+    'chronolullaby_video_download_seconds', '单个视频 yt-dlp 下载耗时（不含后处理）')
+TRANSCODE_SECONDS = REGISTRY.histogram(
+    'chronolullaby_transcode_seconds', '单个视频 FFmpeg 后处理耗时')
+DOWNLOADED_BYTES = REGISTRY.counter(
+    'chronolullaby_downloaded_bytes_total', '下载完成的音频字节数', ('channel',))
+VIDEOS_PROCESSED = REGISTRY.counter(
+    'chronolullaby_videos_total', '按结果统计的已处理视频数', ('status',))
+SCHEDULER_LATENESS_SECONDS = REGISTRY.histogram(
+    'chronolullaby_scheduler_lateness_seconds', '调度任务实际开始时间相对计划时间的延迟', ('kind',))
+SCHEDULER_DEADLINE_MISSED = REGISTRY.counter(
+    'chronolullaby_scheduler_deadline_missed_total', '错过截止时间的调度任务数', ('kind',))
+SCHEDULER_READY_JOBS = REGISTRY.gauge(
+    'chronolullaby_scheduler_ready_jobs', '已到期等待执行的调度任务数')
+
+# Bot
+SPLIT_SECONDS = REGISTRY.histogram(
+    'chronolullaby_split_seconds', '超限文件切割耗时（含重试）')
+SEND_SECONDS = REGISTRY.histogram(
+    'chronolullaby_send_seconds', 'send_audio 耗时', ('method',))
+SENT_BYTES = REGISTRY.counter(
+    'chronolullaby_sent_bytes_total', '上传到 Telegram 的字节数（不含 file_id 复用）')
+TELEGRAM_ERRORS = REGISTRY.counter(
+    'chronolullaby_telegram_errors_total', '按类型统计的 Telegram 错误', ('error_type',))
+PENDING_FILES = REGISTRY.gauge(
+    'chronolullaby_pending_files', '各频道组目录中等待发送的文件数', ('group',))
+REQUEST_POOL_IN_FLIGHT = REGISTRY.gauge(
+    'chronolullaby_telegram_pool_in_flight', 'Telegram 连接池正在进行的请求数', ('pool',))
+REQUEST_POOL_REQUESTS = REGISTRY.counter(
+    'chronolullaby_telegram_pool_requests_total', 'Telegram 连接池请求数', ('pool',))
+REQUEST_POOL_SATURATED = REGISTRY.counter(
+    'chronolullaby_telegram_pool_saturated_total', '发起请求时连接已全部占用的次数', ('pool',))
+
+# Notion（两个进程都会调用）
+NOTION_CALL_SECONDS = REGISTRY.histogram(
+    'chronolullaby_notion_call_seconds', '单次 Notion API 调用耗时', ('method', 'outcome'))
+NOTION_RETRIES = REGISTRY.counter(
+    'chronolullaby_notion_retries_total', 'Notion API 重试次数', ('reason',))
+NOTION_FAILURES = REGISTRY.counter(
+    'chronolullaby_notion_failures_total', '重试耗尽后仍失败的 Notion API 调用', ('method',))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 抓取请求不写入日志
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(process_name: str) -> Optional[ThreadingHTTPServer]:
+    """
+    按配置在后台线程启动 /metrics 服务（metrics.enabled 为 false 时不启动）
+
+    Args:
+        process_name: downloader / bot，决定使用的端口配置 metrics.<process_name>_port
+
+    Returns:
+        HTTP 服务实例；未启用或端口被占用时返回 None
+    """
+    global _server
+    if _server is not None:
+        return _server
+
+    from config import get_config_value
+    from logger import get_logger
+
+    if not get_config_value('metrics.enabled', False):
+        return None
+    logger = get_logger('metrics')
+    host = get_config_value('metrics.host', '127.0.0.1') or '127.0.0.1'
+    port = int(get_config_value(f'metrics.{process_name}_port', METRICS_DEFAULT_PORTS.get(process_name, 9464)))
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.warning(f"指标服务启动失败 {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    logger.info(f"📈 指标服务已启动: http://{host}:{port}/metrics")
+    _server = server
+    return server
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+下载轮次指标存储
+每次 dl_audio_latest 处理一个频道记为一轮（pass），记录结果统计与各阶段耗时：
+
+- list:      获取频道视频列表
+- download:  yt-dlp 下载（不含后处理）
+- transcode: FFmpeg 后处理（提取音频 / 转码）
+- rename:    .tmp 文件重命名为正式文件名
+- delay:     视频间随机延迟
+
+基于 WAL 模式 SQLite（data/metrics.db），按时间查询；scripts/pass_stats.py 提供命令行汇总。
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import PROJECT_ROOT, get_config_value
+
+METRICS_DB_FILE = os.path.join(PROJECT_ROOT, "data", "metrics.db")
+
+STAGES = ('list', 'download', 'transcode', 'rename', 'delay')
+# 按视频记录的阶段（list / delay 只按轮次统计）
+VIDEO_STAGES = ('download', 'transcode', 'rename')
+OUTCOMES = ('success', 'already_exists', 'filtered', 'archived', 'member_only', 'error')
+
+
+class PassMetrics:
+    """
+    单轮频道处理的统计收集器
+
+    stage() 记录的是独占耗时：嵌套阶段（如 download 期间的 transcode）的时间
+    只计入内层阶段，各阶段之和不会超过整轮耗时
+    """
+
+    def __init__(self, channel: str, group_name: Optional[str] = None):
+        self.channel = channel
+        self.group_name = group_name
+        self.started_at = time.time()
+        self.duration: Optional[float] = None
+        self.result: Optional[str] = None
+        self.stats: Dict[str, Any] = {'total': 0, **{name: 0 for name in OUTCOMES}, 'details': []}
+        self.stages: Dict[str, float] = {name: 0.0 for name in STAGES}
+        self.video_stages: Dict[str, Dict[str, float]] = {}
+        self._started = time.monotonic()
+        # 未结束的阶段：[名称, video_id, 开始时间, 嵌套阶段耗时]
+        self._open: List[list] = []
+
+    def add(self, stage: str, seconds: float, video_id: Optional[str] = None) -> None:
+        """累加一段阶段耗时（同时从外层未结束阶段中扣除）"""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        if video_id:
+            per_video = self.video_stages.setdefault(video_id, {})
+            per_video[stage] = per_video.get(stage, 0.0) + seconds
+        if self._open:
+            self._open[-1][3] += seconds
+
+    @contextmanager
+    def stage(self, stage: str, video_id: Optional[str] = None) -> Iterator[None]:
+        """计时上下文：with pass_metrics.stage('download', video_id): ..."""
+        frame = [stage, video_id, time.monotonic(), 0.0]
+        self._open.append(frame)
+        try:
+            yield
+        finally:
+            self._open.remove(frame)
+            elapsed = time.monotonic() - frame[2]
+            self.add(stage, max(elapsed - frame[3], 0.0), video_id)
+            if self._open:
+                # 外层阶段扣除的是本阶段的总耗时（含本阶段已扣除的嵌套部分）
+                self._open[-1][3] += frame[3]
+
+    def finish(self, result: str) -> None:
+        self.result = result
+        self.duration = time.monotonic() - self._started
+
+    def summary(self) -> Dict[str, Any]:
+        """用于日志的紧凑汇总"""
+        summary = {f"{name}_seconds": round(seconds, 1) for name, seconds in self.stages.items() if seconds}
+        if self.duration is not None:
+            summary['duration_seconds'] = round(self.duration, 1)
+        return summary
+
+
+class MetricsStore:
+    """按轮次记录频道处理统计，附带每个视频的结果与阶段耗时"""
+
+    def __init__(self, db_path: str = METRICS_DB_FILE):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        stage_columns = "".join(f" {name}_seconds REAL NOT NULL DEFAULT 0," for name in STAGES)
+        outcome_columns = "".join(f" {name} INTEGER NOT NULL DEFAULT 0," for name in OUTCOMES)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS passes ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " channel TEXT NOT NULL,"
+            " group_name TEXT,"
+            " started_at REAL NOT NULL,"
+            " duration REAL NOT NULL,"
+            " result TEXT NOT NULL,"
+            " total INTEGER NOT NULL DEFAULT 0,"
+            f"{outcome_columns}{stage_columns}"
+            " finished_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_passes_started ON passes (started_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_passes_channel ON passes (channel, started_at)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS pass_videos ("
+            " pass_id INTEGER NOT NULL,"
+            " video_id TEXT,"
+            " status TEXT NOT NULL,"
+            " reason TEXT,"
+            " size_mb REAL,"
+            f"{''.join(f' {name}_seconds REAL NOT NULL DEFAULT 0,' for name in VIDEO_STAGES)}"
+            " PRIMARY KEY (pass_id, video_id))"
+        )
+        self._conn = conn
+        return conn
+
+    def record_pass(self, metrics: PassMetrics) -> int:
+        """
+        写入一轮统计
+
+        Returns:
+            轮次 ID
+        """
+        stats = metrics.stats
+        columns = ['channel', 'group_name', 'started_at', 'duration', 'result', 'total', 'finished_at']
+        values: List[Any] = [
+            metrics.channel, metrics.group_name, metrics.started_at, metrics.duration or 0.0,
+            metrics.result or 'unknown', stats.get('total', 0), time.time(),
+        ]
+        for name in OUTCOMES:
+            columns.append(name)
+            values.append(stats.get(name, 0))
+        for name in STAGES:
+            columns.append(f"{name}_seconds")
+            values.append(round(metrics.stages.get(name, 0.0), 3))
+
+        video_rows = []
+        for detail in stats.get('details', []):
+            timings = metrics.video_stages.get(detail.get('id'), {})
+            video_rows.append([
+                detail.get('id'), detail.get('status', 'unknown'), detail.get('reason'), detail.get('size_mb'),
+                *(round(timings.get(name, 0.0), 3) for name in VIDEO_STAGES),
+            ])
+
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = conn.execute(
+                    f"INSERT INTO passes ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    values,
+                )
+                pass_id = cursor.lastrowid
+                conn.executemany(
+                    "INSERT OR REPLACE INTO pass_videos (pass_id, video_id, status, reason, size_mb, "
+                    f"{', '.join(f'{name}_seconds' for name in VIDEO_STAGES)}) "
+                    f"VALUES ({', '.join('?' * (5 + len(VIDEO_STAGES)))})",
+                    [[pass_id, *row] for row in video_rows],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        self._maybe_prune()
+        return pass_id
+
+    def _maybe_prune(self) -> None:
+        """每天最多清理一次超过保留期的轮次"""
+        now = time.time()
+        if now - self._last_prune < 86400:
+            return
+        self._last_prune = now
+        retention_days = get_config_value('pass_metrics.retention_days', 90)
+        try:
+            retention_days = float(retention_days)
+        except (TypeError, ValueError):
+            retention_days = 90
+        if retention_days <= 0:
+            return
+        cutoff = now - retention_days * 86400
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "DELETE FROM pass_videos WHERE pass_id IN (SELECT id FROM passes WHERE started_at < ?)", (cutoff,)
+            )
+            conn.execute("DELETE FROM passes WHERE started_at < ?", (cutoff,))
+
+    def query_passes(self, since: Optional[float] = None, until: Optional[float] = None,
+                     channel: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """按开始时间倒序返回轮次记录"""
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("started_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("started_at < ?")
+            params.append(until)
+        if channel:
+            clauses.append("channel = ?")
+            params.append(channel)
+        sql = "SELECT * FROM passes"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY started_at DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            cursor = self._connect().execute(sql, params)
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def query_videos(self, pass_ids: List[int]) -> List[Dict[str, Any]]:
+        """返回指定轮次内的视频记录"""
+        if not pass_ids:
+            return []
+        rows: List[Dict[str, Any]] = []
+        with self._lock:
+            conn = self._connect()
+            # 分批查询，避免超过 SQLite 参数上限
+            for start in range(0, len(pass_ids), 500):
+                batch = pass_ids[start:start + 500]
+                cursor = conn.execute(
+                    "SELECT v.*, p.channel, p.started_at FROM pass_videos v JOIN passes p ON p.id = v.pass_id "
+                    f"WHERE v.pass_id IN ({', '.join('?' * len(batch))})",
+                    batch,
+                )
+                names = [d[0] for d in cursor.description]
+                rows.extend(dict(zip(names, row)) for row in cursor.fetchall())
+        return rows
+
+
+_metrics_store: Optional[MetricsStore] = None
+
+
+def get_metrics_store() -> MetricsStore:
+    """获取进程内共享的指标存储实例"""
+    global _metrics_store
+    if _metrics_store is None:
+        _metrics_store = MetricsStore()
+    return _metrics_store
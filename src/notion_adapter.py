@@ -10,6 +10,8 @@ from typing import Optional, Dict, Any, List
 from datetime import datetime, timezone
 import time
 
+from metrics import NOTION_CALL_SECONDS, NOTION_FAILURES, NOTION_RETRIES
+
 # 设置默认编码为UTF-8
 if sys.stdout.encoding != 'utf-8':
     sys.stdout.reconfigure(encoding='utf-8')
@@ -70,13 +72,21 @@ class NotionAdapter:
         """
         sys_logger = _get_sys_logger()
         last_error = None
+        # 指标中的方法名：DatabasesEndpoint.query 等，区分同名的 create / update
+        method = getattr(func, '__qualname__', None) or getattr(func, '__name__', None) or 'unknown'
         for attempt in range(self.max_retries):
+            started = time.monotonic()
             try:
-                return func(*args, **kwargs)
+                result = func(*args, **kwargs)
+                NOTION_CALL_SECONDS.observe(time.monotonic() - started, method=method, outcome='ok')
+                return result
             except APIResponseError as e:
+                NOTION_CALL_SECONDS.observe(time.monotonic() - started, method=method, outcome='error')
                 last_error = e
                 # 如果是限流错误，使用指数退避
                 if e.code == 'rate_limited':
+                    if attempt < self.max_retries - 1:
+                        NOTION_RETRIES.inc(reason='rate_limited')
                     wait_time = (2 ** attempt) * 1
                     print(f"API 限流，等待 {wait_time} 秒后重试...")
                     if sys_logger:
@@ -94,6 +104,7 @@ class NotionAdapter:
                 else:
                     # 其他错误也进行重试
                     if attempt < self.max_retries - 1:
+                        NOTION_RETRIES.inc(reason='api_error')
                         if sys_logger:
                             from logger import log_with_context
                             import logging
@@ -108,8 +119,10 @@ class NotionAdapter:
                             )
                         time.sleep(1)
             except Exception as e:
+                NOTION_CALL_SECONDS.observe(time.monotonic() - started, method=method, outcome='error')
                 last_error = e
                 if attempt < self.max_retries - 1:
+                    NOTION_RETRIES.inc(reason=type(e).__name__)
                     if sys_logger:
                         from logger import log_with_context
                         import logging
@@ -125,6 +138,7 @@ class NotionAdapter:
                     time.sleep(1)
         
         # 所有重试都失败
+        NOTION_FAILURES.inc(method=method)
         if sys_logger:
             from logger import log_with_context
             import logging
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+事件驱动的任务调度器
+按到期时间维护任务堆，到期任务按截止时间（EDF）执行，并统计调度延迟
+"""
+
+import heapq
+import itertools
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from metrics import SCHEDULER_DEADLINE_MISSED, SCHEDULER_LATENESS_SECONDS
+
+
+class ScheduledJob:
+    """调度任务"""
+
+    def __init__(
+        self,
+        key: str,
+        func: Callable[['ScheduledJob'], Optional[float]],
+        due_ts: float,
+        interval: Optional[float] = None,
+        deadline_slack: float = 0,
+        kind: str = "job",
+        payload: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Args:
+            key: 任务唯一标识（同 key 重复调度会替换旧任务）
+            func: 任务函数，接收任务本身；返回下一次到期时间戳（None 时按 interval 计算）
+            due_ts: 到期时间戳
+            interval: 重复间隔（秒），None 表示一次性任务
+            deadline_slack: 到期后允许的最大等待（秒），决定截止时间
+            kind: 任务类别（用于延迟统计，如 realtime / story / config）
+            payload: 任务附带数据
+        """
+        self.key = key
+        self.func = func
+        self.interval = interval
+        self.deadline_slack = deadline_slack
+        self.kind = kind
+        self.payload = payload or {}
+        self.seq = 0
+        self.cancelled = False
+        self.runs = 0
+        self.set_due(due_ts)
+
+    def set_due(self, due_ts: float) -> None:
+        """设置计划时间（同时重置截止时间）"""
+        self.intended_ts = due_ts
+        self.due_ts = due_ts
+        self.deadline_ts = due_ts + max(0, self.deadline_slack)
+
+
+class JobScheduler:
+    """
+    基于双堆的调度器：
+
+    - 等待堆按 due_ts 排序，保存尚未到期的任务
+    - 就绪堆按 deadline_ts 排序，到期任务中截止时间最早者优先执行
+
+    单线程下通过任务粒度实现抢占：长时间的实时下载被拆成逐频道任务，
+    每个任务结束后重新选择，到期的故事任务不必等待整轮实时下载结束
+    """
+
+    def __init__(self):
+        self._pending: List[tuple] = []
+        self._ready: List[tuple] = []
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._counter = itertools.count()
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._jobs
+
+    def get(self, key: str) -> Optional[ScheduledJob]:
+        return self._jobs.get(key)
+
+    def keys(self) -> List[str]:
+        return list(self._jobs.keys())
+
+    def schedule(self, job: ScheduledJob) -> ScheduledJob:
+        """加入任务，替换同 key 的旧任务"""
+        old = self._jobs.get(job.key)
+        if old is not None and old is not job:
+            old.cancelled = True
+        job.cancelled = False
+        self._jobs[job.key] = job
+        self._push(job)
+        return job
+
+    def cancel(self, key: str) -> bool:
+        job = self._jobs.pop(key, None)
+        if job is None:
+            return False
+        job.cancelled = True
+        return True
+
+    def defer(self, job: ScheduledJob, until_ts: float) -> None:
+        """
+        推迟已出队的任务（如频道间冷却），保留原计划时间用于延迟统计；
+        截止时间随之后移，主动推迟不计为错过截止
+        """
+        if job.cancelled:
+            return
+        job.due_ts = until_ts
+        job.deadline_ts = max(job.deadline_ts, until_ts + max(0, job.deadline_slack))
+        self._push(job)
+
+    def _push(self, job: ScheduledJob) -> None:
+        job.seq = next(self._counter)
+        heapq.heappush(self._pending, (job.due_ts, job.seq, job))
+
+    def _is_live(self, job: ScheduledJob, seq: int) -> bool:
+        return not job.cancelled and job.seq == seq and self._jobs.get(job.key) is job
+
+    def _promote(self, now: float) -> None:
+        while self._pending and self._pending[0][0] <= now:
+            _, seq, job = heapq.heappop(self._pending)
+            if self._is_live(job, seq):
+                heapq.heappush(self._ready, (job.deadline_ts, seq, job))
+
+    def pop_ready(self, now: Optional[float] = None) -> Optional[ScheduledJob]:
+        """取出截止时间最早的到期任务，没有则返回 None"""
+        now = time.time() if now is None else now
+        self._promote(now)
+        while self._ready:
+            _, seq, job = heapq.heappop(self._ready)
+            if self._is_live(job, seq):
+                return job
+        return None
+
+    def next_due(self) -> Optional[ScheduledJob]:
+        """返回最早到期的任务（不出队），就绪任务优先"""
+        while self._ready:
+            _, seq, job = self._ready[0]
+            if self._is_live(job, seq):
+                return job
+            heapq.heappop(self._ready)
+        while self._pending:
+            _, seq, job = self._pending[0]
+            if self._is_live(job, seq):
+                return job
+            heapq.heappop(self._pending)
+        return None
+
+    def ready_count(self, now: Optional[float] = None) -> int:
+        """已到期但尚未执行的任务数"""
+        now = time.time() if now is None else now
+        self._promote(now)
+        return sum(1 for _, seq, job in self._ready if self._is_live(job, seq))
+
+    def run(self, job: ScheduledJob) -> Dict[str, Any]:
+        """
+        执行任务并重新排期
+
+        Returns:
+            本次执行的调度指标（lateness_seconds / duration_seconds / deadline_missed）
+        """
+        started = time.time()
+        lateness = max(0.0, started - job.intended_ts)
+        deadline_missed = started > job.deadline_ts
+        next_due = None
+        try:
+            next_due = job.func(job)
+        finally:
+            finished = time.time()
+            job.runs += 1
+            self._record(job.kind, lateness, deadline_missed)
+            if not job.cancelled and self._jobs.get(job.key) is job:
+                if next_due is None and job.interval is not None:
+                    next_due = finished + job.interval
+                if next_due is not None:
+                    job.set_due(next_due)
+                    self._push(job)
+                else:
+                    self._jobs.pop(job.key, None)
+        return {
+            "lateness_seconds": round(lateness, 2),
+            "duration_seconds": round(finished - started, 2),
+            "deadline_missed": deadline_missed,
+        }
+
+    def _record(self, kind: str, lateness: float, deadline_missed: bool) -> None:
+        stat = self.stats.setdefault(kind, {
+            "runs": 0,
+            "lateness_total": 0.0,
+            "lateness_max": 0.0,
+            "deadline_missed": 0,
+        })
+        stat["runs"] += 1
+        stat["lateness_total"] += lateness
+        stat["lateness_max"] = max(stat["lateness_max"], lateness)
+        SCHEDULER_LATENESS_SECONDS.observe(lateness, kind=kind)
+        if deadline_missed:
+            stat["deadline_missed"] += 1
+            SCHEDULER_DEADLINE_MISSED.inc(kind=kind)
+
+    def lateness_summary(self) -> Dict[str, Dict[str, float]]:
+        """按任务类别汇总：执行次数、平均/最大延迟、错过截止次数"""
+        summary = {}
+        for kind, stat in self.stats.items():
+            runs = stat["runs"] or 1
+            summary[kind] = {
+                "runs": stat["runs"],
+                "avg_lateness": round(stat["lateness_total"] / runs, 2),
+                "max_lateness": round(stat["lateness_max"], 2),
+                "deadline_missed": stat["deadline_missed"],
+            }
+        return summary
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+持久化状态存储
+基于 WAL 模式 SQLite 的按命名空间键值存储，每次更新只写一行并在事务内完成，
+替代整文件重写的 story.txt / story_progress.json
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+from config import PROJECT_ROOT
+
+STATE_DB_FILE = os.path.join(PROJECT_ROOT, "data", "state.db")
+
+
+class StateStore:
+    """namespace + key -> JSON 值 的事务型存储（多进程安全）"""
+
+    def __init__(self, db_path: str = STATE_DB_FILE):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        if row is None:
+            return default
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return default
+
+    def items(self, namespace: str) -> Dict[str, Any]:
+        """读取命名空间下的全部键值"""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT key, value FROM kv WHERE namespace = ?", (namespace,)
+            ).fetchall()
+        result = {}
+        for key, value in rows:
+            try:
+                result[key] = json.loads(value)
+            except ValueError:
+                continue
+        return result
+
+    def put(self, namespace: str, key: str, value: Any) -> None:
+        """写入（覆盖）单个键"""
+        with self._lock:
+            self._connect().execute(
+                "INSERT INTO kv (namespace, key, value, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                (namespace, key, json.dumps(value, ensure_ascii=False), time.time()),
+            )
+
+    def merge(self, namespace: str, key: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        在同一事务内读取并合并字典值（只更新传入的字段）
+
+        Returns:
+            合并后的值
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+                ).fetchone()
+                current: Dict[str, Any] = {}
+                if row is not None:
+                    try:
+                        loaded = json.loads(row[0])
+                        if isinstance(loaded, dict):
+                            current = loaded
+                    except ValueError:
+                        pass
+                current.update(fields)
+                conn.execute(
+                    "INSERT INTO kv (namespace, key, value, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                    (namespace, key, json.dumps(current, ensure_ascii=False), time.time()),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return current
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._connect().execute(
+                "DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+
+    def import_if_empty(self, namespace: str, values: Dict[str, Any]) -> bool:
+        """
+        命名空间为空时批量导入（用于从旧文件一次性迁移）
+
+        Returns:
+            是否执行了导入
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT 1 FROM kv WHERE namespace = ? LIMIT 1", (namespace,)
+                ).fetchone()
+                if row is not None or not values:
+                    conn.execute("COMMIT")
+                    return False
+                now_ts = time.time()
+                conn.executemany(
+                    "INSERT INTO kv (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                    [
+                        (namespace, str(key), json.dumps(value, ensure_ascii=False), now_ts)
+                        for key, value in values.items()
+                    ],
+                )
+                conn.execute("COMMIT")
+                return True
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+
+_state_store: Optional[StateStore] = None
+
+
+def get_state_store() -> StateStore:
+    """获取进程内共享的状态存储实例"""
+    global _state_store
+    if _state_store is None:
+        _state_store = StateStore()
+    return _state_store
@@ -27,8 +27,23 @@ from config import (
     get_filter_days,
     get_max_videos_per_channel,
     get_config_provider,
+    get_config_value,
 )
-from logger import get_logger, log_with_context, TRACE_LEVEL
+from logger import get_logger, log_with_context, lazy, shorten, TRACE_LEVEL
+from channel_cache import get_channel_cache
+from state_store import get_state_store
+from handoff_queue import get_handoff_queue
+from metrics_store import PassMetrics, get_metrics_store
+from tracing import new_trace_id, record_span, span
+from metrics import (
+    CHANNEL_LIST_SECONDS,
+    DOWNLOADED_BYTES,
+    TRANSCODE_SECONDS,
+    VIDEO_DOWNLOAD_SECONDS,
+    VIDEOS_PROCESSED,
+)
+from task.story_index import StoryIndex
+from task.story_prefetch import StoryStaging, story_group_lock
 from pathlib import Path
 import random
 # 使用统一的日志系统
@@ -290,6 +305,44 @@ class TimestampedYTDLLogger:
 
 yt_base_url = "https://www.youtube.com/"
 
+
+def _extract_display_name(channel_info: Optional[dict]) -> Optional[str]:
+    """从频道列表结果中提取显示名（去掉 " - Videos" 后缀）"""
+    if not channel_info:
+        return None
+    display_name = channel_info.get('channel') or channel_info.get('uploader') or channel_info.get('title')
+    # 如果获取到的是 "Videos" 后缀的标题，尝试清理
+    if display_name and display_name.endswith(' - Videos'):
+        display_name = display_name.replace(' - Videos', '')
+    return display_name
+
+
+def _forget_channel_on_404(channel_name: str, error_str: str) -> bool:
+    """列表请求 404 时删除频道缓存：缓存的 channel_id 可能已失效，下次回退到 handle 重新解析"""
+    if "HTTP Error 404" not in error_str:
+        return False
+    get_channel_cache().invalidate(channel_name)
+    return True
+
+
+def _remember_channel_info(channel_name: str, channel_info: Optional[dict]) -> Optional[str]:
+    """
+    把列表结果中的 channel_id / 显示名写入频道缓存，返回显示名。
+    列表结果缺少显示名时回退到缓存中的旧值。
+    """
+    channel_cache = get_channel_cache()
+    display_name = _extract_display_name(channel_info)
+    channel_id = channel_info.get('channel_id') if channel_info else None
+    try:
+        channel_cache.update(channel_name, channel_id=channel_id, display_name=display_name)
+    except Exception as err:
+        logger.trace("更新频道缓存失败: %s", err)
+    if not display_name:
+        cached = channel_cache.get(channel_name, allow_stale=True)
+        if cached:
+            display_name = cached.get('display_name')
+    return display_name
+
 # 文件系统非法字符（Windows + Linux）
 ILLEGAL_FILENAME_CHARS = '<>:"/\\|?*'
 
@@ -371,7 +424,7 @@ def record_download_entry(video_id: str, channel_name: Optional[str]) -> None:
 
         has_check = getattr(provider, "has_download_record", None)
         if callable(has_check) and has_check(video_id):
-            logger.trace(f"下载存档记录已存在: {video_id}")
+            logger.trace("下载存档记录已存在: %s", video_id)
             return
 
         add_record = getattr(provider, "add_download_record", None)
@@ -401,6 +454,39 @@ def record_download_entry(video_id: str, channel_name: Optional[str]) -> None:
         )
 
 
+def announce_file_ready(file_path: str, video_info: dict, channel_name: Optional[str],
+                        group_name: Optional[str] = None, uploader: Optional[str] = None,
+                        trace_id: Optional[str] = None) -> None:
+    """
+    通知 Bot 有新文件可发送，附带完整元数据（Bot 无需再从文件名解析）。
+    登记失败不影响下载结果，Bot 会回退为按文件名解析。
+
+    trace_id 与登记时间随元数据传给 Bot，发送阶段的追踪 span 与下载阶段归入同一个 trace。
+    """
+    video_id = video_info.get('id')
+    metadata = {
+        'video_id': video_id,
+        'uploader': uploader or video_info.get('uploader') or video_info.get('channel') or channel_name,
+        'title': video_info.get('fulltitle') or video_info.get('title') or video_id,
+        'yt_channel': channel_name,
+        'group_name': group_name,
+        'timestamp': _extract_timestamp_from_entry(video_info),
+        'duration': video_info.get('duration'),
+        'trace_id': trace_id or new_trace_id(),
+        'ready_at': time.time(),
+    }
+    try:
+        get_handoff_queue().publish(file_path, metadata)
+    except Exception as err:
+        log_with_context(
+            logger, logging.WARNING,
+            "登记待发送文件失败",
+            video_id=video_id,
+            file_path=file_path,
+            error=str(err)
+        )
+
+
 def sync_download_archive():
     """从 Provider 同步已下载记录到本地文件，供 yt-dlp 使用"""
     try:
@@ -520,7 +606,7 @@ def member_content_filter(info_dict):
 
         # 只过滤私人视频（这个确实无法下载）
         if info_dict.get("availability") == "private":
-            logger.trace(f"⏭️ 跳过私人视频: {video_id}")
+            logger.trace("⏭️ 跳过私人视频: %s", video_id)
             return "私人视频"
 
         # 其他情况：允许尝试下载
@@ -661,9 +747,9 @@ def progress_hook(d):
         # 跳过 yt-dlp 下载中间产生的 .tmp.fXXX 片段日志，避免重复噪音
         if ".tmp.f" in filename:
             return
-        logger.trace(f"下载完成: {filename}")
+        logger.trace("下载完成: %s", filename)
     elif d['status'] == 'already_downloaded':
-        logger.trace(f"已存在: {d.get('title', '')}")
+        logger.trace("已存在: %s", d.get('title', ''))
 
 
 def get_available_format(url):
@@ -688,6 +774,54 @@ def get_available_format(url):
         return "best"
 
 
+def _postprocess_timer(pass_metrics: PassMetrics, video_id: str, trace_id: Optional[str] = None):
+    """yt-dlp postprocessor_hooks：把 FFmpeg 后处理耗时计入 transcode 阶段"""
+    started = {}
+
+    def hook(d):
+        name = d.get('postprocessor')
+        if d.get('status') == 'started':
+            started[name] = (time.monotonic(), time.time())
+        elif d.get('status') == 'finished' and name in started:
+            started_mono, started_at = started.pop(name)
+            elapsed = time.monotonic() - started_mono
+            pass_metrics.add('transcode', elapsed, video_id)
+            record_span(trace_id, 'transcode', started_at, started_at + elapsed,
+                        video_id=video_id, postprocessor=name, parent='download')
+
+    return hook
+
+
+def _export_pass_metrics(pass_metrics: PassMetrics) -> None:
+    """本轮统计计入进程内运行指标（/metrics）"""
+    if pass_metrics.stages.get('list'):
+        CHANNEL_LIST_SECONDS.observe(pass_metrics.stages['list'], channel=pass_metrics.channel)
+    for timings in pass_metrics.video_stages.values():
+        if timings.get('download'):
+            VIDEO_DOWNLOAD_SECONDS.observe(timings['download'])
+        if timings.get('transcode'):
+            TRANSCODE_SECONDS.observe(timings['transcode'])
+    for detail in pass_metrics.stats.get('details', []):
+        VIDEOS_PROCESSED.inc(status=detail.get('status', 'unknown'))
+
+
+def _record_pass_metrics(pass_metrics: PassMetrics) -> None:
+    """保存本轮统计到 data/metrics.db（失败不影响下载）"""
+    _export_pass_metrics(pass_metrics)
+    if not get_config_value('pass_metrics.enabled', True):
+        return
+    try:
+        get_metrics_store().record_pass(pass_metrics)
+    except Exception as e:
+        log_with_context(
+            logger, logging.WARNING,
+            "保存频道轮次统计失败",
+            yt_channel=pass_metrics.channel,
+            error_type=type(e).__name__,
+            error=str(e)
+        )
+
+
 def dl_audio_latest(channel_name, audio_folder=None, group_name=None):
     """
     下载指定YouTube频道的最新音频
@@ -697,6 +831,19 @@ def dl_audio_latest(channel_name, audio_folder=None, group_name=None):
         audio_folder: 音频保存目录（可选，默认使用AUDIO_FOLDER）
         group_name: 频道组名称（用于日志）
     """
+    pass_metrics = PassMetrics(channel_name, group_name)
+    result = 'exception'
+    try:
+        ok = _dl_audio_latest_pass(channel_name, audio_folder, group_name, pass_metrics)
+        result = 'ok' if ok else 'failed'
+        return ok
+    finally:
+        pass_metrics.finish(result)
+        _record_pass_metrics(pass_metrics)
+
+
+def _dl_audio_latest_pass(channel_name, audio_folder, group_name, pass_metrics: PassMetrics):
+    """dl_audio_latest 的实际处理流程，统计与阶段耗时写入 pass_metrics"""
     if not check_cookies():
         return False
     
@@ -726,17 +873,8 @@ def dl_audio_latest(channel_name, audio_folder=None, group_name=None):
     
     ydl_opts = get_ydl_opts(custom_opts)
     
-    # 统计信息
-    stats = {
-        'total': 0,
-        'success': 0,
-        'already_exists': 0,
-        'filtered': 0,
-        'archived': 0,
-        'member_only': 0,
-        'error': 0,
-        'details': []
-    }
+    # 统计信息（total / success / already_exists / filtered / archived / member_only / error / details）
+    stats = pass_metrics.stats
     # 兜底初始化，防止在拉取列表阶段异常时未赋值就被引用
     video_title = None
     video_id = None
@@ -753,18 +891,18 @@ def dl_audio_latest(channel_name, audio_folder=None, group_name=None):
     with yt_dlp.YoutubeDL(list_opts) as list_ydl:
         try:
             # YouTube频道结构变化：直接访问 /videos 页面获取视频列表
-            url = f"{yt_base_url}{channel_name}/videos"
+            # 已缓存 channel_id 时使用 channel/UC... 地址，跳过 handle 解析
+            channel_cache = get_channel_cache()
+            url = channel_cache.videos_url(channel_name, yt_base_url)
             log_with_context(logger, logging.INFO, "开始获取频道视频列表", yt_channel=channel_name, url=url)
-            channel_info = list_ydl.extract_info(url, download=False)
+            list_started_at = time.time()
+            with pass_metrics.stage('list'):
+                channel_info = list_ydl.extract_info(url, download=False)
+            list_window = (list_started_at, list_started_at + pass_metrics.stages['list'])
             entries_count = len(channel_info.get('entries', [])) if channel_info else 0
             
             # 获取频道显示名（因为 extract_flat=True 时 entries 里可能没有）
-            channel_display_name = None
-            if channel_info:
-                channel_display_name = channel_info.get('channel') or channel_info.get('uploader') or channel_info.get('title')
-                # 如果获取到的是 "Videos" 后缀的标题，尝试清理
-                if channel_display_name and channel_display_name.endswith(' - Videos'):
-                    channel_display_name = channel_display_name.replace(' - Videos', '')
+            channel_display_name = _remember_channel_info(channel_name, channel_info)
             
             log_with_context(logger, logging.INFO, "频道信息获取完成", yt_channel=channel_name, display_name=channel_display_name, entries_count=entries_count)
             
@@ -821,10 +959,10 @@ def dl_audio_latest(channel_name, audio_folder=None, group_name=None):
                 if not video_url and video_id and video_id != 'unknown':
                     # 从 video_id 构建完整的 YouTube URL
                     video_url = f"https://www.youtube.com/watch?v={video_id}"
-                    logger.trace(f"从 video_id 构建 URL: {video_url}")
+                    logger.trace("从 video_id 构建 URL: %s", video_url)
                 
                 if not video_url:
-                    logger.trace(f"跳过条目，无URL且无ID: {video_title}")
+                    logger.trace("跳过条目，无URL且无ID: %s", video_title)
                     stats['error'] += 1
                     stats['details'].append({
                         'index': idx,
@@ -849,9 +987,10 @@ def dl_audio_latest(channel_name, audio_folder=None, group_name=None):
                 if filter_result:
                     log_with_context(
                         logger, TRACE_LEVEL,
-                        f"⏭️ 跳过视频（{filter_result}）",
+                        "⏭️ 跳过视频",
+                        reason=filter_result,
                         yt_channel=channel_name,
-                        title=video_title[:60] + "..." if len(video_title) > 60 else video_title,
+                        title=lazy(shorten, video_title, 60),
                         video_id=video_id,
                         index=idx,
                         total=stats['total'],
@@ -891,8 +1030,9 @@ def dl_audio_latest(channel_name, audio_folder=None, group_name=None):
                 if os.path.exists(final_destination_audio_path):
                     log_with_context(
                         logger, TRACE_LEVEL,
-                        f"⏭️  文件已存在，跳过 {video_id}",
-                        yt_channel=channel_name
+                        "⏭️  文件已存在，跳过",
+                        yt_channel=channel_name,
+                        video_id=video_id
                     )
                     stats['already_exists'] += 1
                     stats['details'].append({
@@ -915,6 +1055,10 @@ def dl_audio_latest(channel_name, audio_folder=None, group_name=None):
                     })
                     continue
                 
+                # 每个实际下载的视频一个 trace；频道列表是整轮共用的，同样计入各 trace
+                trace_id = new_trace_id()
+                record_span(trace_id, 'list', *list_window, video_id=video_id, yt_channel=channel_name, shared=True)
+
                 current_video_ydl_opts = ydl_opts.copy()
                 # FFmpeg后处理器会将 filename.tmp 转换为 filename.tmp.m4a
                 current_video_ydl_opts['outtmpl'] = temp_audio_path_without_ext + '.tmp'
@@ -929,8 +1073,10 @@ def dl_audio_latest(channel_name, audio_folder=None, group_name=None):
                     if filter_result:
                         log_with_context(
                             logger, TRACE_LEVEL,
-                            f"⏭️ 跳过 {video_id} ({filter_result})",
-                            yt_channel=channel_name
+                            "⏭️ 跳过视频",
+                            yt_channel=channel_name,
+                            video_id=video_id,
+                            reason=filter_result
                         )
                         stats['filtered'] += 1
                         stats['details'].append({
@@ -971,7 +1117,7 @@ def dl_audio_latest(channel_name, audio_folder=None, group_name=None):
                             else:
                                 download_context['filter_reason'] = '被日期过滤器拦截'
                             # 降级为 trace，不刷屏（这是预期行为）
-                            self._logger.trace(f"⏭️ {cleaned}")
+                            self._logger.trace("⏭️ %s", cleaned)
                         else:
                             self._logger.warning(f'⚠️ yt-dlp: {cleaned}')
                     
@@ -985,7 +1131,7 @@ def dl_audio_latest(channel_name, audio_folder=None, group_name=None):
                             download_context['member_blocked'] = True
                             download_context['error_reason'] = '会员专属内容'
                             # 降级为 trace，不刷屏
-                            self._logger.trace(f"🔒 {cleaned}")
+                            self._logger.trace("🔒 %s", cleaned)
                         elif 'requested format is not available' in lower and download_context.get('member_blocked'):
                             # 格式不可用可能是会员限制的结果，静默处理
                             self._logger.trace(cleaned)
@@ -993,10 +1139,13 @@ def dl_audio_latest(channel_name, audio_folder=None, group_name=None):
                             self._logger.error(f'❌ yt-dlp: {cleaned}')
                 
                 current_video_ydl_opts['logger'] = ContextAwareYTDLLogger()
+                current_video_ydl_opts['postprocessor_hooks'] = [_postprocess_timer(pass_metrics, video_id, trace_id)]
                 
                 try:
-                    with yt_dlp.YoutubeDL(current_video_ydl_opts) as video_ydl:
-                        video_ydl.download([video_url]) 
+                    with span(trace_id, 'download', video_id=video_id, yt_channel=channel_name), \
+                            pass_metrics.stage('download', video_id):
+                        with yt_dlp.YoutubeDL(current_video_ydl_opts) as video_ydl:
+                            video_ydl.download([video_url]) 
                     
                     temp_audio_path = next((p for p in possible_temp_paths if os.path.exists(p)), None)
                     if temp_audio_path:
@@ -1004,10 +1153,14 @@ def dl_audio_latest(channel_name, audio_folder=None, group_name=None):
                         if os.path.normcase(temp_audio_path) == os.path.normcase(final_destination_audio_path):
                             rename_ok = True
                         else:
-                            rename_ok = safe_rename_file(temp_audio_path, final_destination_audio_path)
+                            with span(trace_id, 'rename', video_id=video_id), \
+                                    pass_metrics.stage('rename', video_id):
+                                rename_ok = safe_rename_file(temp_audio_path, final_destination_audio_path)
 
                         if rename_ok:
-                            file_size_mb = os.path.getsize(final_destination_audio_path) / (1024 * 1024)
+                            file_size = os.path.getsize(final_destination_audio_path)
+                            file_size_mb = file_size / (1024 * 1024)
+                            DOWNLOADED_BYTES.inc(file_size, channel=channel_name)
                             log_with_context(
                                 logger, logging.INFO,
                                 f"✅ 下载成功 {video_id}",
@@ -1025,6 +1178,10 @@ def dl_audio_latest(channel_name, audio_folder=None, group_name=None):
                             })
 
                             record_download_entry(video_id, channel_name)
+                            announce_file_ready(
+                                final_destination_audio_path, video_info, channel_name,
+                                group_name=group_name, uploader=uploader, trace_id=trace_id
+                            )
 
                             # 视频间延迟（如果不是最后一个视频）
                             if idx < stats['total']:
@@ -1040,7 +1197,8 @@ def dl_audio_latest(channel_name, audio_folder=None, group_name=None):
                                         current_video=idx,
                                         total_videos=stats['total']
                                     )
-                                    time.sleep(delay)
+                                    with pass_metrics.stage('delay'):
+                                        time.sleep(delay)
                         else:
                             log_with_context(
                                 logger, logging.ERROR,
@@ -1062,8 +1220,9 @@ def dl_audio_latest(channel_name, audio_folder=None, group_name=None):
                             filter_reason = download_context.get('filter_reason', '被过滤器拦截')
                             log_with_context(
                                 logger, TRACE_LEVEL,
-                                f"⏭️ 跳过已过滤视频 {video_id}",
+                                "⏭️ 跳过已过滤视频",
                                 yt_channel=channel_name,
+                                video_id=video_id,
                                 reason=filter_reason
                             )
                             stats['filtered'] += 1
@@ -1078,8 +1237,9 @@ def dl_audio_latest(channel_name, audio_folder=None, group_name=None):
                             # 会员内容被静默跳过，这是预期行为，用 DEBUG 级别记录
                             log_with_context(
                                 logger, TRACE_LEVEL,
-                                f"🔒 跳过会员视频 {video_id}",
+                                "🔒 跳过会员视频",
                                 yt_channel=channel_name,
+                                video_id=video_id,
                                 reason=download_context.get('error_reason', '会员专属内容')
                             )
                             stats['member_only'] += 1
@@ -1246,7 +1406,8 @@ def dl_audio_latest(channel_name, audio_folder=None, group_name=None):
                 already_exists=stats['already_exists'],
                 archived=stats['archived'],
                 member_only=stats['member_only'],
-                error=stats['error']
+                error=stats['error'],
+                **pass_metrics.summary()
             )
             
             # 详细列表信息已通过每个视频的独立日志输出，此处不再重复输出
@@ -1314,7 +1475,7 @@ def dl_audio_latest(channel_name, audio_folder=None, group_name=None):
                 error=error_msg
             )
             
-            if "HTTP Error 404" in error_str:
+            if _forget_channel_on_404(channel_name, error_str):
                 logger.error(f"频道 {channel_name} 不存在或无法访问，请检查频道名称是否正确。")
             elif any(msg in error_str.lower() for msg in ["sign in to confirm", "unable to download api page", "not a bot", "consent"]):
                 logger.error("Cookies可能已过期或需要同意YouTube政策！")
@@ -1341,25 +1502,40 @@ def closest_after_filter(target_timestamp):
     return filter_func
 
 
-def update_channel_info_file(channel_name, target_timestamp, info_file_path):
-    updated = False
-    lines = []
+def _story_timestamps_namespace(info_file_path: str) -> str:
+    """历史时间戳在状态存储中的命名空间（按频道列表文件区分）"""
+    if os.path.abspath(info_file_path) == os.path.abspath(STORY_FILE):
+        return "story_timestamps"
+    return f"story_timestamps:{os.path.abspath(info_file_path)}"
 
-    if os.path.exists(STORY_FILE):
-        with open(STORY_FILE, "r", encoding="utf-8") as f:
-            lines = f.readlines()
 
-    for i, line in enumerate(lines):
-        if line.startswith(channel_name):
-            lines[i] = f"{channel_name} {target_timestamp}\n"
-            updated = True
-            break
+_migrated_info_files = set()
+
 
-    if not updated:
-        lines.append(f"{channel_name} {target_timestamp}\n")
+def _migrate_channel_info_file(info_file_path: str) -> None:
+    """首次使用时把频道列表文件中的时间戳导入状态存储（每个进程只检查一次）"""
+    abs_path = os.path.abspath(info_file_path)
+    if abs_path in _migrated_info_files:
+        return
+    _migrated_info_files.add(abs_path)
+    if not os.path.exists(info_file_path):
+        return
+    values = {}
+    with open(info_file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.strip().split()
+            if len(parts) > 1:
+                try:
+                    values[parts[0]] = int(parts[1])
+                except ValueError:
+                    continue
+    get_state_store().import_if_empty(_story_timestamps_namespace(info_file_path), values)
 
-    with open(STORY_FILE, "w", encoding="utf-8") as f:
-        f.writelines(lines)
+
+def update_channel_info_file(channel_name, target_timestamp, info_file_path):
+    """记录频道最近处理到的时间戳（单行事务更新，不再重写整个文件）"""
+    _migrate_channel_info_file(info_file_path)
+    get_state_store().put(_story_timestamps_namespace(info_file_path), channel_name, int(target_timestamp))
 
 
 def dl_audio_closest_after(au_folder, channel_name, target_timestamp=None):
@@ -1461,7 +1637,7 @@ def dl_audio_closest_after(au_folder, channel_name, target_timestamp=None):
             final_destination_audio_path = os.path.join(au_folder, f"{final_audio_filename_stem}{expected_audio_ext}")
 
             if os.path.exists(final_destination_audio_path):
-                logger.trace(f"最终音频文件已存在，跳过: {final_destination_audio_path}")
+                logger.trace("最终音频文件已存在，跳过: %s", final_destination_audio_path)
                 timestamp_to_update = closest_video.get("timestamp", closest_video.get("upload_date"))
                 if timestamp_to_update:
                     if isinstance(timestamp_to_update, str):
@@ -1488,6 +1664,7 @@ def dl_audio_closest_after(au_folder, channel_name, target_timestamp=None):
                     )
 
                     record_download_entry(video_id_history, channel_name)
+                    announce_file_ready(final_destination_audio_path, closest_video, channel_name, uploader=uploader)
                 else:
                     logger.error(f"历史视频重命名失败，跳过此文件")
 
@@ -1519,10 +1696,18 @@ def read_and_process_channels(channels_file_path, au_folder):
     with open(channels_file_path, "r", encoding="utf-8") as f:
         lines = f.readlines()
 
+    # 频道列表仍来自文件，处理进度以状态存储为准
+    _migrate_channel_info_file(channels_file_path)
+    stored_timestamps = get_state_store().items(_story_timestamps_namespace(channels_file_path))
+
     for line in lines:
         parts = line.strip().split()
+        if not parts:
+            continue
         channel_name = parts[0]
         timestamp = int(parts[1]) if len(parts) > 1 else None
+        if channel_name in stored_timestamps:
+            timestamp = stored_timestamps[channel_name]
 
         log_with_context(
             logger, logging.INFO,
@@ -1551,29 +1736,17 @@ def _extract_timestamp_from_entry(entry: dict) -> Optional[int]:
     return None
 
 
-def dl_audio_story(channel_name: str, audio_folder: str, group_name: str, items_per_run: int = 1) -> bool:
-    """Download next batch for story-type channels (oldest to newest)."""
-    if not check_cookies():
-        return False
-
-    target_folder = audio_folder if audio_folder else AUDIO_FOLDER
-    os.makedirs(target_folder, exist_ok=True)
-    
-    # 清理目标目录中的残留临时文件
-    cleanup_incomplete_downloads(target_folder)
-
-    provider = get_config_provider()
-    progress: dict = {}
-    try:
-        progress = provider.get_story_progress(group_name) or {}
-    except Exception as err:
-        logger.warning(f"读取故事进度失败: {err}")
-        progress = {}
-
-    last_video_id = progress.get("last_video_id")
-    last_ts = progress.get("last_timestamp")
-    run_started_ts = time.time()
-
+def _select_story_entries_full_scan(
+    channel_name: str,
+    group_name: str,
+    last_video_id: Optional[str],
+    last_ts_int: Optional[int],
+    items_limit: int,
+) -> Optional[list]:
+    """
+    完整扫描频道（从旧到新，含完整元数据）并按检查点选取下一批。
+    索引不可用时的回退路径；拉取失败返回 None。
+    """
     list_opts = {
         "quiet": True,
         "cookiefile": COOKIES_FILE,
@@ -1581,15 +1754,6 @@ def dl_audio_story(channel_name: str, audio_folder: str, group_name: str, items_
     }
     list_opts = apply_js_runtime(list_opts)
 
-    last_ts_int: Optional[int] = None
-    if last_ts is not None:
-        try:
-            last_ts_int = int(last_ts)
-        except (TypeError, ValueError):
-            last_ts_int = None
-
-    timestamp_checkpoint_value = last_ts_int if last_ts_int is not None else last_ts
-
     if last_ts_int is not None:
         try:
             cutoff_dt = datetime.datetime.fromtimestamp(
@@ -1605,13 +1769,14 @@ def dl_audio_story(channel_name: str, audio_folder: str, group_name: str, items_
                 f"⚠️ 故事频道 {group_name} 设置 dateafter 失败，将回退到完整扫描: {err}"
             )
     selected_entries: list = []
-    items_limit = max(1, int(items_per_run or 1))
-    channel_url = f"{yt_base_url}{channel_name}/videos"
+    channel_url = get_channel_cache().videos_url(channel_name, yt_base_url)
 
     try:
         with yt_dlp.YoutubeDL(list_opts) as list_ydl:
             channel_info = list_ydl.extract_info(channel_url, download=False)
+        _remember_channel_info(channel_name, channel_info)
     except Exception as err:
+        _forget_channel_on_404(channel_name, str(err))
         log_with_context(
             logger,
             logging.ERROR,
@@ -1619,7 +1784,7 @@ def dl_audio_story(channel_name: str, audio_folder: str, group_name: str, items_
             yt_channel=channel_name,
             error=str(err),
         )
-        return False
+        return None
 
     entries = []
     raw_entries = channel_info.get("entries") if channel_info else None
@@ -1681,6 +1846,317 @@ def dl_audio_story(channel_name: str, audio_folder: str, group_name: str, items_
             yt_channel=channel_name,
         )
 
+    return selected_entries
+
+
+def _list_channel_flat(channel_name: str, playlistend: Optional[int] = None) -> Optional[list]:
+    """
+    以 extract_flat 方式列出频道视频（频道页顺序：新 -> 旧），只包含 ID/标题等轻量字段。
+    拉取失败返回 None。
+    """
+    list_opts = {
+        "quiet": True,
+        "cookiefile": COOKIES_FILE,
+        "extract_flat": True,
+    }
+    if playlistend:
+        list_opts["playlistend"] = playlistend
+    list_opts = apply_js_runtime(list_opts)
+    channel_url = get_channel_cache().videos_url(channel_name, yt_base_url)
+    try:
+        with yt_dlp.YoutubeDL(list_opts) as list_ydl:
+            channel_info = list_ydl.extract_info(channel_url, download=False)
+        _remember_channel_info(channel_name, channel_info)
+    except Exception as err:
+        _forget_channel_on_404(channel_name, str(err))
+        log_with_context(
+            logger,
+            logging.ERROR,
+            "Story mode: failed to list channel",
+            yt_channel=channel_name,
+            error=str(err),
+        )
+        return None
+    raw_entries = channel_info.get("entries") if channel_info else None
+    return [entry for entry in (raw_entries or []) if entry and isinstance(entry, dict)]
+
+
+def _get_story_index_refresh_window() -> int:
+    """增量刷新索引时检查的最新视频数"""
+    try:
+        return max(1, int(get_config_value('downloader.story_index_refresh_window', 50)))
+    except (TypeError, ValueError):
+        return 50
+
+
+def _select_story_entries_from_index(
+    channel_name: str,
+    last_video_id: Optional[str],
+    last_ts_int: Optional[int],
+    items_limit: int,
+) -> Optional[tuple]:
+    """
+    通过持久化索引选取下一批故事条目。
+
+    - 索引不存在时做一次 extract_flat 完整列表并构建
+    - 只有待处理条目不足一批时才拉取最新 N 条增量追加（无重叠则完整重建）
+
+    Returns:
+        (index, 索引条目列表)；检查点无法在索引中定位时返回 None，由调用方完整扫描
+    """
+    index = StoryIndex(channel_name).load()
+    if not index.is_built:
+        entries = _list_channel_flat(channel_name)
+        if entries is None:
+            return None
+        index.rebuild(entries)
+        index.save()
+        log_with_context(
+            logger,
+            logging.INFO,
+            "Story mode: index built",
+            yt_channel=channel_name,
+            entries=len(index),
+        )
+
+    has_checkpoint = last_video_id is not None or last_ts_int is not None
+    position = index.position_of(last_video_id)
+    if has_checkpoint and position is None:
+        return None
+
+    selected = index.entries_after(position, items_limit)
+    if len(selected) < items_limit:
+        # 已追上索引末尾：检查是否有新上传
+        latest = _list_channel_flat(channel_name, playlistend=_get_story_index_refresh_window())
+        if latest is not None:
+            added = index.append_new(latest)
+            if added < 0:
+                full_entries = _list_channel_flat(channel_name)
+                if full_entries is not None:
+                    index.rebuild(full_entries)
+                    added = len(index)
+            index.save()
+            log_with_context(
+                logger,
+                TRACE_LEVEL,
+                "Story mode: index refreshed",
+                yt_channel=channel_name,
+                added=added,
+                entries=len(index),
+            )
+            position = index.position_of(last_video_id)
+            if has_checkpoint and position is None:
+                return None
+            selected = index.entries_after(position, items_limit)
+    return index, selected
+
+
+def _fetch_story_entries(
+    indexed_entries: list,
+    channel_name: str,
+    story_index: Optional[StoryIndex] = None,
+    staging: Optional[StoryStaging] = None,
+) -> list:
+    """
+    只为选中的条目拉取完整元数据（上传者、精确时间戳等），失败时使用索引中的轻量信息；
+    已预取的条目直接使用暂存清单中的元数据
+    """
+    if not indexed_entries:
+        return []
+    info_opts = apply_js_runtime({
+        "quiet": True,
+        "cookiefile": COOKIES_FILE,
+        "ignoreerrors": True,
+    })
+    results = []
+    with yt_dlp.YoutubeDL(info_opts) as info_ydl:
+        for item in indexed_entries:
+            video_id = item.get('id')
+            staged = staging.get(video_id) if staging is not None else None
+            if staged:
+                results.append({
+                    'id': video_id,
+                    'title': staged.get('title') or item.get('title'),
+                    'uploader': staged.get('uploader'),
+                    'timestamp': staged.get('timestamp') if staged.get('timestamp') is not None else item.get('ts'),
+                })
+                continue
+            entry = None
+            try:
+                entry = info_ydl.extract_info(f"{yt_base_url}watch?v={video_id}", download=False)
+            except Exception as err:
+                log_with_context(
+                    logger,
+                    logging.WARNING,
+                    "Story mode: failed to fetch video metadata",
+                    yt_channel=channel_name,
+                    video_id=video_id,
+                    error=str(err),
+                )
+            if not entry:
+                entry = {'id': video_id, 'title': item.get('title'), 'timestamp': item.get('ts')}
+            elif story_index is not None:
+                story_index.set_timestamp(video_id, _extract_timestamp_from_entry(entry))
+            results.append(entry)
+    if story_index is not None:
+        story_index.save()
+    return results
+
+
+def _story_entry_stem(entry: dict, channel_name: str) -> str:
+    """故事条目的最终文件名（不含扩展名）：上传者.视频ID.标题"""
+    video_id = entry.get("id") or ""
+    uploader = entry.get("uploader") or entry.get("channel") or channel_name or "UnknownChannel"
+    title = entry.get("fulltitle") or entry.get("title") or video_id
+    return f"{sanitize_filename(uploader)}.{video_id}.{sanitize_filename(title)}"
+
+
+def _download_story_entry(entry: dict, channel_name: str, target_folder: str) -> Optional[str]:
+    """
+    下载单个故事条目到目标目录（先写 .tmp，完成后重命名为最终文件名）
+
+    Returns:
+        最终音频文件路径；下载或重命名失败返回 None
+    """
+    video_id = entry.get("id") or ""
+    video_url = entry.get("webpage_url") or entry.get("url") or f"{yt_base_url}watch?v={video_id}"
+    final_destination_audio_path = os.path.join(target_folder, f"{_story_entry_stem(entry, channel_name)}.m4a")
+
+    # 准备一个容器来接真实文件名
+    downloaded_file_info = {"path": None}
+
+    def story_progress_hook(d):
+        if d['status'] == 'finished':
+            # 获取真实的文件路径
+            downloaded_file_info["path"] = d.get('filename')
+
+    custom_opts = {
+        "match_filter": member_content_filter,
+        "keepvideo": False,
+        "outtmpl": os.path.join(target_folder, f"%(uploader)s.%(id)s.%(title)s.tmp"),
+        "progress_hooks": [story_progress_hook],
+    }
+    ydl_opts = get_ydl_opts(custom_opts)
+
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            ydl.download([video_url])
+    except yt_dlp.utils.DownloadError as de:
+        logger.error(f"故事视频下载错误: {de}")
+        return None
+    except Exception as e:
+        logger.error(f"故事视频下载异常: {e}")
+        return None
+
+    # 使用 Hook 捕获的真实路径
+    hook_reported_temp_path = downloaded_file_info.get("path")
+    actual_temp_path = hook_reported_temp_path
+    resolved_temp_path = None
+
+    candidate_paths = []
+    if actual_temp_path:
+        candidate_paths.append(actual_temp_path)
+        parent_dir, temp_filename = os.path.split(actual_temp_path)
+        if ".tmp.f" in temp_filename:
+            normalized_filename = re.sub(r"(\.tmp)\.f\d+(?=\.)", r"\1", temp_filename)
+            candidate_paths.append(os.path.join(parent_dir, normalized_filename))
+
+    for candidate in candidate_paths:
+        if candidate and os.path.exists(candidate):
+            resolved_temp_path = candidate
+            break
+
+    # 如果 Hook 没拿到，尝试模糊查找
+    if not resolved_temp_path:
+        for f in os.listdir(target_folder):
+            if video_id in f and (f.endswith('.tmp.m4a') or f.endswith('.tmp')):
+                resolved_temp_path = os.path.join(target_folder, f)
+                break
+
+    actual_temp_path = resolved_temp_path
+
+    if actual_temp_path and os.path.exists(actual_temp_path):
+        if safe_rename_file(actual_temp_path, final_destination_audio_path):
+            file_size = os.path.getsize(final_destination_audio_path)
+            file_size_mb = file_size / (1024 * 1024)
+            DOWNLOADED_BYTES.inc(file_size, channel=channel_name)
+            log_with_context(
+                logger, logging.INFO,
+                "故事视频下载成功",
+                yt_channel=channel_name,
+                video_id=video_id,
+                size_mb=round(file_size_mb, 2)
+            )
+            return final_destination_audio_path
+        logger.error(f"故事视频重命名失败: {actual_temp_path}")
+    else:
+        logger.error(f"未找到预期的临时文件 (hook path: {hook_reported_temp_path})")
+    return None
+
+
+def dl_audio_story(channel_name: str, audio_folder: str, group_name: str, items_per_run: int = 1) -> bool:
+    """Download next batch for story-type channels (oldest to newest)."""
+    if not check_cookies():
+        return False
+
+    target_folder = audio_folder if audio_folder else AUDIO_FOLDER
+    os.makedirs(target_folder, exist_ok=True)
+    
+    # 清理目标目录中的残留临时文件
+    cleanup_incomplete_downloads(target_folder)
+
+    # 与后台预取互斥：预取中的条目下载完成后再交付
+    with story_group_lock(group_name):
+        return _download_story_batch(channel_name, target_folder, group_name, items_per_run)
+
+
+def _download_story_batch(channel_name: str, target_folder: str, group_name: str, items_per_run: int) -> bool:
+    provider = get_config_provider()
+    progress: dict = {}
+    try:
+        progress = provider.get_story_progress(group_name) or {}
+    except Exception as err:
+        logger.warning(f"读取故事进度失败: {err}")
+        progress = {}
+
+    staging = StoryStaging(group_name).load()
+    last_video_id = progress.get("last_video_id")
+    last_ts = progress.get("last_timestamp")
+    run_started_ts = time.time()
+
+    last_ts_int: Optional[int] = None
+    if last_ts is not None:
+        try:
+            last_ts_int = int(last_ts)
+        except (TypeError, ValueError):
+            last_ts_int = None
+
+    timestamp_checkpoint_value = last_ts_int if last_ts_int is not None else last_ts
+    items_limit = max(1, int(items_per_run or 1))
+
+    # 优先使用持久化索引按检查点位置选取下一批；检查点不在索引中时回退到完整扫描
+    story_index = None
+    indexed = None
+    try:
+        indexed = _select_story_entries_from_index(channel_name, last_video_id, last_ts_int, items_limit)
+    except Exception as err:
+        log_with_context(
+            logger,
+            logging.WARNING,
+            "Story mode: index lookup failed, falling back to full scan",
+            yt_channel=channel_name,
+            error=str(err),
+        )
+    if indexed is not None:
+        story_index, indexed_entries = indexed
+        selected_entries = _fetch_story_entries(indexed_entries, channel_name, story_index, staging)
+    else:
+        selected_entries = _select_story_entries_full_scan(
+            channel_name, group_name, last_video_id, last_ts_int, items_limit
+        )
+        if selected_entries is None:
+            return False
+
     if not selected_entries:
         log_with_context(
             logger,
@@ -1694,36 +2170,36 @@ def dl_audio_story(channel_name: str, audio_folder: str, group_name: str, items_
     last_progress_id = None
     last_progress_ts = None
     downloaded = 0
+    fetched = 0
 
     for entry in selected_entries:
         video_id = entry.get("id") or ""
         if not video_id:
             continue
-        video_url = entry.get("webpage_url") or entry.get("url") or f"{yt_base_url}watch?v={video_id}"
-
-        # 准备一个容器来接真实文件名
-        downloaded_file_info = {"path": None}
-
-        def story_progress_hook(d):
-            if d['status'] == 'finished':
-                # 获取真实的文件路径
-                downloaded_file_info["path"] = d.get('filename')
-
-        uploader = entry.get("uploader") or entry.get("channel") or channel_name or "UnknownChannel"
-        safe_uploader = sanitize_filename(uploader)
-        title = entry.get("fulltitle") or entry.get("title") or video_id
-        safe_title = sanitize_filename(title)
         ts = _extract_timestamp_from_entry(entry)
-
-        final_stem = f"{safe_uploader}.{video_id}.{safe_title}"
-        expected_audio_ext = ".m4a"
-        final_destination_audio_path = os.path.join(target_folder, f"{final_stem}{expected_audio_ext}")
+        final_destination_audio_path = os.path.join(
+            target_folder, f"{_story_entry_stem(entry, channel_name)}.m4a"
+        )
 
         last_progress_id = video_id
         last_progress_ts = ts
 
+        # 预取过的条目直接从暂存目录移动过来
+        released_path = staging.release(video_id, target_folder)
+        if released_path:
+            log_with_context(
+                logger, logging.INFO,
+                "故事视频已从预取暂存交付",
+                yt_channel=channel_name,
+                video_id=video_id
+            )
+            downloaded += 1
+            record_download_entry(video_id, channel_name)
+            announce_file_ready(released_path, entry, channel_name, group_name=group_name)
+            continue
+
         # 同一批故事条目之间增加视频级延迟，降低请求频率
-        if downloaded > 0:
+        if fetched > 0:
             v_delay_min = get_video_delay_min()
             v_delay_max = get_video_delay_max()
             if v_delay_max > 0 and v_delay_max >= v_delay_min:
@@ -1746,67 +2222,14 @@ def dl_audio_story(channel_name: str, audio_folder: str, group_name: str, items_
             )
             continue
 
-        custom_opts = {
-            "match_filter": member_content_filter,
-            "keepvideo": False,
-            "outtmpl": os.path.join(target_folder, f"%(uploader)s.%(id)s.%(title)s.tmp"),
-            "progress_hooks": [story_progress_hook],
-        }
-        ydl_opts = get_ydl_opts(custom_opts)
-
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([video_url])
-        except yt_dlp.utils.DownloadError as de:
-            logger.error(f"故事视频下载错误: {de}")
-            continue
-        except Exception as e:
-            logger.error(f"故事视频下载异常: {e}")
-            continue
-
-        # 使用 Hook 捕获的真实路径
-        hook_reported_temp_path = downloaded_file_info.get("path")
-        actual_temp_path = hook_reported_temp_path
-        resolved_temp_path = None
-
-        candidate_paths = []
-        if actual_temp_path:
-            candidate_paths.append(actual_temp_path)
-            parent_dir, temp_filename = os.path.split(actual_temp_path)
-            if ".tmp.f" in temp_filename:
-                normalized_filename = re.sub(r"(\.tmp)\.f\d+(?=\.)", r"\1", temp_filename)
-                candidate_paths.append(os.path.join(parent_dir, normalized_filename))
-
-        for candidate in candidate_paths:
-            if candidate and os.path.exists(candidate):
-                resolved_temp_path = candidate
-                break
-
-        # 如果 Hook 没拿到，尝试模糊查找
-        if not resolved_temp_path:
-            for f in os.listdir(target_folder):
-                if video_id in f and (f.endswith('.tmp.m4a') or f.endswith('.tmp')):
-                    resolved_temp_path = os.path.join(target_folder, f)
-                    break
-
-        actual_temp_path = resolved_temp_path
+        fetched += 1
+        downloaded_path = _download_story_entry(entry, channel_name, target_folder)
+        if downloaded_path:
+            downloaded += 1
+            record_download_entry(video_id, channel_name)
+            announce_file_ready(downloaded_path, entry, channel_name, group_name=group_name)
 
-        if actual_temp_path and os.path.exists(actual_temp_path):
-            if safe_rename_file(actual_temp_path, final_destination_audio_path):
-                file_size_mb = os.path.getsize(final_destination_audio_path) / (1024 * 1024)
-                log_with_context(
-                    logger, logging.INFO,
-                    "故事视频下载成功",
-                    yt_channel=channel_name,
-                    video_id=video_id,
-                    size_mb=round(file_size_mb, 2)
-                )
-                downloaded += 1
-                record_download_entry(video_id, channel_name)
-            else:
-                logger.error(f"故事视频重命名失败: {actual_temp_path}")
-        else:
-            logger.error(f"未找到预期的临时文件 (hook path: {hook_reported_temp_path})")
+    staging.save()
 
     if last_progress_id:
         provider.update_story_progress(group_name, {
@@ -1818,3 +2241,85 @@ def dl_audio_story(channel_name: str, audio_folder: str, group_name: str, items_
         provider.update_story_progress(group_name, {"last_run_ts": int(run_started_ts)})
 
     return downloaded > 0
+
+
+def prefetch_story(channel_name: str, group_name: str, count: int, stop_event=None) -> int:
+    """
+    把故事组检查点之后的 count 集预先下载到暂存目录（由调度器空闲时在后台调用）
+
+    只使用视频索引定位后续条目；检查点无法在索引中定位时不预取，留给正式任务完整扫描。
+
+    Returns:
+        本次新暂存的集数
+    """
+    if count <= 0 or not check_cookies():
+        return 0
+    try:
+        progress = get_config_provider().get_story_progress(group_name) or {}
+    except Exception as err:
+        logger.warning(f"读取故事进度失败: {err}")
+        return 0
+    last_video_id = progress.get("last_video_id")
+    last_ts_int: Optional[int] = None
+    if progress.get("last_timestamp") is not None:
+        try:
+            last_ts_int = int(progress["last_timestamp"])
+        except (TypeError, ValueError):
+            last_ts_int = None
+
+    staged_count = 0
+    with story_group_lock(group_name):
+        indexed = _select_story_entries_from_index(channel_name, last_video_id, last_ts_int, count)
+        if indexed is None:
+            return 0
+        story_index, window = indexed
+        staging = StoryStaging(group_name).load()
+        removed = staging.prune([item['id'] for item in window])
+        if removed:
+            staging.save()
+        os.makedirs(staging.folder, exist_ok=True)
+        cleanup_incomplete_downloads(staging.folder)
+        pending = [item for item in window if not staging.get(item['id'])]
+
+    for item in pending:
+        if stop_event is not None and stop_event.is_set():
+            break
+        video_id = item['id']
+        with story_group_lock(group_name):
+            staging.load()
+            # 检查点可能已被正式任务推进，跳过已交付的条目
+            if staging.get(video_id) or is_video_in_download_archive(video_id):
+                continue
+            try:
+                current_progress = get_config_provider().get_story_progress(group_name) or {}
+            except Exception:
+                current_progress = progress
+            checkpoint_pos = story_index.position_of(current_progress.get("last_video_id"))
+            item_pos = story_index.position_of(video_id)
+            if checkpoint_pos is not None and item_pos is not None and item_pos <= checkpoint_pos:
+                continue
+            entries = _fetch_story_entries([item], channel_name, story_index)
+            if not entries:
+                continue
+            entry = entries[0]
+            final_path = _download_story_entry(entry, channel_name, staging.folder)
+            if not final_path:
+                continue
+            staging.add(
+                video_id,
+                final_path,
+                title=entry.get("fulltitle") or entry.get("title"),
+                uploader=entry.get("uploader") or entry.get("channel"),
+                timestamp=_extract_timestamp_from_entry(entry),
+            )
+            staging.save()
+            staged_count += 1
+        log_with_context(
+            logger,
+            logging.INFO,
+            "故事视频已预取",
+            tg_channel=group_name,
+            yt_channel=channel_name,
+            video_id=video_id,
+        )
+    return staged_count
@@ -3,10 +3,12 @@ import os
 import sys
 import math
 import glob
+import time
 import logging
 import asyncio
 import ffmpeg # type: ignore
-from typing import Optional
+from typing import Callable, Optional
+from pathlib import Path
 
 # 设置默认编码为UTF-8
 if sys.stdout.encoding != 'utf-8':
@@ -14,14 +16,26 @@ if sys.stdout.encoding != 'utf-8':
 if sys.stderr.encoding != 'utf-8':
     sys.stderr.reconfigure(encoding='utf-8')
 
+from telegram import InputFile
 from telegram.ext import ContextTypes
-from telegram.error import TimedOut, TelegramError
+from telegram.error import BadRequest, TimedOut, TelegramError
 from logger import get_logger, log_with_context, TRACE_LEVEL
 from config import get_sent_archive_path, get_config_provider
+from handoff_queue import get_handoff_queue
+from state_store import get_state_store
+from metrics import SEND_SECONDS, SENT_BYTES, SPLIT_SECONDS, TELEGRAM_ERRORS
+from tracing import new_trace_id, record_span, span
 
 # 使用统一的日志系统
 logger = get_logger('bot.send_file')
 
+# 已上传音频的 Telegram file_id 缓存（state.db 中的命名空间）
+FILE_ID_NAMESPACE = "telegram_file_ids"
+
+# 单文件上传上限（MB）：公共 Bot API 为 50MB（略低以留余量），自建 Bot API 服务器为 2000MB
+PUBLIC_API_UPLOAD_LIMIT_MB = 49
+LOCAL_API_UPLOAD_LIMIT_MB = 2000
+
 
 def extract_video_info_from_filename(filename: str) -> tuple:
     """
@@ -79,7 +93,7 @@ def record_sent_file(chat_id: str, video_id: str, title: str, channel_name: str
         
         # 检查是否已存在
         if provider.has_sent_record(video_id, chat_id):
-            logger.trace(f"视频 {video_id} 已在发送记录中")
+            logger.trace("视频 %s 已在发送记录中", video_id)
             return
         
         # 添加记录（配置提供者会处理本地或Notion存储）
@@ -141,6 +155,158 @@ def _get_segment_base_name(filename: str) -> str:
     return filename
 
 
+def _file_id_cache_key(bot, video_id: Optional[str], file_name: str, file_size: int) -> Optional[str]:
+    """
+    file_id 缓存键：bot_id:video_id:分段序号:文件字节数
+
+    file_id 只对上传它的 Bot 有效；分段序号和字节数保证同一视频的不同切割结果不会混用
+    """
+    if not video_id:
+        return None
+    try:
+        bot_id = bot.id
+    except Exception:
+        return None
+    part = _get_segment_index_from_filename(file_name)
+    part_label = "full" if part == math.inf else str(part)
+    return f"{bot_id}:{video_id}:{part_label}:{file_size}"
+
+
+def _get_cached_file_id(cache_key: Optional[str]) -> Optional[dict]:
+    if not cache_key:
+        return None
+    try:
+        cached = get_state_store().get(FILE_ID_NAMESPACE, cache_key)
+    except Exception as e:
+        logger.warning(f"读取 file_id 缓存失败: {e}")
+        return None
+    return cached if isinstance(cached, dict) and cached.get('file_id') else None
+
+
+def _remember_file_id(cache_key: Optional[str], message, duration_seconds: Optional[int]) -> None:
+    audio = getattr(message, 'audio', None)
+    if not cache_key or audio is None or not audio.file_id:
+        return
+    try:
+        get_state_store().put(FILE_ID_NAMESPACE, cache_key, {
+            'file_id': audio.file_id,
+            'duration': duration_seconds or audio.duration,
+        })
+    except Exception as e:
+        logger.warning(f"保存 file_id 缓存失败: {e}")
+
+
+def _forget_file_id(cache_key: Optional[str]) -> None:
+    if not cache_key:
+        return
+    try:
+        get_state_store().delete(FILE_ID_NAMESPACE, cache_key)
+    except Exception as e:
+        logger.warning(f"删除 file_id 缓存失败: {e}")
+
+
+class _UploadProgressReader:
+    """
+    上传用文件包装：httpx 按块读取（multipart 流式发送），每个上传只占用一个块的内存，
+    读取时按比例回报进度 on_progress(已发送字节, 总字节)
+    """
+
+    def __init__(self, file_obj, total_bytes: int,
+                 on_progress: Optional[Callable[[int, int], None]] = None, step: float = 0.25):
+        self._file = file_obj
+        self.total_bytes = total_bytes
+        self.sent_bytes = 0
+        self._on_progress = on_progress
+        self._report_every = max(1, int(total_bytes * step))
+        self._last_reported = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._file.read(size)
+        self.sent_bytes += len(chunk)
+        if self._on_progress and (
+            self.sent_bytes - self._last_reported >= self._report_every
+            or (not chunk and self._last_reported < self.sent_bytes)
+        ):
+            self._last_reported = self.sent_bytes
+            try:
+                self._on_progress(self.sent_bytes, self.total_bytes)
+            except Exception:
+                pass
+        return chunk
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        position = self._file.seek(offset, whence)
+        # httpx 重新发送请求体前会 seek(0)
+        self.sent_bytes = position
+        self._last_reported = position
+        return position
+
+    def __getattr__(self, name):
+        # fileno / tell / name 等交给原始文件，httpx 据此计算 Content-Length
+        return getattr(self._file, name)
+
+
+def _log_upload_progress(file_name: str) -> Callable[[int, int], None]:
+    def on_progress(sent_bytes: int, total_bytes: int) -> None:
+        log_with_context(
+            logger, TRACE_LEVEL,
+            "上传进度",
+            file_name=file_name,
+            sent_mb=round(sent_bytes / (1024 * 1024), 2),
+            percent=round(sent_bytes * 100 / total_bytes) if total_bytes else 100
+        )
+    return on_progress
+
+
+def _upload_limit_mb(bot) -> int:
+    """当前 Bot 的单文件上传上限；自建 Bot API 服务器（local_mode）下大文件无需切割"""
+    return LOCAL_API_UPLOAD_LIMIT_MB if getattr(bot, 'local_mode', False) else PUBLIC_API_UPLOAD_LIMIT_MB
+
+
+def _list_pending_files(audio_folder: str) -> list:
+    """待发送文件：过滤掉隐藏文件和临时文件(.tmp后缀或包含.tmp.)"""
+    try:
+        names = os.listdir(audio_folder)
+    except OSError:
+        return []
+    return [f for f in names
+            if os.path.isfile(os.path.join(audio_folder, f))
+            and not f.startswith('.')
+            and not f.endswith('.tmp')
+            and '.tmp.' not in f]  # 也过滤掉 .tmp.m4a 这种格式
+
+
+def count_pending_files(audio_folder: str) -> int:
+    """目录中等待发送的文件数"""
+    return len(_list_pending_files(audio_folder))
+
+
+def _load_handoff_metadata(audio_folder: str) -> dict:
+    """下载器登记的待发送文件元数据 {文件名: 元数据}；读取失败时返回空字典（回退为解析文件名）"""
+    try:
+        return get_handoff_queue().pending_for_folder(audio_folder)
+    except Exception as e:
+        logger.warning(f"读取待发送文件元数据失败: {e}")
+        return {}
+
+
+def _ack_handoff(file_path: str) -> None:
+    """原始文件已发送并删除后，移除交接队列中的记录"""
+    if os.path.exists(file_path):
+        return
+    try:
+        get_handoff_queue().ack(file_path)
+    except Exception as e:
+        logger.warning(f"移除待发送文件记录失败: {e}")
+
+
+def _record_wait_span(trace_id: str, metadata: Optional[dict], started_at: float) -> None:
+    """文件在目录中等待的时间：下载器登记到成功发送的那一次开始处理（失败重试不重复记录）"""
+    ready_at = (metadata or {}).get('ready_at')
+    if ready_at:
+        record_span(trace_id, 'wait', float(ready_at), started_at, video_id=metadata.get('video_id'))
+
+
 async def send_file(
     context: ContextTypes.DEFAULT_TYPE,
     chat_id,
@@ -158,14 +324,10 @@ async def send_file(
         except OSError as e:
             logger.error(f"无法创建/访问音频文件夹: {audio_folder}, 错误: {e}")
             return
-    # 过滤掉隐藏文件和临时文件(.tmp后缀或包含.tmp.)
-    files = [f for f in os.listdir(audio_folder) 
-             if os.path.isfile(os.path.join(audio_folder, f)) 
-             and not f.startswith('.') 
-             and not f.endswith('.tmp')
-             and '.tmp.' not in f]  # 也过滤掉 .tmp.m4a 这种格式
+    files = _list_pending_files(audio_folder)
     if not files:
         return
+    handoff_metadata = _load_handoff_metadata(audio_folder)
     
     # 分离分段文件和普通文件
     segment_files = [f for f in files if _is_segment_file(f)]
@@ -196,11 +358,14 @@ async def send_file(
             )
             for seg_file in group_files:
                 file_path = os.path.join(audio_folder, seg_file)
+                metadata = handoff_metadata.get(base_name)
                 send_success = await send_single_file(
                     context,
                     chat_id,
                     file_path,
                     group_name=group_name,
+                    metadata=metadata,
+                    trace_id=(metadata or {}).get('trace_id'),
                 )
                 if send_success:
                     try:
@@ -217,12 +382,17 @@ async def send_file(
     # 处理普通文件
     for file_name in normal_files:
         file_path = os.path.join(audio_folder, file_name)
+        metadata = handoff_metadata.get(file_name)
+        # 下载器登记的 trace 延续到发送阶段；手动放入目录的文件单独开一个 trace
+        trace_id = (metadata or {}).get('trace_id') or new_trace_id()
+        processing_started_at = time.time()
 
         file_size_mb = os.path.getsize(file_path) / (1024 * 1024)  # 文件大小（MB）
-        if file_size_mb > 49: # Use a slightly lower threshold to be safe
+        upload_limit_mb = _upload_limit_mb(context.bot)
+        if file_size_mb > upload_limit_mb:
             log_with_context(
                 logger, logging.INFO,
-                "文件超过49MB限制，将进行切割",
+                f"文件超过{upload_limit_mb}MB限制，将进行切割",
                 file_name=file_name,
                 size_mb=round(file_size_mb, 2)
             )
@@ -235,7 +405,10 @@ async def send_file(
             # Or, a simpler cap like initial_num_parts + 10 (max 10 retries)
             max_parts_cap = initial_num_parts + 10 
 
-            split_files = _recursive_split_and_check(file_path, file_size_mb, initial_num_parts, max_parts_cap)
+            with span(trace_id, 'split', file_name=file_name, size_mb=round(file_size_mb, 2)) as split_span, \
+                    SPLIT_SECONDS.time():
+                split_files = _recursive_split_and_check(file_path, file_size_mb, initial_num_parts, max_parts_cap)
+                split_span['parts'] = len(split_files or [])
             
             if split_files:
                 log_with_context(
@@ -251,6 +424,8 @@ async def send_file(
                         chat_id,
                         split_file_path,
                         group_name=group_name,
+                        metadata=metadata,
+                        trace_id=trace_id,
                     )
                     if send_success:
                         try:
@@ -270,6 +445,8 @@ async def send_file(
                         logger.info(f"已删除原始大文件: {file_path}")
                     except OSError as e:
                         logger.error(f"删除原始大文件失败: {file_path}, 错误: {e}")
+                    _ack_handoff(file_path)
+                    _record_wait_span(trace_id, metadata, processing_started_at)
                 else:
                     logger.warning(f"部分分片发送失败，保留原始文件: {file_path}")
             else:
@@ -280,6 +457,8 @@ async def send_file(
                 chat_id,
                 file_path,
                 group_name=group_name,
+                metadata=metadata,
+                trace_id=trace_id,
             )
             if send_success:
                 try:
@@ -290,6 +469,8 @@ async def send_file(
                         logger.info(f"已删除文件: {file_path}")
                 except OSError as e:
                     logger.error(f"删除文件失败: {file_path}, 错误: {e}")
+                _ack_handoff(file_path)
+                _record_wait_span(trace_id, metadata, processing_started_at)
             else:
                 logger.warning(f"发送失败，保留文件以便重试: {file_path}")
         
@@ -492,10 +673,19 @@ async def send_single_file(
     chat_id,
     file_path,
     group_name: Optional[str] = None,
+    metadata: Optional[dict] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    trace_id: Optional[str] = None,
 ) -> bool:
     """
     发送单个文件到指定的聊天
     
+    Args:
+        metadata: 下载器登记的元数据（video_id / uploader / title / duration），
+            提供时不再从文件名解析；分段文件传入原始文件的元数据
+        on_progress: 上传进度回调 (已发送字节, 总字节)；默认以 TRACE 级别记录日志
+        trace_id: 追踪 ID，send / record 阶段的 span 归入该 trace
+    
     Returns:
         bool: 发送成功返回 True，失败返回 False
     """
@@ -506,8 +696,13 @@ async def send_single_file(
     file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
     file_name_for_meta = os.path.basename(file_path)
     
-    # 从文件名中提取频道名、视频ID和标题
-    channel_name, video_id, base_title = extract_video_info_from_filename(file_name_for_meta)
+    if metadata and metadata.get('video_id'):
+        channel_name = metadata.get('uploader') or metadata.get('yt_channel')
+        video_id = metadata['video_id']
+        base_title = metadata.get('title') or video_id
+    else:
+        # 从文件名中提取频道名、视频ID和标题
+        channel_name, video_id, base_title = extract_video_info_from_filename(file_name_for_meta)
     
     # 检查是否已经发送过（避免超时误报导致的重复发送）
     try:
@@ -538,29 +733,103 @@ async def send_single_file(
     
     # 使用频道名作为 performer
     performer = channel_name if channel_name else "Unknown"
+    # 同一视频已上传过（其他频道组）时直接引用 file_id，不再重复上传
+    cache_key = _file_id_cache_key(context.bot, video_id, file_name_for_meta, os.path.getsize(file_path))
+    cached = _get_cached_file_id(cache_key)
     # 主动提供精准时长，避免元数据时长不准确导致播放尾部被截断
-    duration_seconds = _probe_duration_seconds(file_path)
+    duration_seconds = cached.get('duration') if cached else None
+    if duration_seconds is None:
+        duration_seconds = _probe_duration_seconds(file_path)
+    if duration_seconds is None and metadata and metadata.get('duration') and title == base_title:
+        # 探测失败时使用下载器提供的时长（分段文件的时长与原始文件不同，不使用）
+        try:
+            duration_seconds = math.ceil(float(metadata['duration'])) + 1
+        except (TypeError, ValueError):
+            duration_seconds = None
     group_label = group_name or str(chat_id)
     
     # 追踪发送状态
     send_succeeded = False
     
     try:
-        with open(file_path, 'rb') as file_to_send:
-            await context.bot.send_audio(
-                chat_id=chat_id,
-                audio=file_to_send,
-                title=title,
-                performer=performer,
-                duration=duration_seconds,
-                read_timeout=300,  # 5分钟超时，避免大文件误报
-                write_timeout=300,
-            )
+        sent_by_file_id = False
+        if cached:
+            try:
+                with span(trace_id, 'send', video_id=video_id, file_name=file_name_for_meta, method='file_id'), \
+                        SEND_SECONDS.time(method='file_id'):
+                    await context.bot.send_audio(
+                        chat_id=chat_id,
+                        audio=cached['file_id'],
+                        title=title,
+                        performer=performer,
+                        duration=duration_seconds,
+                    )
+                sent_by_file_id = True
+                log_with_context(
+                    logger, logging.INFO,
+                    "复用已上传的 file_id 发送",
+                    file_name=file_name_for_meta,
+                    video_id=video_id,
+                    chat_id=chat_id
+                )
+            except BadRequest as br:
+                # file_id 失效（如 Bot 更换）：删除缓存后重新上传
+                TELEGRAM_ERRORS.inc(error_type=type(br).__name__)
+                log_with_context(
+                    logger, logging.WARNING,
+                    "file_id 发送失败，改为上传文件",
+                    video_id=video_id,
+                    chat_id=chat_id,
+                    error_message=str(br)
+                )
+                _forget_file_id(cache_key)
+
+        if not sent_by_file_id:
+            if getattr(context.bot, 'local_mode', False):
+                # 自建 Bot API 服务器直接按本地路径读取文件，不经过 HTTP 上传
+                with span(trace_id, 'send', video_id=video_id, file_name=file_name_for_meta, method='local'), \
+                        SEND_SECONDS.time(method='local'):
+                    message = await context.bot.send_audio(
+                        chat_id=chat_id,
+                        audio=Path(file_path).resolve(),
+                        title=title,
+                        performer=performer,
+                        duration=duration_seconds,
+                        read_timeout=300,
+                        write_timeout=300,
+                    )
+            else:
+                # read_file_handle=False：不预先读入整个文件，由 httpx 从磁盘分块流式上传
+                with open(file_path, 'rb') as file_handle:
+                    file_to_send = InputFile(
+                        _UploadProgressReader(
+                            file_handle,
+                            os.path.getsize(file_path),
+                            on_progress or _log_upload_progress(file_name_for_meta),
+                        ),
+                        filename=file_name_for_meta,
+                        read_file_handle=False,
+                    )
+                    with span(trace_id, 'send', video_id=video_id, file_name=file_name_for_meta,
+                              method='upload', size_mb=round(file_size_mb, 2)), \
+                            SEND_SECONDS.time(method='upload'):
+                        message = await context.bot.send_audio(
+                            chat_id=chat_id,
+                            audio=file_to_send,
+                            title=title,
+                            performer=performer,
+                            duration=duration_seconds,
+                            read_timeout=300,  # 5分钟超时，避免大文件误报
+                            write_timeout=300,
+                        )
+                SENT_BYTES.inc(os.path.getsize(file_path))
+            _remember_file_id(cache_key, message, duration_seconds)
         send_succeeded = True
         
     except TimedOut as te:
         # 超时通常意味着实际发送成功了，记录详细日志但当作成功处理
         # (避免重复发送，因为 Telegram 服务器可能已经收到了)
+        TELEGRAM_ERRORS.inc(error_type=type(te).__name__)
         log_with_context(
             logger, logging.WARNING,
             "发送超时（视为成功）",
@@ -577,6 +846,7 @@ async def send_single_file(
         send_succeeded = True  # 超时也当作成功，避免重复发送
         
     except TelegramError as te:
+        TELEGRAM_ERRORS.inc(error_type=type(te).__name__)
         log_with_context(
             logger, logging.ERROR,
             "发送文件时发生 Telegram 错误",
@@ -614,7 +884,8 @@ async def send_single_file(
     
     # 只有发送成功才记录和打日志
     if send_succeeded:
-        record_sent_file(chat_id, video_id, base_title, channel_name)
+        with span(trace_id, 'record', video_id=video_id):
+            record_sent_file(chat_id, video_id, base_title, channel_name)
         log_with_context(
             logger, logging.INFO,
             "文件发送完成",
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+故事型频道视频索引
+持久化频道全部视频 ID（从旧到新），首次构建后只增量追加新上传，
+每轮按检查点位置 O(items) 选取下一批，而不是重新提取整个频道
+"""
+
+import os
+import re
+import json
+import time
+from typing import Optional, List, Dict, Any
+
+from config import PROJECT_ROOT
+
+STORY_INDEX_DIR = os.path.join(PROJECT_ROOT, "data", "story_index")
+
+
+def _index_file_name(channel_name: str) -> str:
+    safe_name = re.sub(r'[^\w@.-]', '_', channel_name or 'unknown')
+    return f"{safe_name}.json"
+
+
+class StoryIndex:
+    """单个故事频道的有序视频索引"""
+
+    def __init__(self, channel_name: str, index_dir: str = STORY_INDEX_DIR):
+        self.channel_name = channel_name
+        self.index_file = os.path.join(index_dir, _index_file_name(channel_name))
+        self.entries: List[Dict[str, Any]] = []
+        self.built_at: Optional[int] = None
+        self.updated_at: Optional[int] = None
+        self._positions: Dict[str, int] = {}
+
+    @property
+    def is_built(self) -> bool:
+        return self.built_at is not None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def load(self) -> 'StoryIndex':
+        """从磁盘加载索引，不存在或损坏时保持为空"""
+        if not os.path.exists(self.index_file):
+            return self
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.entries = [e for e in data.get('entries', []) if isinstance(e, dict) and e.get('id')]
+            self.built_at = data.get('built_at')
+            self.updated_at = data.get('updated_at')
+        except Exception as e:
+            print(f"警告：读取故事索引失败，将重新构建: {e}")
+            self.entries = []
+            self.built_at = None
+            self.updated_at = None
+        self._reindex()
+        return self
+
+    def save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+            tmp_file = self.index_file + ".tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump({
+                    'channel': self.channel_name,
+                    'built_at': self.built_at,
+                    'updated_at': self.updated_at,
+                    'entries': self.entries,
+                }, f, ensure_ascii=False)
+            os.replace(tmp_file, self.index_file)
+        except Exception as e:
+            print(f"警告：保存故事索引失败: {e}")
+
+    def _reindex(self) -> None:
+        self._positions = {entry['id']: pos for pos, entry in enumerate(self.entries)}
+
+    @staticmethod
+    def _to_index_entry(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        video_id = entry.get('id') if entry else None
+        if not video_id:
+            return None
+        item: Dict[str, Any] = {'id': video_id}
+        if entry.get('title'):
+            item['title'] = entry['title']
+        if entry.get('timestamp') is not None:
+            try:
+                item['ts'] = int(entry['timestamp'])
+            except (TypeError, ValueError):
+                pass
+        return item
+
+    def rebuild(self, entries_newest_first: List[Dict[str, Any]]) -> None:
+        """用完整频道列表（频道页顺序：新 -> 旧）重建索引"""
+        rebuilt = []
+        seen = set()
+        for entry in reversed(entries_newest_first):
+            item = self._to_index_entry(entry)
+            if item and item['id'] not in seen:
+                seen.add(item['id'])
+                # 保留已知的精确时间戳
+                old_pos = self._positions.get(item['id'])
+                if old_pos is not None and 'ts' not in item and 'ts' in self.entries[old_pos]:
+                    item['ts'] = self.entries[old_pos]['ts']
+                rebuilt.append(item)
+        self.entries = rebuilt
+        now_ts = int(time.time())
+        self.built_at = now_ts
+        self.updated_at = now_ts
+        self._reindex()
+
+    def append_new(self, latest_newest_first: List[Dict[str, Any]]) -> int:
+        """
+        追加新上传：从最新条目往回找到第一个已索引的视频，把其后的新条目追加到末尾
+
+        Returns:
+            新增条目数；-1 表示最新列表与索引没有重叠（需要完整重建）
+        """
+        new_items = []
+        overlap = False
+        for entry in latest_newest_first:
+            video_id = entry.get('id') if entry else None
+            if not video_id:
+                continue
+            if video_id in self._positions:
+                overlap = True
+                break
+            item = self._to_index_entry(entry)
+            if item:
+                new_items.append(item)
+        if not overlap and self.entries:
+            return -1
+        for item in reversed(new_items):
+            self._positions[item['id']] = len(self.entries)
+            self.entries.append(item)
+        self.updated_at = int(time.time())
+        return len(new_items)
+
+    def position_of(self, video_id: Optional[str]) -> Optional[int]:
+        if not video_id:
+            return None
+        return self._positions.get(video_id)
+
+    def entries_after(self, position: Optional[int], limit: int) -> List[Dict[str, Any]]:
+        """返回指定位置之后的 limit 个条目（position 为 None 时从最早的开始）"""
+        start = 0 if position is None else position + 1
+        return self.entries[start:start + max(0, limit)]
+
+    def set_timestamp(self, video_id: str, timestamp: Optional[int]) -> None:
+        """用完整元数据中的精确上传时间回填索引"""
+        pos = self._positions.get(video_id)
+        if pos is None or timestamp is None:
+            return
+        try:
+            self.entries[pos]['ts'] = int(timestamp)
+        except (TypeError, ValueError):
+            pass
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+故事型频道预取
+调度器空闲时在后台把接下来的 N 集下载到暂存目录，
+故事任务到期时只需把暂存文件移动到分组的音频目录
+"""
+
+import os
+import re
+import logging
+import json
+import time
+import shutil
+import threading
+from typing import Callable, Dict, Any, List, Optional
+
+from config import PROJECT_ROOT, get_config_value
+from logger import get_logger, log_with_context
+
+logger = get_logger('downloader.story_prefetch')
+
+STORY_STAGING_DIR = os.path.join(PROJECT_ROOT, "data", "story_staging")
+
+_group_locks: Dict[str, threading.Lock] = {}
+_group_locks_guard = threading.Lock()
+
+
+def get_story_prefetch_items() -> int:
+    """每个故事组预取的集数，0 表示关闭预取"""
+    try:
+        return max(0, int(get_config_value('downloader.story_prefetch_items', 0)))
+    except (TypeError, ValueError):
+        return 0
+
+
+def story_group_lock(group_name: str) -> threading.Lock:
+    """
+    同一故事组的预取与正式下载互斥，避免同一集被同时下载或在移动途中被清理
+    """
+    with _group_locks_guard:
+        lock = _group_locks.get(group_name)
+        if lock is None:
+            lock = threading.Lock()
+            _group_locks[group_name] = lock
+        return lock
+
+
+class StoryStaging:
+    """单个故事组的暂存目录与清单（manifest.json）"""
+
+    def __init__(self, group_name: str, staging_root: str = STORY_STAGING_DIR):
+        safe_name = re.sub(r'[^\w@.-]', '_', group_name or 'story')
+        self.group_name = group_name
+        self.folder = os.path.join(staging_root, safe_name)
+        self.manifest_file = os.path.join(self.folder, "manifest.json")
+        self.items: Dict[str, Dict[str, Any]] = {}
+
+    def load(self) -> 'StoryStaging':
+        self.items = {}
+        if os.path.exists(self.manifest_file):
+            try:
+                with open(self.manifest_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    self.items = data.get('items', {}) or {}
+            except Exception as e:
+                logger.warning(f"读取故事暂存清单失败，已忽略: {e}")
+        # 丢弃文件已不存在的条目
+        self.items = {
+            video_id: item for video_id, item in self.items.items()
+            if item.get('file') and os.path.exists(os.path.join(self.folder, item['file']))
+        }
+        return self
+
+    def save(self) -> None:
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            tmp_file = self.manifest_file + ".tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump({'group': self.group_name, 'items': self.items}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.manifest_file)
+        except Exception as e:
+            logger.warning(f"保存故事暂存清单失败: {e}")
+
+    def get(self, video_id: str) -> Optional[Dict[str, Any]]:
+        return self.items.get(video_id)
+
+    def add(self, video_id: str, file_path: str, title: Optional[str] = None,
+            uploader: Optional[str] = None, timestamp: Optional[int] = None) -> None:
+        """登记一个已下载到暂存目录的文件"""
+        self.items[video_id] = {
+            'file': os.path.basename(file_path),
+            'title': title,
+            'uploader': uploader,
+            'timestamp': timestamp,
+            'staged_at': int(time.time()),
+        }
+
+    def release(self, video_id: str, target_folder: str) -> Optional[str]:
+        """
+        把暂存文件移动到目标目录（同文件系统时为原子 rename，否则复制为临时文件后改名）
+
+        Returns:
+            目标文件路径；未暂存或移动失败返回 None
+        """
+        item = self.items.get(video_id)
+        if not item:
+            return None
+        src = os.path.join(self.folder, item['file'])
+        dst = os.path.join(target_folder, item['file'])
+        if not os.path.exists(src):
+            self.items.pop(video_id, None)
+            return None
+        try:
+            os.makedirs(target_folder, exist_ok=True)
+            try:
+                os.replace(src, dst)
+            except OSError:
+                # 跨文件系统：先复制为目标目录内的 .tmp（发送任务与目录监听都会忽略），
+                # 复制完成后再原子改名，避免半个文件被发送
+                tmp_dst = dst + ".tmp"
+                try:
+                    shutil.copy2(src, tmp_dst)
+                    os.replace(tmp_dst, dst)
+                except Exception:
+                    try:
+                        os.remove(tmp_dst)
+                    except OSError:
+                        pass
+                    raise
+                os.remove(src)
+        except Exception as e:
+            logger.warning(f"移动故事暂存文件失败: {e}")
+            return None
+        self.items.pop(video_id, None)
+        return dst
+
+    def prune(self, keep_ids: List[str]) -> int:
+        """删除不在预取窗口内的暂存文件（已交付或检查点已越过）"""
+        keep = set(keep_ids)
+        removed = 0
+        for video_id in list(self.items.keys()):
+            if video_id in keep:
+                continue
+            item = self.items.pop(video_id)
+            try:
+                os.remove(os.path.join(self.folder, item['file']))
+            except OSError:
+                pass
+            removed += 1
+        return removed
+
+
+class StoryPrefetcher:
+    """
+    后台预取线程：同一时间最多运行一个预取任务，
+    调度器有任务到期时通过 stop 事件让预取在当前条目完成后尽快退出
+    """
+
+    def __init__(self, prefetch_func: Callable[..., int]):
+        """
+        Args:
+            prefetch_func: 执行单组预取的函数，签名为
+                (channel_name, group_name, count, stop_event) -> 新暂存的集数
+        """
+        self.prefetch_func = prefetch_func
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, groups: List[Dict[str, Any]], count: int) -> bool:
+        """
+        在后台依次预取各故事组
+
+        Args:
+            groups: 故事组列表，每项包含 group_name / channel
+            count: 每组预取的集数
+        """
+        if count <= 0 or not groups or self.is_running():
+            return False
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(list(groups), count),
+            name="story-prefetch",
+            daemon=True,
+        )
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """
+        请求预取线程在当前条目完成后退出
+
+        Args:
+            timeout: 等待线程退出的最长秒数；None 表示不等待
+
+        Returns:
+            预取线程是否已不在运行
+        """
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None and timeout is not None and thread.is_alive():
+            thread.join(timeout)
+        return not self.is_running()
+
+    def _run(self, groups: List[Dict[str, Any]], count: int) -> None:
+        for group in groups:
+            if self._stop_event.is_set():
+                break
+            try:
+                self.prefetch_func(group['channel'], group['group_name'], count, self._stop_event)
+            except Exception as e:
+                log_with_context(
+                    logger,
+                    logging.ERROR,
+                    "故事预取失败",
+                    tg_channel=group.get('group_name'),
+                    error=str(e),
+                    error_type=type(e).__name__
+                )
@@ -3,6 +3,9 @@
 import os
 import sys
 import time
+import asyncio
+import logging
+from typing import Dict, Optional, Set
 
 # 设置默认编码为UTF-8
 if sys.stdout.encoding != 'utf-8':
@@ -11,10 +14,9 @@ if sys.stderr.encoding != 'utf-8':
     sys.stderr.reconfigure(encoding='utf-8')
 
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-from telegram.request import HTTPXRequest
 from telegram.error import NetworkError, TimedOut
 from dotenv import load_dotenv
-from task.send_file import send_file
+from task.send_file import send_file, count_pending_files
 from commands.add_channel import add_channel
 from config import (
     AUDIO_FOLDER, 
@@ -22,9 +24,21 @@ from config import (
     get_telegram_token,
     get_telegram_chat_id,
     get_send_interval,
+    get_config_check_interval,
+    get_config_value,
 )
 from util import get_channel_groups_with_details, show_chat_id
-from logger import get_logger
+from logger import get_logger, log_with_context, shutdown_logging
+from folder_watcher import FolderWatcher
+from telegram_request import RoutedRequest, apply_local_bot_api, build_pool_request
+from metrics import (
+    PENDING_FILES,
+    REQUEST_POOL_IN_FLIGHT,
+    REQUEST_POOL_REQUESTS,
+    REQUEST_POOL_SATURATED,
+    TELEGRAM_ERRORS,
+    start_metrics_server,
+)
 
 # 使用统一的日志系统
 logger = get_logger('bot', separate_error_file=True)
@@ -50,30 +64,204 @@ if not CHAT_ID:
 
 logger.info(f"🛠️ 配置加载成功：发送检查间隔 = {SEND_INTERVAL} 秒 ({SEND_INTERVAL/60:.1f} 分钟)")
 
-def create_send_file_task(chat_id: str, audio_folder: str, group_name: str):
+SEND_JOB_PREFIX = "send_task_"
+WAKE_JOB_PREFIX = "wake_send_"
+
+# 每个频道组同一时间只运行一个发送任务（定时任务与目录唤醒任务互斥）
+_group_send_locks: Dict[str, asyncio.Lock] = {}
+# 发送进行中又收到唤醒的频道组，结束后需要再检查一次
+_rerun_requested: Set[str] = set()
+# 已提示过未配置 telegram_chat_id 的频道组（每次同步都会检查，只提示一次）
+_warned_missing_chat_id: Set[str] = set()
+
+
+def _get_group_send_lock(group_name: str) -> asyncio.Lock:
+    lock = _group_send_locks.get(group_name)
+    if lock is None:
+        lock = asyncio.Lock()
+        _group_send_locks[group_name] = lock
+    return lock
+
+
+async def send_group_task(context: ContextTypes.DEFAULT_TYPE) -> None:
     """
-    创建发送文件任务的闭包函数
-    
-    Args:
-        chat_id: Telegram 频道 ID
-        audio_folder: 音频文件夹路径
-        group_name: 频道组名称（用于日志）
-    
-    Returns:
-        发送文件的异步任务函数
+    频道组发送任务：参数保存在 job.data 中，热更新时可直接修改而不必重建任务
     """
-    async def send_file_task(context: ContextTypes.DEFAULT_TYPE) -> None:
+    data = context.job.data or {}
+    group_name = data.get('group_name')
+    audio_folder = data.get('audio_folder')
+    lock = _get_group_send_lock(group_name)
+    if lock.locked():
+        _rerun_requested.add(group_name)
+        return
+
+    async with lock:
+        pending_before = count_pending_files(audio_folder)
+        if pending_before == 0 and os.path.isdir(audio_folder):
+            return
         try:
             await send_file(
                 context=context,
-                chat_id=chat_id,
+                chat_id=data.get('chat_id'),
                 audio_folder=audio_folder,
                 group_name=group_name,
             )
         except Exception as e:
             logger.error(f"发送文件任务错误 (频道组: {group_name}): {e}")
-    
-    return send_file_task
+        pending_after = count_pending_files(audio_folder)
+
+    # 每次只发送一个文件：由唤醒触发且有进展时继续发送剩余文件，失败的文件留给定时任务重试
+    rerun = group_name in _rerun_requested
+    _rerun_requested.discard(group_name)
+    woken = (context.job.name or '').startswith(WAKE_JOB_PREFIX)
+    if pending_after > 0 and (rerun or (woken and pending_after < pending_before)):
+        wake_send_job(context.job_queue, group_name)
+
+
+def wake_send_job(job_queue, group_name: str, delay: Optional[float] = None) -> None:
+    """
+    立即（短暂去抖后）执行一次频道组的发送任务；已有待执行的唤醒时不重复添加
+    """
+    send_job = _registered_send_jobs(job_queue).get(group_name)
+    if send_job is None:
+        return
+    wake_name = f"{WAKE_JOB_PREFIX}{group_name}"
+    if any(not job.removed for job in job_queue.get_jobs_by_name(wake_name)):
+        return
+    if delay is None:
+        delay = float(get_config_value('telegram.folder_watch.debounce', 2))
+    job_queue.run_once(send_group_task, when=delay, name=wake_name, data=send_job.data)
+
+
+def _update_watched_folders(application) -> None:
+    watcher = application.bot_data.get('folder_watcher')
+    if watcher is None:
+        return
+    watcher.set_folders({
+        job.data['audio_folder']: group_name
+        for group_name, job in _registered_send_jobs(application.job_queue).items()
+        if job.data and job.data.get('audio_folder')
+    })
+
+
+async def start_folder_watcher(application) -> None:
+    """启动音频目录监听：出现新文件时唤醒对应频道组的发送任务"""
+    if not get_config_value('telegram.folder_watch.enabled', True):
+        return
+    loop = asyncio.get_running_loop()
+    job_queue = application.job_queue
+
+    def on_change(group_name: str) -> None:
+        loop.call_soon_threadsafe(wake_send_job, job_queue, group_name)
+
+    watcher = FolderWatcher(
+        on_change,
+        poll_interval=float(get_config_value('telegram.folder_watch.poll_interval', 5)),
+    )
+    watcher.start()
+    application.bot_data['folder_watcher'] = watcher
+    _update_watched_folders(application)
+
+
+def _registered_send_jobs(job_queue) -> dict:
+    """当前已注册的发送任务：group_name -> Job"""
+    jobs = {}
+    for job in job_queue.jobs():
+        if job.name and job.name.startswith(SEND_JOB_PREFIX) and not job.removed:
+            jobs[job.name[len(SEND_JOB_PREFIX):]] = job
+    return jobs
+
+
+def sync_send_jobs(job_queue, channel_groups) -> dict:
+    """
+    按频道组配置增删/调整发送任务
+
+    - 新组：注册 send_task_{group}，错开首次执行时间
+    - 已删除或未配置 chat_id 的组：移除任务（正在执行的发送不受影响）
+    - chat_id / 音频目录变化：原地更新 job.data；检查间隔变化：按新间隔重新注册
+
+    Returns:
+        {'added': [...], 'removed': [...], 'updated': [...]}
+    """
+    registered = _registered_send_jobs(job_queue)
+    send_interval = get_send_interval()
+    desired = {}
+    for group in channel_groups:
+        group_name = group['name']
+        if not group.get('telegram_chat_id'):
+            if group_name not in _warned_missing_chat_id:
+                _warned_missing_chat_id.add(group_name)
+                logger.warning(f"⚠️  频道组 '{group_name}' 未配置 telegram_chat_id，跳过")
+            continue
+        _warned_missing_chat_id.discard(group_name)
+        desired[group_name] = {
+            'group_name': group_name,
+            'chat_id': group['telegram_chat_id'],
+            'audio_folder': group['audio_folder'],
+            'interval': send_interval,
+        }
+
+    result = {'added': [], 'removed': [], 'updated': []}
+
+    for group_name, job in registered.items():
+        if group_name not in desired:
+            job.schedule_removal()
+            result['removed'].append(group_name)
+            logger.info(f"🗑️ 已移除发送任务: {group_name}")
+
+    for idx, (group_name, data) in enumerate(desired.items()):
+        job = registered.get(group_name)
+        if job is not None and job.data == data:
+            continue
+        if job is not None and (job.data or {}).get('interval') == data['interval']:
+            job.data = data
+            result['updated'].append(group_name)
+            logger.info(f"🔧 已更新发送任务: {group_name} -> {data['chat_id']} ({data['audio_folder']})")
+            continue
+
+        if job is not None:
+            job.schedule_removal()
+            result['updated'].append(group_name)
+        else:
+            result['added'].append(group_name)
+
+        # 为每个组错开启动时间，避免同时发送
+        first_delay = 10 + (idx * 10)
+        job_queue.run_repeating(
+            send_group_task,
+            interval=data['interval'],
+            first=first_delay,
+            name=f"{SEND_JOB_PREFIX}{group_name}",
+            data=data,
+        )
+        logger.info(
+            f"📤 已配置发送任务: {group_name} -> {data['chat_id']}\n"
+            f"   音频目录: {data['audio_folder']}\n"
+            f"   检查间隔: {data['interval']}秒 ({data['interval']/60:.1f}分钟)\n"
+            f"   首次延迟: {first_delay}秒"
+        )
+
+    return result
+
+
+async def reconcile_send_jobs(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """定期重新读取频道组配置并同步发送任务"""
+    try:
+        channel_groups = await asyncio.to_thread(get_channel_groups_with_details, True)
+    except Exception as e:
+        logger.error(f"重新加载频道组配置失败: {e}")
+        return
+    if not channel_groups:
+        # 读取失败或配置为空时保留现有任务，避免误删
+        logger.warning("⚠️ 未读取到频道组配置，保留现有发送任务")
+        return
+    result = sync_send_jobs(context.job_queue, channel_groups)
+    _update_watched_folders(context.application)
+    if any(result.values()):
+        logger.info(
+            f"🔄 发送任务已同步：新增 {result['added']}，移除 {result['removed']}，更新 {result['updated']}"
+        )
+
 
 async def send_file_task(context: ContextTypes.DEFAULT_TYPE) -> None:
     """默认发送文件任务（向后兼容）"""
@@ -129,6 +317,7 @@ async def echo_handler(update, context: ContextTypes.DEFAULT_TYPE) -> None:
 async def error_callback(update, context):
     """全局错误处理器"""
     logger.error(f'Update "{update}" caused error "{context.error}"')
+    TELEGRAM_ERRORS.inc(error_type=type(context.error).__name__)
     
     # 如果是Bot冲突错误，尝试优雅处理
     if "Conflict: terminated by other getUpdates request" in str(context.error):
@@ -140,20 +329,62 @@ async def error_callback(update, context):
         except Exception:
             pass
         logger.info("检测到冲突，当前进程将退出以避免重复运行")
+        shutdown_logging()
         os._exit(1)
 
+async def log_request_pool_stats(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """连接池出现占满或排队超时时记录统计，便于调整 telegram.request_pools"""
+    request = context.job.data
+    stats = request.pool_stats()
+    last = context.bot_data.get('request_pool_stats', {})
+    for pool_name, pool in stats.items():
+        previous = last.get(pool_name, {})
+        if (pool['saturated'] > previous.get('saturated', 0)
+                or pool['pool_timeouts'] > previous.get('pool_timeouts', 0)):
+            log_with_context(
+                logger, logging.WARNING,
+                "Telegram 连接池已占满",
+                pool=pool_name,
+                **pool
+            )
+    context.bot_data['request_pool_stats'] = stats
+
+
+def register_runtime_metrics(application, request: RoutedRequest) -> None:
+    """抓取 /metrics 时读取各频道组待发送文件数与连接池统计"""
+    def pending_files():
+        return {
+            (group_name,): count_pending_files((job.data or {}).get('audio_folder', ''))
+            for group_name, job in _registered_send_jobs(application.job_queue).items()
+        }
+
+    def pool_field(field: str):
+        return lambda: {(pool_name,): pool[field] for pool_name, pool in request.pool_stats().items()}
+
+    PENDING_FILES.set_function(pending_files)
+    REQUEST_POOL_IN_FLIGHT.set_function(pool_field('in_flight'))
+    REQUEST_POOL_REQUESTS.set_function(pool_field('requests'))
+    REQUEST_POOL_SATURATED.set_function(pool_field('saturated'))
+
+
 def main():
-    # 增加超时设置，添加连接池配置
-    request = HTTPXRequest(
-        read_timeout=120,  # 增加读取超时
-        write_timeout=120,  # 增加写入超时
-        connect_timeout=60,  # 连接超时
-        pool_timeout=60,  # 连接池超时
-        connection_pool_size=8,  # 连接池大小
-        # proxy_url 参数在新版本中已移除，如需代理请使用 httpx 的方式配置
-    )
+    # api / media 分池，get_updates 长轮询单独一个连接池（见 telegram.request_pools）
+    request = RoutedRequest()
     
-    application = Application.builder().token(TOKEN).request(request).build()
+    builder = (
+        Application.builder()
+        .token(TOKEN)
+        .request(request)
+        .get_updates_request(build_pool_request('updates'))
+        .post_init(start_folder_watcher)
+    )
+
+    # 自建 Bot API 服务器：文件按本地路径交给服务器，最大 2GB，无需切割
+    server_url = apply_local_bot_api(builder)
+    if server_url:
+        logger.info(f"🖥️ 使用自建 Bot API 服务器: {server_url}")
+
+    application = builder.build()
     
     # 添加错误处理器
     application.add_error_handler(error_callback)
@@ -169,35 +400,29 @@ def main():
     logger.info(f"✅ 找到 {len(channel_groups)} 个频道组配置")
     
     # 为每个频道组创建独立的发送任务
-    for idx, group in enumerate(channel_groups):
-        group_name = group['name']
-        chat_id = group['telegram_chat_id']
-        audio_folder = group['audio_folder']
-        
-        if not chat_id:
-            logger.warning(f"⚠️  频道组 '{group_name}' 未配置 telegram_chat_id，跳过")
-            continue
-        
-        # 为每个组错开启动时间，避免同时发送
-        first_delay = 10 + (idx * 10)
-        
-        # 创建该组的发送任务
-        task_func = create_send_file_task(chat_id, audio_folder, group_name)
-        application.job_queue.run_repeating(
-            task_func,
-            interval=SEND_INTERVAL,
-            first=first_delay,
-            name=f"send_task_{group_name}"
-        )
-        
-        logger.info(
-            f"📤 已配置发送任务: {group_name} -> {chat_id}\n"
-            f"   音频目录: {audio_folder}\n"
-            f"   检查间隔: {SEND_INTERVAL}秒 ({SEND_INTERVAL/60:.1f}分钟)\n"
-            f"   首次延迟: {first_delay}秒"
-        )
+    sync_send_jobs(application.job_queue, channel_groups)
+
+    # 定期对比频道组配置与已注册的发送任务，热更新而无需重启轮询
+    reconcile_interval = get_config_check_interval()
+    application.job_queue.run_repeating(
+        reconcile_send_jobs,
+        interval=reconcile_interval,
+        first=reconcile_interval,
+        name="reconcile_send_jobs"
+    )
+    
+    application.job_queue.run_repeating(
+        log_request_pool_stats,
+        interval=reconcile_interval,
+        first=reconcile_interval,
+        name="log_request_pool_stats",
+        data=request,
+    )
     
     logger.info(f"✅ 所有发送任务已配置完成")
+
+    if start_metrics_server('bot'):
+        register_runtime_metrics(application, request)
     
     # 注册命令处理器（私聊/群组）
     application.add_handler(CommandHandler("addchannel", add_channel))
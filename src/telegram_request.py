@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Telegram 请求连接池
+把 Bot 的 HTTP 流量分到独立的连接池，互不占用连接：
+
+- api:     普通 API 调用（命令回复、file_id 发送等小请求），可选 HTTP/2
+- media:   带文件的上传请求（send_audio 上传），超时更长
+- updates: get_updates 长轮询（由 Application.builder().get_updates_request 使用）
+
+配置（config.yaml -> telegram.request_pools）::
+
+    request_pools:
+      api:     {size: 8, keepalive: 8, keepalive_expiry: 30, http2: false}
+      media:   {size: 4, keepalive: 2, keepalive_expiry: 30}
+      updates: {size: 1}
+
+自建 Bot API 服务器（config.yaml -> telegram.local_bot_api）由 apply_local_bot_api 配置到 ApplicationBuilder。
+"""
+
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from telegram.request import BaseRequest, HTTPXRequest, RequestData
+
+from config import get_config_value
+from logger import get_logger
+
+logger = get_logger('bot.request')
+
+POOL_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    'api': {
+        'size': 8, 'keepalive': 8, 'keepalive_expiry': 30, 'http2': False,
+        'connect_timeout': 60, 'read_timeout': 120, 'write_timeout': 120, 'pool_timeout': 60,
+    },
+    'media': {
+        'size': 4, 'keepalive': 2, 'keepalive_expiry': 30, 'http2': False,
+        'connect_timeout': 60, 'read_timeout': 300, 'write_timeout': 300, 'pool_timeout': 120,
+    },
+    'updates': {
+        'size': 1, 'keepalive': 1, 'keepalive_expiry': 60, 'http2': False,
+        'connect_timeout': 60, 'read_timeout': 120, 'write_timeout': 120, 'pool_timeout': 60,
+    },
+}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def get_pool_settings(pool_name: str) -> Dict[str, Any]:
+    """读取某个连接池的配置（未配置的字段使用默认值）"""
+    settings = dict(POOL_DEFAULTS[pool_name])
+    configured = get_config_value(f'telegram.request_pools.{pool_name}', {}) or {}
+    if isinstance(configured, dict):
+        settings.update({k: v for k, v in configured.items() if v is not None})
+    if settings.get('http2') and not _http2_available():
+        logger.warning(f"连接池 {pool_name} 配置了 http2，但未安装 h2（pip install httpx[http2]），改用 HTTP/1.1")
+        settings['http2'] = False
+    return settings
+
+
+def build_pool_request(pool_name: str) -> HTTPXRequest:
+    """按配置创建单个连接池"""
+    settings = get_pool_settings(pool_name)
+    size = int(settings['size'])
+    return HTTPXRequest(
+        connection_pool_size=size,
+        connect_timeout=float(settings['connect_timeout']),
+        read_timeout=float(settings['read_timeout']),
+        write_timeout=float(settings['write_timeout']),
+        # 带文件的请求未显式指定 write_timeout 时 HTTPXRequest 使用 media_write_timeout（默认 20 秒）
+        media_write_timeout=float(settings['write_timeout']),
+        pool_timeout=float(settings['pool_timeout']),
+        http_version="2" if settings['http2'] else "1.1",
+        httpx_kwargs={
+            'limits': httpx.Limits(
+                max_connections=size,
+                max_keepalive_connections=min(int(settings['keepalive']), size),
+                keepalive_expiry=float(settings['keepalive_expiry']),
+            ),
+        },
+    )
+
+
+def apply_local_bot_api(builder, settings: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """
+    启用自建 Bot API 服务器时设置 base_url / base_file_url / local_mode
+
+    Args:
+        builder: Application.builder() 返回的 ApplicationBuilder
+        settings: local_bot_api 配置；None 时读取 telegram.local_bot_api
+
+    Returns:
+        服务器地址；未启用时返回 None（builder 保持默认的公共 API）
+    """
+    if settings is None:
+        settings = get_config_value('telegram.local_bot_api', {}) or {}
+    if not settings.get('enabled'):
+        return None
+    server_url = str(settings.get('base_url') or 'http://localhost:8081').rstrip('/')
+    base_file_url = settings.get('base_file_url') or f"{server_url}/file/bot"
+    builder.base_url(f"{server_url}/bot").base_file_url(base_file_url).local_mode(True)
+    return server_url
+
+
+class _PoolStats:
+    """单个连接池的占用统计"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.saturated = 0
+        self.pool_timeouts = 0
+        self.busy_seconds = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'size': self.size,
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
+            'requests': self.requests,
+            'saturated': self.saturated,
+            'pool_timeouts': self.pool_timeouts,
+            'busy_seconds': round(self.busy_seconds, 1),
+        }
+
+
+class RoutedRequest(BaseRequest):
+    """
+    按请求内容把 Bot API 调用分发到 api / media 两个连接池
+
+    带文件的请求（multipart 上传）走 media 池，其余走 api 池；
+    大文件上传不会再占满普通 API 调用的连接
+    """
+
+    def __init__(self, api_request: Optional[HTTPXRequest] = None,
+                 media_request: Optional[HTTPXRequest] = None):
+        self._pools = {
+            'api': api_request or build_pool_request('api'),
+            'media': media_request or build_pool_request('media'),
+        }
+        self._stats = {
+            name: _PoolStats(int(get_pool_settings(name)['size'])) for name in self._pools
+        }
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return self._pools['api'].read_timeout
+
+    async def initialize(self) -> None:
+        for request in self._pools.values():
+            await request.initialize()
+
+    async def shutdown(self) -> None:
+        for request in self._pools.values():
+            await request.shutdown()
+
+    def pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """各连接池的占用统计（saturated: 发起请求时连接已全部占用的次数）"""
+        return {name: stats.snapshot() for name, stats in self._stats.items()}
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout=BaseRequest.DEFAULT_NONE,
+        write_timeout=BaseRequest.DEFAULT_NONE,
+        connect_timeout=BaseRequest.DEFAULT_NONE,
+        pool_timeout=BaseRequest.DEFAULT_NONE,
+    ) -> Tuple[int, bytes]:
+        pool_name = 'media' if request_data is not None and request_data.contains_files else 'api'
+        stats = self._stats[pool_name]
+        if stats.in_flight >= stats.size:
+            stats.saturated += 1
+        stats.in_flight += 1
+        stats.requests += 1
+        stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        started = time.monotonic()
+        try:
+            return await self._pools[pool_name].do_request(
+                url,
+                method,
+                request_data=request_data,
+                read_timeout=read_timeout,
+                write_timeout=write_timeout,
+                connect_timeout=connect_timeout,
+                pool_timeout=pool_timeout,
+            )
+        except Exception as e:
+            # HTTPXRequest 把 httpx.PoolTimeout 包装为 TimedOut 抛出（raise ... from）
+            if isinstance(e, httpx.PoolTimeout) or isinstance(e.__cause__, httpx.PoolTimeout):
+                stats.pool_timeouts += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+            stats.busy_seconds += time.monotonic() - started
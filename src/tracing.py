@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+单集音频的端到端追踪
+每个视频在 dl_audio_latest 中分配一个 trace_id，经交接队列元数据传给 Bot，
+两个进程把各阶段的 span 追加到同一个 logs/traces.jsonl：
+
+    下载器: list -> download (内含 transcode) -> rename
+    Bot:    wait（落盘到开始发送）-> split -> send -> record
+
+每行一个 span：{"trace_id", "name", "start", "duration", "pid", ...附加字段}。
+scripts/trace_report.py 按 trace 绘制瀑布图并统计各阶段耗时分位数。
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from config import PROJECT_ROOT, get_config_value
+from logger import SharedRotatingFileHandler
+
+TRACES_FILE = os.path.join(PROJECT_ROOT, "logs", "traces.jsonl")
+
+_handler: Optional[SharedRotatingFileHandler] = None
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def tracing_enabled() -> bool:
+    return bool(get_config_value('tracing.enabled', True))
+
+
+def _get_handler() -> SharedRotatingFileHandler:
+    global _handler
+    if _handler is None:
+        os.makedirs(os.path.dirname(TRACES_FILE), exist_ok=True)
+        max_mb = get_config_value('tracing.max_mb', 20)
+        try:
+            max_bytes = int(float(max_mb) * 1024 * 1024)
+        except (TypeError, ValueError):
+            max_bytes = 20 * 1024 * 1024
+        # 与 all.log 相同：下载器与 Bot 同时追加，轮转由锁文件协调
+        _handler = SharedRotatingFileHandler(TRACES_FILE, max_bytes=max_bytes, backup_count=3)
+        _handler.setFormatter(logging.Formatter('%(message)s'))
+    return _handler
+
+
+def record_span(trace_id: Optional[str], name: str, start: float, end: float, **attrs: Any) -> None:
+    """
+    写入一个已结束的 span
+
+    Args:
+        trace_id: 所属 trace；为空时忽略
+        name: 阶段名（list / download / transcode / rename / wait / split / send / record）
+        start, end: 开始与结束时间（Unix 时间戳，秒）
+        attrs: 附加字段（video_id / yt_channel / method 等）
+    """
+    if not trace_id or not tracing_enabled():
+        return
+    entry: Dict[str, Any] = {
+        'trace_id': trace_id,
+        'name': name,
+        'start': round(start, 6),
+        'duration': round(max(end - start, 0.0), 6),
+        'pid': os.getpid(),
+    }
+    entry.update({k: v for k, v in attrs.items() if v is not None})
+    try:
+        record = logging.makeLogRecord({
+            'msg': json.dumps(entry, ensure_ascii=False, default=str),
+            'levelno': logging.INFO,
+            'levelname': 'INFO',
+        })
+        _get_handler().handle(record)
+    except Exception:
+        # 追踪写入失败不影响下载与发送
+        pass
+
+
+@contextmanager
+def span(trace_id: Optional[str], name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """
+    计时上下文：with span(trace_id, 'send', video_id=...) as fields: ...
+
+    可在块内向 fields 添加字段；块内抛出异常时记录 error 字段后继续抛出
+    """
+    fields: Dict[str, Any] = dict(attrs)
+    start = time.time()
+    started = time.monotonic()
+    try:
+        yield fields
+    except BaseException as e:
+        fields.setdefault('error', type(e).__name__)
+        raise
+    finally:
+        record_span(trace_id, name, start, start + (time.monotonic() - started), **fields)
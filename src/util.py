@@ -3,7 +3,7 @@ from telegram import Update
 from telegram.ext import ContextTypes
 import os
 import sys
-from typing import Tuple, List
+from typing import Tuple, List, Optional
 
 # 设置默认编码为UTF-8
 if sys.stdout.encoding != 'utf-8':
@@ -12,6 +12,7 @@ if sys.stderr.encoding != 'utf-8':
     sys.stderr.reconfigure(encoding='utf-8')
 
 from config import CHANNELS_FILE, get_all_channel_groups, load_yaml_config, PROJECT_ROOT
+from config_watch import diff_channel_groups, has_changes, publish_config_diff
 
 
 async def show_chat_id(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -133,6 +134,10 @@ def _get_channels_from_yaml() -> Tuple[str, ...]:
         print("将尝试从 channels.txt 读取")
         return _get_channels_from_txt()
 
+# 上一次热重载得到的频道组，用于计算变更差异
+_last_channel_groups: Optional[List[dict]] = None
+
+
 def get_channel_groups_with_details(reload: bool = False) -> List[dict]:
     """
     获取所有频道组的详细信息（用于多频道支持）
@@ -198,10 +203,18 @@ def get_channel_groups_with_details(reload: bool = False) -> List[dict]:
             })
         
         if reload:
-            msg = f"🔄 热重载：从 config.yaml 重新加载了 {len(result)} 个启用的频道组"
-            if disabled_groups:
-                msg += f"（已禁用: {', '.join(disabled_groups)}）"
-            print(msg)
+            global _last_channel_groups
+            diff = diff_channel_groups(_last_channel_groups, result) if _last_channel_groups is not None else None
+            _last_channel_groups = result
+            if diff is None or has_changes(diff):
+                msg = f"🔄 热重载：从 config.yaml 重新加载了 {len(result)} 个启用的频道组"
+                if disabled_groups:
+                    msg += f"（已禁用: {', '.join(disabled_groups)}）"
+                if diff is not None:
+                    msg += f"（新增: {diff['added']}，删除: {diff['removed']}，变更: {diff['changed']}）"
+                print(msg)
+                if diff is not None:
+                    publish_config_diff(diff, result)
         else:
             msg = f"从 config.yaml 加载了 {len(result)} 个启用的频道组"
             if disabled_groups:
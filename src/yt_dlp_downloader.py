@@ -11,10 +11,14 @@ if sys.stderr.encoding != 'utf-8':
     sys.stderr.reconfigure(encoding='utf-8')
 
 from dotenv import load_dotenv
-from task.dl_audio import dl_audio_latest, dl_audio_story
+from task.dl_audio import dl_audio_latest, dl_audio_story, prefetch_story
+from task.story_prefetch import StoryPrefetcher, get_story_prefetch_items
 from util import refresh_channels_from_file, get_channel_groups_with_details
-from config import ENV_FILE, get_download_interval, get_channel_delay_min, get_channel_delay_max, get_config_check_interval
+from config import ENV_FILE, get_config_provider, get_config_value, get_download_interval, get_channel_delay_min, get_channel_delay_max, get_config_check_interval
 from logger import get_logger, log_with_context, TRACE_LEVEL
+from scheduler import JobScheduler, ScheduledJob
+from metrics import SCHEDULER_READY_JOBS, start_metrics_server
+from config_watch import add_config_listener
 import logging
 
 # 使用统一的日志系统
@@ -77,265 +81,370 @@ def interleave_channels(channel_groups):
     
     return result
 
-def dl_youtube_multi_groups(channel_groups) -> None:
+def _realtime_interval() -> int:
+    """实时型频道的轮询间隔：未配置下载间隔时每个配置检查周期跑一轮"""
+    if DOWNLOAD_INTERVAL > 0:
+        return DOWNLOAD_INTERVAL
+    return get_config_check_interval()
+
+
+# 空闲等待短于该秒数时不启动故事预取
+STORY_PREFETCH_MIN_IDLE = 60
+# 下载任务到期时等待预取线程完成当前条目的最长秒数
+STORY_PREFETCH_STOP_TIMEOUT = 300
+
+
+def _story_deadline_slack() -> int:
+    """故事型任务到期后允许等待的最长时间（秒）"""
+    try:
+        return int(get_config_value('downloader.story_deadline_slack', 600))
+    except (TypeError, ValueError):
+        return 600
+
+
+class DownloadScheduler:
     """
-    为多个频道组下载 YouTube 音频（支持频道穿插）
-    
-    Args:
-        channel_groups: 频道组列表，每个组包含 youtube_channels, audio_folder, name 等信息
+    下载调度：每个实时频道、每个故事组都是独立任务，按到期时间进入任务堆。
+
+    - 实时频道任务的截止时间为到期后一个轮询间隔，故事任务为 story_deadline_slack，
+      因此到期的故事任务会插队到尚未开始的实时频道之前，不必等待整轮实时下载
+    - 频道间延迟通过推迟下一个下载任务实现，而不是阻塞整个循环
+    - 配置刷新本身也是一个任务，负责增删/更新下载任务
+    - 空闲等待期间在后台预取故事组接下来的几集，下载任务到期时通知预取尽快停止
     """
-    # 统计所有频道总数
-    total_channels = sum(len(group['youtube_channels']) for group in channel_groups)
-    
-    # 获取延迟配置
-    delay_min = get_channel_delay_min()
-    delay_max = get_channel_delay_max()
-    
-    logger.info(f"🚀 开始批量下载，共 {len(channel_groups)} 个频道组，{total_channels} 个YouTube频道")
-    logger.info(f"⏱️ 频道间延迟：{delay_min}-{delay_max}秒（随机）")
-    
-    # 显示各组信息
-    for group in channel_groups:
-        if group['youtube_channels']:
-            log_with_context(
-                logger,
-                logging.INFO,
-                f"📋 频道组配置",
-                group_name=group['name'],
-                channel_count=len(group['youtube_channels']),
-                audio_folder=group['audio_folder']
-            )
-    
-    # 将频道穿插排列
-    interleaved_channels = interleave_channels(channel_groups)
-    
-    logger.info(f"🔁 已优化下载顺序：多个频道组交替进行，确保及时性")
-    
-    # 按穿插后的顺序处理
-    for idx, item in enumerate(interleaved_channels, 1):
-        channel = item['channel']
-        group_name = item['group_name']
-        audio_folder = item['audio_folder']
-        
+
+    def __init__(self):
+        self.scheduler = JobScheduler()
+        self.story_last_run = {}
+        self.cooldown_until = 0.0
+        self.prefetcher = StoryPrefetcher(prefetch_story)
+        self._config_dirty = False
+        add_config_listener(self._on_config_changed)
+
+    # ---------- 任务定义 ----------
+
+    def _run_realtime_channel(self, job: ScheduledJob):
+        payload = job.payload
+        group_name = payload['group_name']
+        channel = payload['channel']
         try:
-            # 频道间延迟（如果配置了的话）
-            if delay_max > 0 and idx > 1:  # 第一个频道不延迟
-                delay = random.uniform(delay_min, delay_max)
-                log_with_context(
-                    logger,
-                    logging.INFO,
-                    f"⏳ 频道间延迟 - 准备处理频道 [{idx}/{total_channels}]",
-                    tg_channel=group_name,
-                    yt_channel=channel,
-                    delay_seconds=round(delay, 2)
-                )
-                time.sleep(delay)
-            
             log_with_context(
                 logger,
                 logging.INFO,
-                f"▶️ 处理频道 [{idx}/{total_channels}]",
+                "▶️ 处理频道",
                 tg_channel=group_name,
                 yt_channel=channel
             )
-            
             dl_audio_latest(
                 channel_name=channel,
-                audio_folder=audio_folder,
+                audio_folder=payload['audio_folder'],
                 group_name=group_name
             )
-            
         except Exception as e:
             log_with_context(
                 logger,
                 logging.ERROR,
-                f"❌ 下载频道失败",
+                "❌ 下载频道失败",
                 tg_channel=group_name,
                 yt_channel=channel,
                 error=str(e),
                 error_type=type(e).__name__
             )
-            continue
-    
-def dl_youtube(channels) -> None:
-    """下载 YouTube 频道的音频（向后兼容的旧接口）"""
-    logger.info(f"🚀 开始批量下载，共 {len(channels)} 个频道")
-    
-    # 从配置读取频道间延迟
-    delay_min = get_channel_delay_min()
-    delay_max = get_channel_delay_max()
-    
-    for idx, channel in enumerate(channels, 1):
+        return None
+
+    def _run_story_group(self, job: ScheduledJob):
+        payload = job.payload
+        group_name = payload['group_name']
+        channel = payload['channel']
+        items_per_run = payload['items_per_run']
+        log_with_context(
+            logger,
+            logging.INFO,
+            "📚 故事模式下载",
+            tg_channel=group_name,
+            yt_channel=channel,
+            items=items_per_run
+        )
         try:
-            # 频道间延迟（如果配置了的话）
-            if delay_max > 0 and idx > 1:  # 第一个频道不延迟
-                delay = random.uniform(delay_min, delay_max)
-                log_with_context(
-                    logger,
-                    logging.INFO,
-                    f"⏳ 频道间延迟 - 处理频道 [{idx}/{len(channels)}]",
-                    yt_channel=channel,
-                    delay_seconds=round(delay, 2)
-                )
-                time.sleep(delay)
-            
-            log_with_context(
-                logger,
-                logging.INFO,
-                f"▶️ 处理频道 [{idx}/{len(channels)}]",
-                yt_channel=channel
+            dl_audio_story(
+                channel_name=channel,
+                audio_folder=payload['audio_folder'],
+                group_name=group_name,
+                items_per_run=items_per_run
             )
-            
-            dl_audio_latest(channel_name=channel)
-            
         except Exception as e:
             log_with_context(
                 logger,
                 logging.ERROR,
-                f"❌ 下载频道失败",
+                "❌ 故事模式下载失败",
+                tg_channel=group_name,
                 yt_channel=channel,
                 error=str(e),
                 error_type=type(e).__name__
             )
-            continue
-    
+        self.story_last_run[group_name] = time.time()
+        return time.time() + payload['interval']
 
-def main():
-    logger.info("YouTube 下载调度器")
-    story_last_run = {}
-    last_realtime_run_ts = 0  # 首次启动立即跑实时型
+    def _run_config_refresh(self, job: ScheduledJob):
+        channel_groups = get_channel_groups_with_details(reload=True)
+        if not channel_groups:
+            logger.warning("未找到任何频道分组配置")
+        # 配置未变化时跳过任务同步
+        if self._config_dirty or job.runs == 0:
+            self._config_dirty = False
+            self.reconcile(channel_groups or [])
+        return time.time() + get_config_check_interval()
 
-    while True:
-        try:
-            channel_groups = get_channel_groups_with_details(reload=True)
+    def _on_config_changed(self, diff, channel_groups) -> None:
+        self._config_dirty = True
+        log_with_context(
+            logger,
+            logging.INFO,
+            "频道配置已变更",
+            added=diff['added'],
+            removed=diff['removed'],
+            changed=diff['changed']
+        )
 
-            if not channel_groups:
-                logger.warning("未找到任何频道分组配置")
-                time.sleep(60)
-                continue
+    # ---------- 任务同步 ----------
 
-            realtime_groups = [g for g in channel_groups if g.get('channel_type') != 'story']
-            story_groups = [g for g in channel_groups if g.get('channel_type') == 'story']
+    def reconcile(self, channel_groups) -> None:
+        """根据最新频道组配置增删/更新下载任务"""
+        now_ts = time.time()
+        realtime_groups = [g for g in channel_groups if g.get('channel_type') != 'story']
+        story_groups = [g for g in channel_groups if g.get('channel_type') == 'story']
+        desired_keys = set()
+        added = 0
 
-            now_ts = time.time()
+        realtime_interval = _realtime_interval()
+        # 按穿插顺序创建任务：同一时刻到期的频道按入堆顺序交替执行
+        for item in interleave_channels(realtime_groups):
+            key = f"realtime:{item['group_name']}:{item['channel']}"
+            desired_keys.add(key)
+            payload = {
+                'group_name': item['group_name'],
+                'channel': item['channel'],
+                'audio_folder': item['audio_folder'],
+            }
+            job = self.scheduler.get(key)
+            if job is None:
+                self.scheduler.schedule(ScheduledJob(
+                    key, self._run_realtime_channel, now_ts,
+                    interval=realtime_interval,
+                    deadline_slack=realtime_interval,
+                    kind='realtime',
+                    payload=payload,
+                ))
+                added += 1
+            else:
+                job.payload = payload
+                job.interval = realtime_interval
+                job.deadline_slack = realtime_interval
 
-            # 计算实时型到期
-            next_realtime_due = None
-            if DOWNLOAD_INTERVAL > 0:
-                realtime_due = max(0, DOWNLOAD_INTERVAL - (now_ts - last_realtime_run_ts))
-                next_realtime_due = realtime_due
+        story_slack = _story_deadline_slack()
+        for group in story_groups:
+            group_name = group.get('name', 'story')
+            yt_list = group.get('youtube_channels', [])
+            if not yt_list:
+                logger.warning(f"故事模式 {group_name} 未配置 YouTube 频道")
+                continue
+            key = f"story:{group_name}"
+            desired_keys.add(key)
+            interval = int(group.get('story_interval_seconds', 86400))
+            payload = {
+                'group_name': group_name,
+                'channel': yt_list[0],
+                'audio_folder': group.get('audio_folder'),
+                'items_per_run': int(group.get('story_items_per_run', 1)),
+                'interval': interval,
+            }
+            job = self.scheduler.get(key)
+            if job is None:
+                self.scheduler.schedule(ScheduledJob(
+                    key, self._run_story_group, self._story_last_run_ts(group_name) + interval,
+                    deadline_slack=story_slack,
+                    kind='story',
+                    payload=payload,
+                ))
+                added += 1
             else:
-                realtime_due = 0
-
-            # 计算故事型最早到期
-            story_due_min = None
-            story_due_name = None
-            due_story_groups = []
-            for group in story_groups:
-                group_name = group.get('name', 'story')
-                interval = int(group.get('story_interval_seconds', 86400))
-                items_per_run = int(group.get('story_items_per_run', 1))
-                last_run_ts = group.get('story_last_run_ts')
-                if last_run_ts is None:
-                    last_run_ts = story_last_run.get(group_name, 0)
-                due_in = interval - (now_ts - last_run_ts)
-
-                if due_in <= 0:
-                    due_story_groups.append((group, items_per_run))
-                    due_in = interval  # 下次到期时间
-
-                if story_due_min is None or due_in < story_due_min:
-                    story_due_min = due_in
-                    story_due_name = group_name
-
-            # 运行实时型（仅到期才跑）
-            if realtime_due <= 0 and realtime_groups:
-                total_channels = sum(len(group['youtube_channels']) for group in realtime_groups)
-                log_with_context(
-                    logger,
-                    logging.INFO,
-                    "刷新实时频道列表",
-                    group_count=len(realtime_groups),
-                    total_channels=total_channels
-                )
-                dl_youtube_multi_groups(realtime_groups)
-                last_realtime_run_ts = time.time()
-            elif not realtime_groups:
-                logger.info("当前没有实时型频道组需要下载")
-
-            # 运行到期的故事型
-            if due_story_groups:
-                story_delay_min = get_channel_delay_min()
-                story_delay_max = get_channel_delay_max()
-                for idx, (group, items_per_run) in enumerate(due_story_groups):
-                    if idx > 0 and story_delay_max >= story_delay_min and story_delay_max > 0:
-                        c_delay = random.uniform(story_delay_min, story_delay_max)
-                        log_with_context(
-                            logger,
-                            logging.INFO,
-                            "故事频道间延迟",
-                            tg_channel=group.get('name', 'story'),
-                            delay_seconds=round(c_delay, 2)
-                        )
-                        time.sleep(c_delay)
-
-                    group_name = group.get('name', 'story')
-                    yt_list = group.get('youtube_channels', [])
-                    if not yt_list:
-                        logger.warning(f"故事模式 {group_name} 未配置 YouTube 频道")
-                        continue
-                    channel = yt_list[0]
+                old_interval = job.payload.get('interval')
+                if old_interval is not None and interval != old_interval:
+                    # 间隔变化：以原计划时间换算回上次运行时间，再按新间隔重新计算到期
+                    job.deadline_slack = story_slack
+                    job.payload = payload
+                    job.set_due(job.intended_ts - old_interval + interval)
+                    self.scheduler.schedule(job)
+                else:
+                    job.payload = payload
+                    job.deadline_slack = story_slack
+
+        removed = 0
+        for key in self.scheduler.keys():
+            if key.startswith(('realtime:', 'story:')) and key not in desired_keys:
+                self.scheduler.cancel(key)
+                removed += 1
+
+        log_with_context(
+            logger,
+            logging.INFO,
+            "调度任务已同步",
+            realtime_groups=len(realtime_groups),
+            story_groups=len(story_groups),
+            added=added,
+            removed=removed,
+            total_jobs=len(self.scheduler.keys())
+        )
+
+    def _story_last_run_ts(self, group_name: str) -> float:
+        """故事组上次运行时间：本进程内的记录优先，其次是持久化的故事进度（重启后）"""
+        if group_name in self.story_last_run:
+            return self.story_last_run[group_name]
+        try:
+            progress = get_config_provider().get_story_progress(group_name) or {}
+            return float(progress.get('last_run_ts') or 0)
+        except Exception as e:
+            log_with_context(
+                logger,
+                logging.WARNING,
+                "读取故事进度失败，按从未运行处理",
+                tg_channel=group_name,
+                error=str(e),
+                error_type=type(e).__name__
+            )
+            return 0
+
+    # ---------- 主循环 ----------
+
+    def _apply_cooldown(self, job: ScheduledJob) -> bool:
+        """下载任务之间的随机延迟；仍在冷却期时推迟任务并返回 True"""
+        if job.kind not in ('realtime', 'story'):
+            return False
+        now_ts = time.time()
+        if now_ts < self.cooldown_until:
+            self.scheduler.defer(job, self.cooldown_until)
+            return True
+        return False
+
+    def _start_cooldown(self) -> None:
+        delay_min = get_channel_delay_min()
+        delay_max = get_channel_delay_max()
+        if delay_max > 0 and delay_max >= delay_min:
+            delay = random.uniform(delay_min, delay_max)
+            self.cooldown_until = time.time() + delay
+            log_with_context(
+                logger,
+                TRACE_LEVEL,
+                "⏳ 频道间延迟",
+                delay_seconds=round(delay, 2)
+            )
+
+    def run_forever(self) -> None:
+        self.scheduler.schedule(ScheduledJob(
+            'config', self._run_config_refresh, time.time(), kind='config'
+        ))
+        while True:
+            job = self.scheduler.pop_ready()
+            SCHEDULER_READY_JOBS.set(self.scheduler.ready_count())
+            if job is None:
+                self._wait_for_next()
+                continue
+            if self._apply_cooldown(job):
+                continue
+            if job.kind in ('realtime', 'story') and self.prefetcher.is_running():
+                # 等预取完成当前条目再开始下载，避免两个 yt-dlp 同时占用带宽与 Cookie
+                if not self.prefetcher.stop(timeout=STORY_PREFETCH_STOP_TIMEOUT):
                     log_with_context(
                         logger,
-                        logging.INFO,
-                        "📚 故事模式下载",
-                        tg_channel=group_name,
-                        yt_channel=channel,
-                        items=items_per_run
+                        logging.WARNING,
+                        "故事预取未能及时结束，继续执行下载任务",
+                        job=job.key,
+                        timeout_seconds=STORY_PREFETCH_STOP_TIMEOUT
                     )
-                    dl_audio_story(
-                        channel_name=channel,
-                        audio_folder=group.get('audio_folder'),
-                        group_name=group_name,
-                        items_per_run=items_per_run
-                    )
-                    story_last_run[group_name] = time.time()
-
-            # 计算下一次睡眠
-            wait_candidates = []
-            if DOWNLOAD_INTERVAL > 0:
-                next_realtime_due = DOWNLOAD_INTERVAL if realtime_due <= 0 else realtime_due
-                wait_candidates.append(next_realtime_due)
-            if story_due_min is not None:
-                wait_candidates.append(max(1, story_due_min))
-            if not wait_candidates:
-                wait_candidates.append(60)
-
-            # 添加配置检查间隔作为等待时间上限，确保能及时发现新增频道或配置变更
-            config_check_interval = get_config_check_interval()
-            wait_candidates.append(config_check_interval)
-
-            wait_time = max(1, min(wait_candidates))
-            wait_context = {
-                "wait_seconds": wait_time,
-                "wait_hours": round(wait_time / 3600, 2),
-            }
-            if next_realtime_due is not None:
-                wait_context["next_realtime_seconds"] = round(next_realtime_due, 2)
-            if story_due_name is not None and story_due_min is not None:
-                wait_context["next_story"] = story_due_name
-                wait_context["next_story_seconds"] = round(story_due_min, 2)
-            if wait_time == config_check_interval:
-                wait_context["reason"] = "config_check"
 
+            result = self.scheduler.run(job)
             log_with_context(
                 logger,
-                logging.INFO,
-                "等待下一轮",
-                **wait_context
+                logging.INFO if result['deadline_missed'] else TRACE_LEVEL,
+                "调度任务完成",
+                job=job.key,
+                kind=job.kind,
+                **result
             )
+            if job.kind in ('realtime', 'story'):
+                self._start_cooldown()
+
+    def _wait_for_next(self) -> None:
+        next_job = self.scheduler.next_due()
+        if next_job is None:
+            wait_time = 60
+        else:
+            wait_time = max(1, next_job.due_ts - time.time())
+
+        wait_context = {
+            "wait_seconds": round(wait_time, 2),
+            "wait_hours": round(wait_time / 3600, 2),
+        }
+        if next_job is not None:
+            wait_context["next_job"] = next_job.key
+        # 频道间冷却：下一个任务是被推迟的下载任务，只是两个频道之间的间隔，不是一轮结束
+        in_cooldown = (
+            next_job is not None
+            and next_job.kind in ('realtime', 'story')
+            and next_job.due_ts <= self.cooldown_until
+        )
+        if in_cooldown:
+            wait_context["reason"] = "cooldown"
+            log_with_context(logger, TRACE_LEVEL, "等待频道间延迟", **wait_context)
             time.sleep(wait_time)
+            return
+
+        if next_job is not None and next_job.kind == 'config':
+            wait_context["reason"] = "config_check"
+        summary = self.scheduler.lateness_summary()
+        if summary:
+            wait_context["lateness"] = summary
+
+        log_with_context(
+            logger,
+            logging.INFO,
+            "等待下一轮",
+            **wait_context
+        )
+        self._start_prefetch(wait_time)
+        time.sleep(wait_time)
 
+    def _start_prefetch(self, wait_time: float) -> None:
+        """空闲时间足够长时启动故事预取"""
+        prefetch_items = get_story_prefetch_items()
+        if prefetch_items <= 0 or wait_time < STORY_PREFETCH_MIN_IDLE:
+            return
+        groups = []
+        for key in self.scheduler.keys():
+            job = self.scheduler.get(key)
+            if job is not None and job.kind == 'story':
+                groups.append({
+                    'group_name': job.payload['group_name'],
+                    'channel': job.payload['channel'],
+                })
+        if self.prefetcher.start(groups, prefetch_items):
+            log_with_context(
+                logger,
+                TRACE_LEVEL,
+                "启动故事预取",
+                groups=len(groups),
+                items=prefetch_items
+            )
+
+
+def main():
+    logger.info("YouTube 下载调度器")
+    start_metrics_server('downloader')
+    download_scheduler = DownloadScheduler()
+
+    while True:
+        try:
+            download_scheduler.run_forever()
         except KeyboardInterrupt:
             logger.info("收到停止信号，准备退出...")
             break